@@ -1,11 +1,35 @@
 import os
 import io
+import contextlib
+from concurrent.futures import Future
 
 import streamlit as st
 from ocr_processor import OCRProcessor
 from langage_analyser import LanguageAnalyzer
 from document_type_detector import DocumentTypeDetector
 from document_summarizer import DocumentSummarizer
+from grammar_pool import pool as grammar
+from model_registry import registry
+from result_cache import cache
+from translation_memory import memory
+from inference_service import InferenceClient
+from metrics import metrics
+from document import Document
+
+# service d'inférence partagé (inference_service.py) si NLP_INFERENCE_URL est
+# défini : les requêtes des sessions simultanées y sont regroupées en lots
+service = InferenceClient() if os.environ.get("NLP_INFERENCE_URL") else None
+
+
+@st.cache_resource(show_spinner="Chargement des modèles…")
+def _preload_models():
+    """Préchargement unique au démarrage du serveur (partagé entre sessions)."""
+    registry.preload()
+    return True
+
+
+if os.environ.get("NLP_PRELOAD", "0") == "1":
+    _preload_models()
 
 st.title("Analyseur de documents OCR")
 
@@ -15,10 +39,43 @@ page = st.sidebar.radio(
     ["OCR", "Détecter Langue + traduction", "Détecter le type de document", "Résumer le document"]
 )
 
+with st.sidebar.expander("Modèles et cache"):
+    st.json({"modèles": registry.stats(), "cache": cache.stats(),
+             "mémoire de traduction": memory.stats(), "correction": grammar.stats()})
+
+# Mesures (metrics.py) : la case n'affiche le panneau que pour cette
+# session ; cochée, elle active l'enregistrement (NLP_METRICS=1 pour tout le
+# processus dès le démarrage) sans jamais le couper pour les autres sessions.
+# La ventilation de la dernière action s'affiche en bas de la barre latérale
+show_metrics = st.sidebar.checkbox("Mesures détaillées", value=False, key="show_metrics",
+                                   help="Durée par étape, pages, tokens, appels de modèle, cache")
+if show_metrics:
+    metrics.enable()
+metrics_panel = st.sidebar.empty()
+
+
+@contextlib.contextmanager
+def traced(name: str):
+    """Mesures de l'action en cours, gardées en session pour le panneau."""
+    with metrics.trace(name) as trace:
+        yield
+    if show_metrics:
+        st.session_state.trace = trace.as_dict()
+
+
 # Initialisation du texte extrait en session
 if "extracted_text" not in st.session_state:
     st.session_state.extracted_text = ""
 
+
+def current_document() -> Document:
+    """Document de la session : langue, tokens et résultats gardés d'une page à l'autre."""
+    doc = st.session_state.get("document")
+    if doc is None or doc.text != st.session_state.extracted_text:
+        doc = st.session_state.document = Document(text=st.session_state.extracted_text)
+    return doc
+
+
 # ─────────────── Page OCR ─────────────────────
 if page == "OCR":
     st.write("Choisissez la source du document à analyser :")
@@ -59,13 +116,27 @@ if page == "OCR":
 
     if st.button("Analyser"):
         if file_obj is not None:
-            ocr = OCRProcessor()
-            try:
-                extracted = ocr.extract_text(file_obj, file_ext)
-                st.session_state.extracted_text = extracted
-                st.text_area("Texte extrait", extracted, height=300)
-            except Exception as e:
-                st.error(f"Erreur lors de l'extraction du texte : {e}")
+            with traced("ocr"):
+                ocr = OCRProcessor()
+                try:
+                    # affichage incrémental : chaque page apparaît dès qu'elle est lue
+                    status = st.empty()
+                    area = st.empty()
+                    pages = []
+                    for i, page in enumerate(ocr.iter_pages(file_obj, file_ext), start=1):
+                        pages.append(page)
+                        status.caption(f"{i} page(s) traitée(s)…")
+                        area.text_area("Texte extrait", "\n\n".join(p["text"] for p in pages),
+                                       height=300, key=f"ocr_page_{i}")
+                    native = [str(p["page"]) for p in ocr.last_report if p["source"] == "text"]
+                    if native:
+                        status.caption(f"Pages lues depuis la couche texte du PDF (sans OCR) : {', '.join(native)}")
+                    else:
+                        status.empty()
+                    st.session_state.document = Document(pages=pages)
+                    st.session_state.extracted_text = st.session_state.document.text
+                except Exception as e:
+                    st.error(f"Erreur lors de l'extraction du texte : {e}")
         else:
             st.warning("Veuillez d'abord sélectionner ou téléverser un document.")
 
@@ -75,10 +146,17 @@ elif page == "Détecter Langue + traduction":
     if st.session_state.extracted_text:
         st.text_area("Texte extrait", st.session_state.extracted_text, height=300)
         if st.button("Détecter et Traduire"):
-            analyzer = LanguageAnalyzer()
-            lang = analyzer.detect_language(st.session_state.extracted_text)
-            st.write("Langue détectée :", lang)
-            st.text_area("Texte traduit", analyzer.translate_text(st.session_state.extracted_text), height=300)
+            with traced("traduction"):
+                doc = current_document()
+                analyzer = LanguageAnalyzer()
+                lang = analyzer.detect_language(doc)
+                st.write("Langue détectée :", lang)
+                if service is not None:
+                    translation = doc.result("translation", lambda: service.translate(doc.text, lang=lang),
+                                             lang=lang, backend="service")
+                else:
+                    translation = analyzer.translate_text(doc, lang=lang)
+                st.text_area("Texte traduit", translation, height=300)
     else:
         st.warning("Aucun texte disponible. Passez d'abord par OCR.")
 
@@ -88,12 +166,17 @@ elif page == "Détecter le type de document":
     if st.session_state.extracted_text:
         st.text_area("Texte extrait", st.session_state.extracted_text, height=300)
         if st.button("Détecter Type"):
-            if "doc_detector" not in st.session_state:
-                st.session_state.doc_detector = DocumentTypeDetector()
-            scores = st.session_state.doc_detector(st.session_state.extracted_text)
-            st.subheader("Scores (ordre décroissant)")
-            for label, score in scores:
-                st.write(f"- **{label}** : {score:.2%}")
+            with traced("type"):
+                doc = current_document()
+                if service is not None:
+                    result = doc.result("type", lambda: service.detect(doc.text), backend="service")
+                else:
+                    result = DocumentTypeDetector().detect_detailed([doc])[0]
+                scores = result["scores"]
+                st.caption("Décision : " + ("règles lexicales" if result["stage"] == "rules" else "modèle zero-shot"))
+                st.subheader("Scores (ordre décroissant)")
+                for label, score in scores:
+                    st.write(f"- **{label}** : {score:.2%}")
     else:
         st.warning("Aucun texte disponible. Passez d'abord par OCR.")
 
@@ -103,9 +186,48 @@ elif page == "Résumer le document":
     if st.session_state.extracted_text:
         st.text_area("Texte extrait", st.session_state.extracted_text, height=300)
         if st.button("Résumer"):
-            summarizer = DocumentSummarizer()
-            summary = summarizer.summarize_text(st.session_state.extracted_text, max_length=150)
-            st.subheader("Résumé")
-            st.text_area("Résumé du document", summary, height=150)
+            with traced("résumé"):
+                doc = current_document()
+                if service is not None:
+                    # le service renvoie directement le résumé corrigé
+                    summary = doc.result("summary", lambda: service.summarize(doc.text, max_length=150),
+                                         max_length=150, backend="service")
+                    corrected = Future()
+                    corrected.set_result(summary)
+                else:
+                    summarizer = DocumentSummarizer()
+                    # résumé brut affiché tout de suite, remplacé par la version corrigée
+                    summary, corrected = summarizer.summarize_async(doc, max_length=150)
+                st.subheader("Résumé")
+                area = st.empty()
+                area.text_area("Résumé du document", summary, height=150, key="summary_raw")
+                status = st.empty()
+                if not corrected.done():
+                    status.caption("Correction grammaticale en cours…")
+                try:
+                    final = corrected.result(timeout=60)
+                except Exception:
+                    final = summary
+                if final != summary:
+                    area.text_area("Résumé du document", final, height=150, key="summary_corrected")
+                status.empty()
     else:
         st.warning("Aucun texte disponible. Passez d'abord par OCR.")
+
+# ─── Panneau des mesures (barre latérale) ───
+if show_metrics:
+    with metrics_panel.container():
+        trace = st.session_state.get("trace")
+        if trace:
+            memory_note = (f", mémoire {trace['rss_delta_mb']:+.1f} Mo (pic {trace['peak_rss_mb']} Mo)"
+                           if trace["rss_delta_mb"] is not None else "")
+            st.caption(f"Dernière action : {trace['name']} — {trace['seconds']:.2f} s{memory_note}")
+            # étapes imbriquées (ex. translate ⊃ translate.generate) : pas de somme
+            st.table([{"étape": k, "appels": v["calls"], "secondes": v["seconds"]}
+                      for k, v in trace["stages"].items()])
+            if trace["counters"]:
+                st.json(trace["counters"], expanded=False)
+        else:
+            st.caption("Aucune action mesurée pour l'instant.")
+        with st.expander("Export Prometheus"):
+            st.code(metrics.prometheus(), language="text")
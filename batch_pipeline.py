@@ -0,0 +1,301 @@
+# batch_pipeline.py – traitement par lots d'un dossier de documents (sans interface)
+"""
+Usage :
+    python batch_pipeline.py Documents/ -o resultats.jsonl --workers 2
+    python batch_pipeline.py scan1.pdf scan2.png -o resultats.jsonl
+
+Enchaîne OCR → langue → type → résumé (étages choisis par --stages) sur
+chaque document, réparti sur un pool de processus. Chaque résultat est
+ajouté au fichier JSONL dès qu'il est prêt. Une relance ignore les
+fichiers déjà traités avec succès (même contenu, clé SHA-256, avec au
+moins les étages demandés), et un fichier en échec — exception ou
+message d'erreur rendu par un étage — est retenté --retries fois ; si un
+worker meurt, le pool est recréé. En fin de traitement, le
+script affiche le débit (documents/s, pages/s) et le temps par étape.
+"""
+from __future__ import annotations
+
+import argparse
+import collections
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from document import Document
+
+EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".tif", ".pdf")
+STAGES = ("ocr", "lang", "translation", "type", "summary")
+DEFAULT_STAGES = ("ocr", "lang", "type", "summary")
+
+
+def collect_files(inputs: list[str]) -> list[str]:
+    """Fichiers à traiter : dossiers parcourus (récursivement), fichiers tels quels."""
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, names in os.walk(item):
+                files += [os.path.join(root, n) for n in sorted(names)
+                          if n.lower().endswith(EXTENSIONS)]
+        elif os.path.isfile(item):
+            files.append(item)
+        else:
+            logging.warning(f"Introuvable, ignoré : {item}")
+    return files
+
+
+def file_sha(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class StageError(RuntimeError):
+    """Un étage a rendu un message d'erreur au lieu d'un résultat."""
+
+
+def done_shas(output: str, stages: tuple[str, ...] = DEFAULT_STAGES) -> set[str]:
+    """
+    Empreintes des documents déjà traités avec succès dans le JSONL, par
+    une exécution qui couvrait au moins `stages` (enregistrements sans
+    liste d'étages : à refaire).
+    """
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue     # ligne tronquée (interruption) : document à refaire
+            if record.get("status") == "ok" and set(stages) <= set(record.get("stages", ())):
+                done.add(record["sha256"])
+    return done
+
+
+# ─────────────── worker ───────────────
+# objets créés une fois par processus (modèles partagés via model_registry)
+_worker: dict = {}
+
+
+def _init_worker(stages: tuple[str, ...], workers: int) -> None:
+    import parallel_ocr
+    parallel_ocr.limit_threads(workers)
+    _worker["stages"] = stages
+
+
+def _stage(name: str):
+    """Processeur d'un étage, construit au premier document du worker."""
+    if name not in _worker:
+        if name == "ocr":
+            from ocr_processor import OCRProcessor
+            _worker[name] = OCRProcessor(workers=1)       # pas de pool imbriqué
+        elif name in ("lang", "translation"):
+            from langage_analyser import LanguageAnalyzer
+            _worker[name] = _worker.get("lang") or _worker.get("translation") or LanguageAnalyzer()
+        elif name == "type":
+            from document_type_detector import DocumentTypeDetector
+            _worker[name] = DocumentTypeDetector()
+        elif name == "summary":
+            from document_summarizer import DocumentSummarizer
+            _worker[name] = DocumentSummarizer()
+    return _worker[name]
+
+
+def _checked(stage: str, value, error_prefix: str):
+    # les étages rendent leurs erreurs sous forme de message (pour
+    # l'interface) : ici, ce sont des échecs à retenter
+    if isinstance(value, str) and value.startswith(error_prefix):
+        raise StageError(f"{stage} : {value[len(error_prefix):]}")
+    return value
+
+
+def process_file(path: str, sha: str) -> dict:
+    """Tous les étages sur un document ; lève l'exception en cas d'échec."""
+    stages = _worker.get("stages", DEFAULT_STAGES)
+    timings = {}
+    record = {"file": path, "sha256": sha, "status": "ok", "stages": list(stages)}
+
+    t = time.perf_counter()
+    with open(path, "rb") as f:
+        data = io.BytesIO(f.read())
+    # un seul Document partagé : texte, langue, tokens calculés une fois
+    doc = Document.from_file(data, path.rsplit(".", 1)[-1], ocr=_stage("ocr"), name=path)
+    timings["ocr"] = time.perf_counter() - t
+    record.update(pages=len(doc.pages), page_sources=[p["source"] for p in doc.pages], text=doc.text)
+
+    if "lang" in stages or "translation" in stages:
+        t = time.perf_counter()
+        from langage_analyser import ERROR_PREFIX
+        record["language"] = _checked("lang", _stage("lang").detect_language(doc), ERROR_PREFIX)
+        timings["lang"] = time.perf_counter() - t
+    if "translation" in stages:
+        t = time.perf_counter()
+        record["translation"] = _stage("translation").translate_text(doc)
+        timings["translation"] = time.perf_counter() - t
+    if "type" in stages:
+        t = time.perf_counter()
+        result = _stage("type").detect_detailed([doc])[0]
+        timings["type"] = time.perf_counter() - t
+        record.update(type=result["scores"][0][0] if result["scores"] else None,
+                      type_scores=result["scores"], type_stage=result["stage"])
+    if "summary" in stages:
+        t = time.perf_counter()
+        from document_summarizer import ERROR_PREFIX
+        record["summary"] = _checked("summary", _stage("summary").summarize_text(doc, max_length=150),
+                                     ERROR_PREFIX)
+        timings["summary"] = time.perf_counter() - t
+
+    record["timings"] = {k: round(v, 3) for k, v in timings.items()}
+    return record
+
+
+# ─────────────── orchestration ───────────────
+class _InlineExecutor:
+    """workers = 1 : même interface, exécution dans le processus courant."""
+
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+        fut = Future()
+        try:
+            fut.set_result(fn(*args))
+        except Exception as e:
+            fut.set_exception(e)
+        return fut
+
+    def shutdown(self, **kwargs):
+        pass
+
+
+def _executor(stages: tuple[str, ...], workers: int):
+    if workers > 1:
+        return ProcessPoolExecutor(max_workers=workers,
+                                   mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_worker, initargs=(stages, workers))
+    _init_worker(stages, 1)
+    return _InlineExecutor()
+
+
+def run(files: list[str], output: str, stages: tuple[str, ...], workers: int,
+        retries: int, force: bool = False) -> dict:
+    done = set() if force else done_shas(output, stages)
+    todo, skipped = [], 0
+    for path in files:
+        sha = file_sha(path)
+        if sha in done:
+            skipped += 1
+        else:
+            todo.append((path, sha))
+            done.add(sha)            # doublons de contenu : une seule fois
+
+    executor = _executor(stages, workers)
+
+    stats = {"ok": 0, "errors": 0, "skipped": skipped, "retries": 0, "pages": 0}
+    stage_time = collections.defaultdict(float)
+    t0 = time.perf_counter()
+    attempts: dict[str, int] = {}
+    # au plus 2 × workers documents en vol : le fichier de sortie avance en continu
+    queue = collections.deque(todo)
+    pending = {}
+    with open(output, "a", encoding="utf-8") as out:
+        while queue or pending:
+            while queue and len(pending) < 2 * workers:
+                path, sha = queue.popleft()
+                attempts[path] = attempts.get(path, 0) + 1
+                try:
+                    fut = executor.submit(process_file, path, sha)
+                except BrokenProcessPool:
+                    executor = _restart(executor, stages, workers)
+                    fut = executor.submit(process_file, path, sha)
+                pending[fut] = (path, sha, executor)
+            finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            broken = False
+            for fut in finished:
+                path, sha, pool = pending.pop(fut)
+                try:
+                    record = fut.result()
+                except Exception as e:
+                    # worker mort (mémoire, plantage natif) : tous les documents
+                    # en vol échouent, chacun compte une tentative
+                    broken = broken or (isinstance(e, BrokenProcessPool) and pool is executor)
+                    if attempts[path] <= retries:
+                        stats["retries"] += 1
+                        logging.warning(f"Échec, nouvelle tentative : {path} ({e})")
+                        queue.append((path, sha))
+                        continue
+                    stats["errors"] += 1
+                    record = {"file": path, "sha256": sha, "status": "error", "error": str(e),
+                              "traceback": "".join(traceback.format_exception(e))[-2000:]}
+                    logging.error(f"Échec définitif : {path} ({e})")
+                else:
+                    stats["ok"] += 1
+                    stats["pages"] += record["pages"]
+                    for k, v in record["timings"].items():
+                        stage_time[k] += v
+                record["attempts"] = attempts[path]
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+            if broken:
+                executor = _restart(executor, stages, workers)
+    executor.shutdown(wait=True)
+
+    elapsed = time.perf_counter() - t0
+    stats.update(seconds=round(elapsed, 2),
+                 docs_per_s=round(stats["ok"] / elapsed, 3) if elapsed else None,
+                 pages_per_s=round(stats["pages"] / elapsed, 3) if elapsed else None,
+                 stage_seconds={k: round(v, 2) for k, v in stage_time.items()})
+    return stats
+
+
+def _restart(executor, stages: tuple[str, ...], workers: int):
+    logging.warning("Pool de workers interrompu, recréé")
+    executor.shutdown(wait=False, cancel_futures=True)
+    return _executor(stages, workers)
+
+
+def print_summary(stats: dict) -> None:
+    print(f"\n{stats['ok']} document(s) traité(s), {stats['errors']} en échec, "
+          f"{stats['skipped']} déjà traité(s), {stats['retries']} nouvelle(s) tentative(s)")
+    print(f"{stats['seconds']} s — {stats['docs_per_s']} doc/s, {stats['pages_per_s']} pages/s")
+    total = sum(stats["stage_seconds"].values()) or 1.0
+    for stage, seconds in stats["stage_seconds"].items():
+        mean = seconds / max(1, stats["ok"])
+        print(f"  {stage:<12} {seconds:8.2f} s  ({seconds / total:5.1%}, {mean:.2f} s/doc)")
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="OCR → langue → type → résumé sur un lot de documents.")
+    ap.add_argument("inputs", nargs="+", help="dossiers et/ou fichiers")
+    ap.add_argument("-o", "--output", default="resultats.jsonl", help="fichier JSONL de sortie")
+    ap.add_argument("-w", "--workers", type=int,
+                    default=int(os.environ.get("NLP_BATCH_WORKERS", "1")),
+                    help="processus en parallèle (défaut : NLP_BATCH_WORKERS, 1)")
+    ap.add_argument("--stages", nargs="+", choices=STAGES, default=list(DEFAULT_STAGES),
+                    help="étages à exécuter (l'OCR est toujours fait)")
+    ap.add_argument("--retries", type=int, default=2, help="nouvelles tentatives par fichier")
+    ap.add_argument("--force", action="store_true", help="retraite aussi les fichiers déjà faits")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    files = collect_files(args.inputs)
+    if not files:
+        print("Aucun document à traiter.", file=sys.stderr)
+        return 1
+    stages = tuple(dict.fromkeys(["ocr"] + args.stages))
+    stats = run(files, args.output, stages, max(1, args.workers), max(0, args.retries), args.force)
+    print_summary(stats)
+    return 0 if stats["errors"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+# benchmarks/_common.py – utilitaires partagés par les scripts de mesure
+from __future__ import annotations
+
+import io
+import os
+import time
+from contextlib import contextmanager
+
+from PIL import Image
+
+DOCS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Documents")
+IMAGE_EXT = (".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".tif")
+
+
+def corpus_files(exts: tuple[str, ...] = IMAGE_EXT + (".pdf",)) -> list[str]:
+    """Chemins des documents du dossier Documents/, triés par nom."""
+    return sorted(
+        os.path.join(DOCS_DIR, f) for f in os.listdir(DOCS_DIR)
+        if f.lower().endswith(exts)
+    )
+
+
+def read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def make_pdf(n_pages: int) -> bytes:
+    """PDF de `n_pages` pages construit en répétant les images du corpus."""
+    images = [Image.open(p).convert("RGB") for p in corpus_files(IMAGE_EXT)]
+    pages = [images[i % len(images)] for i in range(n_pages)]
+    buf = io.BytesIO()
+    pages[0].save(buf, format="PDF", save_all=True, append_images=pages[1:])
+    return buf.getvalue()
+
+
+@contextmanager
+def timer(out: dict, name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        out[name] = out.get(name, 0.0) + time.perf_counter() - t0
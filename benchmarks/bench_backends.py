@@ -0,0 +1,114 @@
+# benchmarks/bench_backends.py – précision et latence par moteur d'inférence
+"""
+Usage : python -m benchmarks.bench_backends [--backends torch int8 onnx]
+                                            [--models detector translation summary]
+
+Pour chaque modèle et chaque moteur (voir inference_backend.py), sur les
+textes OCR des documents de Documents/ :
+- chargement : premier chargement (construction des artefacts comprise) ;
+- latence    : temps moyen par document, modèle chargé ;
+- accord     : écart aux sorties du moteur torch (référence) —
+  détecteur : même type en tête et écart moyen des scores ;
+  traduction, résumé : similarité du texte (difflib, 1 = identique).
+Pour décider, modèle par modèle, du moteur à déployer (NLP_BACKEND_<MODÈLE>).
+Caches de résultats et mémoire de traduction désactivés. Un moteur qui ne
+se charge pas est signalé et sauté (pas de repli sur torch, qui
+donnerait un accord parfait trompeur).
+"""
+import argparse
+import difflib
+import io
+import json
+import os
+import statistics
+import time
+
+os.environ["NLP_CACHE"] = "0"
+os.environ["NLP_TRANSLATION_MEMORY"] = "0"
+
+from benchmarks._common import corpus_files, read_bytes  # noqa: E402
+
+
+def _detector(backend):
+    from document_type_detector import DocumentTypeDetector
+    det = DocumentTypeDetector(backend=backend)
+    det.CASCADE = False                      # toujours le modèle
+    return lambda text: det.detect_detailed([text])[0]["scores"]
+
+
+def _translation(backend):
+    from langage_analyser import LanguageAnalyzer
+    la = LanguageAnalyzer(backend=backend)
+    return lambda text: la.translate_text(text)
+
+
+def _summary(backend):
+    from document_summarizer import DocumentSummarizer
+    ds = DocumentSummarizer(backend=backend)
+
+    def run(text):
+        raw, ok = ds._raw_summary(text, 150, 20, False)
+        if not ok and text.strip():
+            raise RuntimeError(raw)              # erreur rendue en texte par _raw_summary
+        return raw
+    return run
+
+
+MODELS = {"detector": _detector, "translation": _translation, "summary": _summary}
+
+
+def agreement(model: str, ref, out) -> dict:
+    if model == "detector":
+        top = float(ref[0][0] == out[0][0])
+        ref_s, out_s = dict(ref), dict(out)
+        diff = statistics.mean(abs(ref_s[k] - out_s.get(k, 0.0)) for k in ref_s)
+        return {"top1": top, "score_diff": diff}
+    return {"similarity": difflib.SequenceMatcher(None, ref, out).ratio()}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backends", nargs="+", default=["torch", "int8", "onnx"])
+    ap.add_argument("--models", nargs="+", default=list(MODELS), choices=list(MODELS))
+    ap.add_argument("--json", help="écrit aussi les résultats dans ce fichier")
+    args = ap.parse_args()
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+
+    from ocr_processor import OCRProcessor
+    ocr = OCRProcessor()
+    texts = [ocr.extract_text(io.BytesIO(read_bytes(p)), p.rsplit(".", 1)[-1])
+             for p in corpus_files()]
+    texts = [t for t in texts if t.strip()]
+
+    report = []
+    for model in args.models:
+        reference = None
+        for backend in backends:
+            t0 = time.perf_counter()
+            run = MODELS[model](backend)
+            try:
+                outputs = [run(texts[0])]        # premier appel : chargement du modèle
+            except RuntimeError as e:            # moteur indisponible (voir load_pipeline)
+                print(f"model={model}  backend={backend}  indisponible : {e}", flush=True)
+                report.append({"model": model, "backend": backend, "error": str(e)})
+                continue
+            load = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            outputs += [run(t) for t in texts[1:]]
+            latency = (time.perf_counter() - t0) / max(1, len(texts) - 1)
+            if reference is None:
+                reference = outputs
+            scores = [agreement(model, r, o) for r, o in zip(reference, outputs)]
+            row = {"model": model, "backend": backend, "load_s": round(load, 2),
+                   "latency_s": round(latency, 3)}
+            row.update({k: round(statistics.mean(s[k] for s in scores), 3) for k in scores[0]})
+            report.append(row)
+            print("  ".join(f"{k}={v}" for k, v in row.items()), flush=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
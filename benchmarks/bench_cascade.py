@@ -0,0 +1,67 @@
+# benchmarks/bench_cascade.py – taux de décision et accord de la cascade règles → modèle
+"""
+Usage : python -m benchmarks.bench_cascade [--margin 0.5] [--min-hits 3]
+
+Pour chaque document de Documents/ : décision de l'étage « règles » (s'il
+tranche), décision du modèle zero-shot seul, et temps du modèle évité.
+Affiche le taux de documents tranchés par les règles et leur accord avec
+le modèle. Le cache de résultats est désactivé pour le détecteur.
+"""
+import argparse
+import io
+import os
+import time
+
+from benchmarks._common import corpus_files, read_bytes
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--margin", type=float, default=None)
+    ap.add_argument("--min-hits", type=int, default=None)
+    args = ap.parse_args()
+
+    from ocr_processor import OCRProcessor
+    import document_type_detector as dtd
+    from result_cache import ResultCache
+
+    ocr = OCRProcessor()
+    texts = {}
+    for path in corpus_files():
+        name = os.path.basename(path)
+        texts[name] = ocr.extract_text(io.BytesIO(read_bytes(path)), name.rsplit(".", 1)[-1])
+
+    dtd.cache = ResultCache(None)          # mesure du calcul réel
+    det = dtd.DocumentTypeDetector()
+    if args.margin is not None:
+        det.CASCADE_MARGIN = args.margin
+    if args.min_hits is not None:
+        det.CASCADE_MIN_HITS = args.min_hits
+
+    decided = agree = 0
+    saved = rules_time = 0.0
+    for name, text in texts.items():
+        t0 = time.perf_counter()
+        rules = det._rule_decision(det._clean(text))
+        t1 = time.perf_counter()
+        windows = det._windows(det._clean(text))
+        model = det._aggregate([c for _, c in windows], det._nli_scores([ids for ids, _ in windows]))
+        t2 = time.perf_counter()
+        rules_time += t1 - t0
+        top_model = model[0][0] if model else "-"
+        if rules is not None:
+            decided += 1
+            saved += t2 - t1
+            agree += rules[0][0] == top_model
+        verdict = rules[0][0] if rules else "(ambigu → modèle)"
+        print(f"{name:<28} règles : {verdict:<22} modèle : {top_model:<20} "
+              f"{(t1 - t0) * 1000:6.2f} ms / {t2 - t1:6.2f} s")
+
+    n = len(texts)
+    print(f"\nTranchés par les règles : {decided}/{n} ({decided / n:.0%}), "
+          f"accord avec le modèle : {agree}/{decided or 1}")
+    print(f"Temps modèle évité : {saved:.2f} s (coût des règles : {rules_time * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
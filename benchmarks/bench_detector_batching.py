@@ -0,0 +1,70 @@
+# benchmarks/bench_detector_batching.py – moteur NLI par lots vs boucle par fenêtre
+"""
+Usage : python -m benchmarks.bench_detector_batching [--repeat 4] [--batch-size 32]
+
+Sur le texte OCR des documents de Documents/ (répété `repeat` fois pour
+simuler des documents longs), compare l'ancienne boucle — un appel du
+pipeline zero-shot par fenêtre, sur le texte de la fenêtre — au moteur par
+lots de DocumentTypeDetector, qui part directement des ids de tokens :
+temps, écart maximal entre les scores et part de la tokenisation.
+"""
+import argparse
+import io
+import os
+import time
+
+from benchmarks._common import corpus_files, read_bytes
+
+
+def legacy_nli(det, chunks):
+    """Ancienne méthode : self.clf(chunk, CANDIDATES) fenêtre par fenêtre."""
+    import numpy as np
+    out = np.empty((len(chunks), len(det.CANDIDATES)))
+    pos = {c: j for j, c in enumerate(det.CANDIDATES)}
+    for i, chunk in enumerate(chunks):
+        res = det.clf(chunk, det.CANDIDATES, multi_label=False)
+        for lbl, sc in zip(res["labels"], res["scores"]):
+            out[i, pos[lbl]] = sc
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=4)
+    ap.add_argument("--batch-size", type=int, default=32)
+    args = ap.parse_args()
+
+    from ocr_processor import OCRProcessor
+    from document_type_detector import DocumentTypeDetector
+
+    ocr = OCRProcessor()
+    det = DocumentTypeDetector(batch_size=args.batch_size)
+    t_old = t_new = 0.0
+    worst = 0.0
+    for path in corpus_files():
+        name = os.path.basename(path)
+        text = ocr.extract_text(io.BytesIO(read_bytes(path)), name.rsplit(".", 1)[-1])
+        windows = det._windows(det._clean("\n".join([text] * args.repeat)))
+        if not windows:
+            continue
+        chunks = [chunk for _, chunk in windows]
+        t0 = time.perf_counter()
+        old = legacy_nli(det, chunks)
+        t1 = time.perf_counter()
+        new = det._nli_scores([ids for ids, _ in windows])
+        t2 = time.perf_counter()
+        diff = float(abs(old - new).max())
+        worst = max(worst, diff)
+        t_old += t1 - t0
+        t_new += t2 - t1
+        print(f"{name:<28} {len(chunks):3d} fenêtres  boucle {t1 - t0:6.2f} s  "
+              f"lots {t2 - t1:6.2f} s  écart max {diff:.2e}")
+    print(f"\nTotal : boucle {t_old:.2f} s, lots {t_new:.2f} s "
+          f"(x{t_old / max(t_new, 1e-9):.2f}), écart max {worst:.2e}")
+    # part de chaque étape du moteur (tokenisation comprise)
+    total = sum(det.timings.values()) or 1
+    print("Répartition : " + ", ".join(f"{k} {v / total:.1%}" for k, v in det.timings.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/bench_heuristics.py – moteur heuristique vectorisé vs boucle _adj
+"""
+Usage : python -m benchmarks.bench_heuristics [--windows 300] [--seed 0]
+
+Micro-benchmark sans modèle : fenêtres synthétiques (vocabulaire des alias
+et des marqueurs + mots de remplissage) et scores NLI aléatoires. Compare
+l'ancienne agrégation — `_adj` appelé pour chaque label de chaque fenêtre —
+au moteur vectorisé, et vérifie que les scores sont identiques bit à bit
+(KW_PHRASES désactivé, comme l'ancien code). L'identité est aussi vérifiée
+par tests/test_heuristic_engine.py, qui réutilise la référence ci-dessous.
+"""
+import argparse
+import collections
+import random
+import time
+
+import numpy as np
+
+from document_type_detector import DocumentTypeDetector
+
+FILLER = ("le la des un une et pour avec sur dans par au montant date total page "
+          "nom adresse paris vous nous est sont").split()
+
+
+# ─── ancienne implémentation, conservée ici comme référence ───
+def legacy_adj(d, lbl, chunk, s):
+    if lbl in d.ALIASES["facture"]:
+        return s * d.BOOST_INV
+    if lbl in d.ALIASES["relevé bancaire"]:
+        return s * d.BOOST_BANK if len(d._rx_bank.findall(chunk)) >= 2 else s
+    if lbl in d.ALIASES["contrat"]:
+        nb_c, nb_j = len(d._rx_ctr.findall(chunk)), len(d._rx_jur.findall(chunk))
+        if nb_j >= 3 and nb_c <= 1:
+            return s * d.PEN_CONTR_JUR
+        if nb_c >= 2:
+            return s * d.BOOST_CONTRAT
+        return s
+    if lbl in d.ALIASES["document juridique"]:
+        return s * d.BOOST_JUR if len(d._rx_jur.findall(chunk)) >= 2 else s
+    if lbl in d.ALIASES["sujet d'évaluation"]:
+        nb_e = len(d._rx_exam.findall(chunk))
+        return s * d.BOOST_EXAM if nb_e >= 2 else s * d.PEN_EXAM_FEW
+    if lbl in d.ALIASES["lettre"]:
+        nb_l = len(d._rx_let.findall(chunk))
+        if nb_l == 0:
+            return s * d.PEN_LET_NO_MARK
+        if len(d._rx_bank.findall(chunk)) >= 2:
+            return s * d.PEN_LET_BANK
+        if len(d._rx_ctr.findall(chunk)) >= 2:
+            return s * d.PEN_LET_CONTR
+        if nb_l >= 2:
+            return s * d.BOOST_LETTER
+        return s
+    return s
+
+
+def legacy_aggregate(d, chunks, nli):
+    raw = collections.defaultdict(float)
+    for chunk, sc_vec in zip(chunks, nli):
+        words = set(d._rx_w.findall(chunk))
+        kw = {a: len(words & {a}) * d.KW for a in d.CANDIDATES}
+        for lbl, sc in zip(d.CANDIDATES, sc_vec.tolist()):
+            raw[lbl] += legacy_adj(d, lbl, chunk, sc + kw.get(lbl, 0))
+    scores = [(c, sum(raw[a] for a in alias)) for c, alias in d.ALIASES.items()]
+    scores.sort(key=lambda x: x[1], reverse=True)
+    tot = sum(s for _, s in scores) or 1
+    return [(l, s / tot) for l, s in scores]
+
+
+def synthetic_chunks(n, rng):
+    vocab = DocumentTypeDetector.CANDIDATES + ["salaire", "juridiction", "bareme", "à l'attention"]
+    return [" ".join(rng.choice(vocab) if rng.random() < 0.15 else rng.choice(FILLER)
+                     for _ in range(rng.randint(150, 300))) for _ in range(n)]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--windows", type=int, default=300)
+    ap.add_argument("--docs", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    nrng = np.random.default_rng(args.seed)
+    det = DocumentTypeDetector()
+    det.KW_PHRASES = False
+    n_c = len(det.CANDIDATES)
+
+    docs = []
+    for _ in range(args.docs):
+        chunks = synthetic_chunks(args.windows // args.docs, rng)
+        logits = nrng.normal(size=(len(chunks), n_c)).astype(np.float32)
+        nli = np.exp(logits) / np.exp(logits).sum(-1, keepdims=True)
+        docs.append((chunks, nli))
+
+    t0 = time.perf_counter()
+    old = [legacy_aggregate(det, c, s) for c, s in docs]
+    t1 = time.perf_counter()
+    new = [det._aggregate(c, s) for c, s in docs]
+    t2 = time.perf_counter()
+
+    identical = all(o == n for o, n in zip(old, new))
+    print(f"{args.windows} fenêtres × {n_c} labels")
+    print(f"  boucle _adj     : {(t1 - t0) * 1000:8.1f} ms")
+    print(f"  moteur vectorisé: {(t2 - t1) * 1000:8.1f} ms  (x{(t1 - t0) / max(t2 - t1, 1e-9):.1f})")
+    print(f"  scores identiques bit à bit : {'oui' if identical else 'NON'}")
+    if not identical:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# benchmarks/bench_lang_id.py – identification de langue : n-grammes contre langdetect
+"""
+Usage : python -m benchmarks.bench_lang_id [--repeat 3] [--min-agreement 0.97]
+
+Compare lang_id.detect (index de n-grammes, échantillon borné, repli sur
+langdetect) à langdetect seul, sur :
+- les textes OCR des documents de Documents/ (textes d'exemple intégrés si
+  l'OCR est indisponible) et leurs paragraphes ;
+- ces textes mis bout à bout (×16), et bruités (5 % de caractères
+  remplacés, comme une OCR médiocre) ;
+- des lignes courtes en français et en anglais (en-têtes, formules) ;
+- quelques phrases en d'autres langues.
+Affiche latence moyenne, accélération, accord avec langdetect et part des
+textes repassés par langdetect ; code 1 si l'accord est sous le seuil.
+"""
+import argparse
+import io
+import random
+import re
+import sys
+import time
+
+from benchmarks._common import corpus_files, read_bytes
+
+# lignes courtes comme en sort l'OCR (en-têtes, formules, montants) : peu
+# d'indices, les langues voisines (ca, ro, it…) sont les pièges
+SHORT_SNIPPETS = [
+    "Merci de votre confiance et à bientôt.",
+    "Date limite de paiement : le quinze avril.",
+    "Bonjour Madame, je vous remercie pour votre réponse rapide.",
+    "Veuillez trouver ci-joint la facture du mois de mars.",
+    "Fait à Paris, le 3 mars 2024.",
+    "Objet : résiliation du contrat d'abonnement",
+    "Nous restons à votre disposition pour tout renseignement.",
+    "Je vous prie d'agréer mes salutations distinguées.",
+    "Adresse de livraison : 12 rue des Lilas, Lyon",
+    "Pièces jointes : relevé d'identité bancaire",
+    "FACTURE N° 2024-017\nDate : 12/03/2024\nClient : Société Martin\nMontant TTC : 1 250,00 €",
+    "Règlement par virement bancaire sous trente jours.",
+    "Thank you for your prompt reply.",
+    "Please find attached the invoice for March.",
+    "Payment is due within thirty days of receipt.",
+    "Dear Sir or Madam, I am writing to confirm our meeting.",
+    "Total amount due before June 30.",
+    "Signed in London on 3 March 2024.",
+    "INVOICE No. 2024-017\nDate: 03/12/2024\nCustomer: Martin Ltd\nTotal due: $1,250.00",
+    "We remain at your disposal for any further information.",
+]
+
+OTHER_LANGUAGES = [
+    "Der Vertrag tritt mit der Unterzeichnung durch beide Parteien in Kraft und gilt für ein Jahr.",
+    "El presente contrato entra en vigor en la fecha de su firma por ambas partes y tiene una duración de un año.",
+    "Il presente contratto entra in vigore alla data della firma di entrambe le parti e ha la durata di un anno.",
+    "Deze overeenkomst treedt in werking op de datum van ondertekening door beide partijen.",
+    "O presente contrato entra em vigor na data da sua assinatura por ambas as partes e tem a duração de um ano.",
+]
+
+
+def corpus_texts() -> list[str]:
+    try:
+        from ocr_processor import OCRProcessor
+        ocr = OCRProcessor()
+        texts = [ocr.extract_text(io.BytesIO(read_bytes(p)), p.rsplit(".", 1)[-1]) for p in corpus_files()]
+        return [t for t in texts if t.strip()]
+    except Exception as e:
+        from benchmarks.run_benchmarks import SAMPLES
+        print(f"OCR indisponible ({type(e).__name__}) : textes d'exemple intégrés.")
+        return list(SAMPLES)
+
+
+def noisy(text: str, rate: float, rng: random.Random) -> str:
+    alphabet = "abcdefghijklmnopqrstuvwxyz0123456789|!l1I"
+    return "".join(rng.choice(alphabet) if c.isalnum() and rng.random() < rate else c for c in text)
+
+
+def datasets() -> dict[str, list[str]]:
+    texts = corpus_texts()
+    rng = random.Random(0)
+    paragraphs = [p.strip() for t in texts for p in re.split(r"\n\s*\n", t) if len(p.strip()) > 40]
+    return {
+        "documents": texts,
+        "paragraphes": paragraphs,
+        "phrases_courtes": SHORT_SNIPPETS,
+        "longs_x16": ["\n\n".join(texts[(i + k) % len(texts)] for k in range(16)) for i in range(len(texts))],
+        "bruités_5%": [noisy(t, 0.05, rng) for t in texts],
+        "autres_langues": OTHER_LANGUAGES,
+    }
+
+
+def run(fn, texts: list[str], repeat: int) -> tuple[list, float]:
+    outputs = []
+    for t in texts:
+        try:
+            outputs.append(fn(t))
+        except Exception as e:               # LangDetectException : pas d'indice
+            outputs.append(type(e).__name__)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for t in texts:
+            try:
+                fn(t)
+            except Exception:
+                pass
+    return outputs, (time.perf_counter() - t0) / (repeat * len(texts))
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--min-agreement", type=float, default=0.97)
+    args = ap.parse_args()
+
+    import lang_id
+    from langdetect import DetectorFactory, detect as lang_detect
+    DetectorFactory.seed = 0
+    fallback = []
+
+    def fast(text):
+        lang, _, path = lang_id.detect_detailed(text)
+        if path == "langdetect":
+            fallback.append(text)
+        return lang
+
+    # chargements (profils langdetect, index n-grammes) hors mesure
+    t0 = time.perf_counter()
+    lang_detect("Chargement des profils.")
+    print(f"chargement langdetect : {time.perf_counter() - t0:.2f} s")
+    t0 = time.perf_counter()
+    lang_id.identifier.index
+    print(f"chargement index      : {time.perf_counter() - t0:.2f} s\n")
+
+    agree_all, total = 0, 0
+    for name, texts in datasets().items():
+        if not texts:
+            continue
+        ref, t_ref = run(lang_detect, texts, args.repeat)
+        fallback.clear()
+        out, t_fast = run(fast, texts, args.repeat)
+        n_fallback = len(fallback) // (args.repeat + 1)
+        agree = sum(a == b for a, b in zip(ref, out))
+        agree_all += agree
+        total += len(texts)
+        print(f"{name:<15} {len(texts):>3} textes  langdetect {t_ref * 1e3:8.2f} ms  "
+              f"n-grammes {t_fast * 1e3:7.2f} ms  × {t_ref / t_fast:6.1f}  "
+              f"accord {agree / len(texts):6.1%}  repli {n_fallback / len(texts):6.1%}")
+        for text, a, b in zip(texts, ref, out):
+            if a != b:
+                print(f"    désaccord : langdetect={a} n-grammes={b}  « {text[:60]!r} »")
+
+    rate = agree_all / max(1, total)
+    print(f"\naccord global : {rate:.1%} (seuil {args.min_agreement:.0%})")
+    return 0 if rate >= args.min_agreement else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
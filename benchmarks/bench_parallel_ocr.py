@@ -0,0 +1,52 @@
+# benchmarks/bench_parallel_ocr.py – débit de l'OCR multi-pages selon le nombre de workers
+"""
+Usage : python -m benchmarks.bench_parallel_ocr [--backend easyocr|tesseract]
+                                                [--pages 16] [--workers 1 2 4]
+
+Construit un PDF synthétique à partir des images de Documents/, puis mesure
+pages/s et l'accélération par rapport à 1 worker. Le cache de résultats est
+désactivé pour mesurer le calcul réel.
+"""
+import argparse
+import io
+import os
+import time
+
+os.environ["NLP_CACHE"] = "0"
+
+from benchmarks._common import make_pdf  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backend", choices=["easyocr", "tesseract"], default="easyocr")
+    ap.add_argument("--pages", type=int, default=16)
+    ap.add_argument("--workers", type=int, nargs="+",
+                    default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = ap.parse_args()
+
+    if args.backend == "easyocr":
+        from ocr_processor import OCRProcessor
+    else:
+        from ocr_processor_tesseract import OCRProcessor
+
+    pdf = make_pdf(args.pages)
+    reference, base = None, None
+    print(f"{'workers':>7} {'temps (s)':>10} {'pages/s':>8} {'accél.':>7}")
+    for w in args.workers:
+        ocr = OCRProcessor(workers=w)
+        # tour de chauffe : démarrage des processus et chargement des modèles
+        list(ocr.iter_text_from_pdf(io.BytesIO(make_pdf(min(w, args.pages)))))
+        t0 = time.perf_counter()
+        pages = list(ocr.iter_text_from_pdf(io.BytesIO(pdf)))
+        dt = time.perf_counter() - t0
+        base = base or dt
+        if reference is None:
+            reference = pages
+        elif pages != reference:
+            print(f"  ⚠️ résultat différent de l'exécution séquentielle (workers={w})")
+        print(f"{w:>7} {dt:>10.2f} {args.pages / dt:>8.2f} {base / dt:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# benchmarks/bench_preprocessing.py – précision / latence du prétraitement OCR sur Documents/
+"""
+Usage : python -m benchmarks.bench_preprocessing [--backend easyocr|tesseract]
+                                                 [--presets off fast full]
+
+Pour chaque document de Documents/ et chaque préréglage : temps total,
+temps par étape (prétraitement, OCR) et similarité du texte obtenu avec
+celui du préréglage "off" (référence pleine résolution, ratio difflib).
+Le cache de résultats est désactivé.
+"""
+import argparse
+import difflib
+import io
+import os
+import time
+
+os.environ["NLP_CACHE"] = "0"
+
+from benchmarks._common import corpus_files, read_bytes  # noqa: E402
+from image_preprocessing import PreprocessConfig  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backend", choices=["easyocr", "tesseract"], default="easyocr")
+    ap.add_argument("--presets", nargs="+", default=["off", "fast", "full"])
+    args = ap.parse_args()
+
+    if args.backend == "easyocr":
+        from ocr_processor import OCRProcessor
+    else:
+        from ocr_processor_tesseract import OCRProcessor
+
+    totals = {p: {"time": 0.0, "sim": 0.0} for p in args.presets}
+    files = corpus_files()
+    for path in files:
+        name = os.path.basename(path)
+        ext = name.rsplit(".", 1)[-1]
+        data = read_bytes(path)
+        reference = None
+        for preset in args.presets:
+            ocr = OCRProcessor(preprocess=PreprocessConfig.preset(preset))
+            ocr.extract_text(io.BytesIO(data), ext)          # chauffe (modèle)
+            ocr.timings.clear()
+            t0 = time.perf_counter()
+            text = ocr.extract_text(io.BytesIO(data), ext)
+            dt = time.perf_counter() - t0
+            reference = reference if reference is not None else text
+            sim = difflib.SequenceMatcher(None, reference, text).ratio()
+            totals[preset]["time"] += dt
+            totals[preset]["sim"] += sim
+            stages = " ".join(f"{k}={v:.2f}" for k, v in sorted(ocr.timings.items()))
+            print(f"{name:<28} {preset:<5} {dt:6.2f} s  sim={sim:.3f}  {stages}")
+
+    print("\nMoyennes :")
+    for preset, t in totals.items():
+        print(f"  {preset:<5} {t['time'] / len(files):6.2f} s/doc  similarité={t['sim'] / len(files):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# benchmarks/bench_service.py – débit du service d'inférence selon la concurrence
+"""
+Usage : python -m benchmarks.bench_service [--clients 1 8 32] [--requests 64]
+                                           [--endpoint translate] [--max-wait-ms 10]
+
+Lance inference_service.py en local (caches et mémoire de traduction
+désactivés), une fois sans micro-lots (max_batch = 1) puis avec, et envoie
+les requêtes de `clients` clients simultanés. Requêtes : paragraphes des
+textes OCR des documents de Documents/. Affiche requêtes/s, latences p50 /
+p95 et taille moyenne des lots, puis le gain du regroupement.
+"""
+import argparse
+import io
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks._common import corpus_files, read_bytes
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_service(port: int, max_batch: int, max_wait_ms: float) -> subprocess.Popen:
+    env = {**os.environ, "NLP_CACHE": "0", "NLP_TRANSLATION_MEMORY": "0"}
+    proc = subprocess.Popen(
+        [sys.executable, "inference_service.py", "--port", str(port), "--max-batch", str(max_batch),
+         "--max-wait-ms", str(max_wait_ms), "--max-queue", "4096"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    from inference_service import InferenceClient
+    client = InferenceClient(f"http://127.0.0.1:{port}", timeout=5)
+    for _ in range(600):                     # préchargement des modèles
+        try:
+            client._call("/health")
+            return proc
+        except OSError:
+            time.sleep(0.5)
+    proc.kill()
+    raise RuntimeError("le service n'a pas démarré")
+
+
+def load(url: str, endpoint: str, texts: list[str], clients: int, n: int) -> dict:
+    from inference_service import InferenceClient
+    client = InferenceClient(url)
+    call = {"detect": client.detect, "translate": client.translate,
+            "summarize": client.summarize}[endpoint]
+
+    def one(k):
+        t = time.perf_counter()
+        call(texts[k % len(texts)])
+        return time.perf_counter() - t
+
+    call(texts[0])                           # préchauffage
+    # compteurs cumulés du service : seul l'écart de cette mesure compte
+    before = client.stats()["batchers"][endpoint]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(clients) as ex:
+        lat = sorted(ex.map(one, range(n)))
+    elapsed = time.perf_counter() - t0
+    after = client.stats()["batchers"][endpoint]
+    requests = after["requests"] - before["requests"]
+    batches = after["batches"] - before["batches"]
+    return {"rps": n / elapsed, "p50": statistics.median(lat),
+            "p95": lat[min(len(lat) - 1, int(0.95 * len(lat)))],
+            "mean_batch": round(requests / batches, 2) if batches else None}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    ap.add_argument("--requests", type=int, default=64, help="requêtes par mesure")
+    ap.add_argument("--endpoint", choices=["detect", "translate", "summarize"], default="translate")
+    ap.add_argument("--max-batch", type=int, default=16)
+    ap.add_argument("--max-wait-ms", type=float, default=10)
+    args = ap.parse_args()
+
+    from ocr_processor import OCRProcessor
+    ocr = OCRProcessor()
+    texts = []
+    for p in corpus_files():
+        text = ocr.extract_text(io.BytesIO(read_bytes(p)), p.rsplit(".", 1)[-1])
+        texts += [t.strip() for t in re.split(r"\n\s*\n", text) if len(t.strip()) > 40]
+
+    results = {}
+    for label, max_batch in (("sans lots", 1), ("micro-lots", args.max_batch)):
+        port = free_port()
+        proc = start_service(port, max_batch, args.max_wait_ms)
+        try:
+            for c in args.clients:
+                r = load(f"http://127.0.0.1:{port}", args.endpoint, texts, c, args.requests)
+                results[(label, c)] = r
+                print(f"{label:<11} {c:>3} client(s) : {r['rps']:7.2f} req/s  p50 {r['p50']:6.3f}s  "
+                      f"p95 {r['p95']:6.3f}s  lot moyen {r['mean_batch']}", flush=True)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    print()
+    for c in args.clients:
+        gain = results[("micro-lots", c)]["rps"] / results[("sans lots", c)]["rps"]
+        print(f"{c:>3} client(s) : débit × {gain:.2f} avec les micro-lots")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/bench_startup.py – démarrage à froid de l'application
+"""
+Usage : python -m benchmarks.bench_startup [--runs 5] [--max-import 1.5] [--max-render 6]
+
+Chaque mesure se fait dans un interpréteur neuf :
+- import : temps d'import des modules du projet chargés par app.py ;
+- rendu  : premier rendu de app.py (page OCR, sans document) via
+  streamlit.testing, si Streamlit est installé.
+Après chaque mesure, on vérifie qu'aucune dépendance lourde (torch,
+transformers, easyocr, language_tool_python) n'a été importée.
+
+Code de sortie 1 si une dépendance lourde est chargée ou si la médiane
+dépasse le seuil : à lancer avant de fusionner un changement d'imports.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("torch", "transformers", "easyocr", "language_tool_python")
+
+_IMPORT = """
+import json, sys, time
+t = time.perf_counter()
+import ocr_processor, langage_analyser, document_type_detector, document_summarizer
+import model_registry, result_cache, translation_memory, grammar_pool, inference_service, metrics
+import document, lang_id
+print(json.dumps({"seconds": time.perf_counter() - t,
+                  "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY,)
+
+_RENDER = """
+import json, sys, time
+t = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=120).run()
+print(json.dumps({"seconds": time.perf_counter() - t,
+                  "errors": [str(e.value) for e in at.exception],
+                  "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY,)
+
+
+def measure(code: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                         env={**os.environ, "NLP_PRELOAD": "0"})
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr else "échec")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run(name: str, code: str, runs: int, limit: float) -> bool:
+    results = [measure(code) for _ in range(runs)]
+    med = statistics.median(r["seconds"] for r in results)
+    heavy = sorted({m for r in results for m in r["heavy"]})
+    errors = sorted({e for r in results for e in r.get("errors", [])})
+    ok = med <= limit and not heavy and not errors
+    print(f"{name:<7} médiane {med:6.2f}s  (seuil {limit:.2f}s, {runs} essais)  "
+          f"modules lourds : {', '.join(heavy) or 'aucun'}  {'OK' if ok else 'RÉGRESSION'}")
+    for e in errors:
+        print(f"        erreur : {e}")
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--max-import", type=float, default=1.5, help="seuil de l'import (s)")
+    ap.add_argument("--max-render", type=float, default=6.0, help="seuil du premier rendu (s)")
+    args = ap.parse_args()
+
+    ok = run("import", _IMPORT, args.runs, args.max_import)
+    try:
+        import streamlit.testing.v1  # noqa: F401
+    except ImportError:
+        print("rendu   ignoré (Streamlit absent)")
+    else:
+        ok = run("rendu", _RENDER, args.runs, args.max_render) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# benchmarks/bench_summary.py – résumé map-reduce des documents longs
+"""
+Usage : python -m benchmarks.bench_summary [--sizes 1 4 16 64] [--max-calls 16]
+
+Texte long synthétique : texte OCR des documents de Documents/ répété
+`size` fois. Pour chaque taille : latence et nombre de générations du
+résumé en un appel (ancien comportement, entrée tronquée par le modèle)
+et du mode map-reduce. La latence du second doit rester bornée quand la
+taille croît. Le cache de résultats est désactivé.
+"""
+import argparse
+import io
+import os
+import time
+
+os.environ["NLP_CACHE"] = "0"
+
+from benchmarks._common import corpus_files, read_bytes  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1, 4, 16, 64])
+    ap.add_argument("--max-calls", type=int, default=16)
+    ap.add_argument("--batch-size", type=int, default=4)
+    args = ap.parse_args()
+
+    from ocr_processor import OCRProcessor
+    from document_summarizer import DocumentSummarizer
+
+    ocr = OCRProcessor()
+    base = "\n".join(
+        ocr.extract_text(io.BytesIO(read_bytes(p)), p.rsplit(".", 1)[-1]) for p in corpus_files())
+    single = DocumentSummarizer(max_calls=1)
+    mapred = DocumentSummarizer(max_calls=args.max_calls, batch_size=args.batch_size)
+    single.summarize_text("Préchauffage du modèle.")   # chargement hors mesure
+
+    print(f"{'taille':>6} {'tokens':>8} {'1 appel':>9} {'map-reduce':>11} {'générations':>12}")
+    for size in args.sizes:
+        text = "\n".join([base] * size)
+        n_tokens = len(single.pipe.tokenizer(text)["input_ids"])
+        t0 = time.perf_counter()
+        single.summarize_text(text, max_length=150)
+        t1 = time.perf_counter()
+        mapred.summarize_text(text, max_length=150)
+        t2 = time.perf_counter()
+        print(f"{size:>6} {n_tokens:>8} {t1 - t0:>8.2f}s {t2 - t1:>10.2f}s {mapred.last_calls:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_translation.py – découpage linéaire et traduction par lots
+"""
+Usage : python -m benchmarks.bench_translation [--sizes 1 4 16] [--batch-size 8]
+
+Texte long synthétique : texte OCR des documents de Documents/ répété
+`size` fois. Compare :
+- l'ancien découpage (re-tokenisation du tampon à chaque phrase, coût
+  quadratique) au découpage linéaire de LanguageAnalyzer ;
+- la traduction segment par segment à la traduction par lots.
+Le cache de résultats est désactivé.
+"""
+import argparse
+import io
+import os
+import re
+import time
+
+os.environ["NLP_CACHE"] = "0"
+
+from benchmarks._common import corpus_files, read_bytes  # noqa: E402
+from langage_analyser import _CHUNK_MARGIN, _MAX_MODEL_LEN  # noqa: E402
+
+
+def legacy_split(text, tokenizer):
+    """Ancien _smart_split : le tampon entier est re-tokenisé à chaque phrase."""
+    parts, buffer = [], ""
+    for sent in re.split(r'(?<=[.!?])\s+', text):
+        candidate = (buffer + " " + sent).strip()
+        if len(tokenizer(candidate)["input_ids"]) < _CHUNK_MARGIN:
+            buffer = candidate
+        else:
+            if buffer:
+                parts.append(buffer)
+            buffer = sent
+    if buffer:
+        parts.append(buffer)
+    return parts
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1, 4, 16])
+    ap.add_argument("--batch-size", type=int, default=8)
+    ap.add_argument("--no-translate", action="store_true", help="ne mesure que le découpage")
+    args = ap.parse_args()
+
+    from ocr_processor import OCRProcessor
+    from langage_analyser import LanguageAnalyzer
+
+    ocr = OCRProcessor()
+    base = "\n".join(
+        ocr.extract_text(io.BytesIO(read_bytes(p)), p.rsplit(".", 1)[-1]) for p in corpus_files())
+    la = LanguageAnalyzer(batch_size=args.batch_size)
+    lang = la.detect_language(base)
+    model, tok = (la.en_fr, la.en_tok) if lang == "en" else (la.fr_en, la.fr_tok)
+
+    print(f"{'taille':>6} {'car.':>8} {'segments':>8} {'découpe avant':>14} {'après':>8}"
+          + ("" if args.no_translate else f" {'trad. seq.':>10} {'par lots':>9}"))
+    for size in args.sizes:
+        text = "\n".join([base] * size)
+        t0 = time.perf_counter()
+        old = legacy_split(text, tok)
+        t1 = time.perf_counter()
+        new = la._smart_split(text, tok)
+        t2 = time.perf_counter()
+        line = f"{size:>6} {len(text):>8} {len(new):>8} {t1 - t0:>13.2f}s {t2 - t1:>7.2f}s"
+        if len(old) != len(new):
+            line += f"  (ancien : {len(old)} segments)"
+        if not args.no_translate:
+            t3 = time.perf_counter()
+            for chunk in new:
+                model(chunk, max_length=_MAX_MODEL_LEN, truncation=True)
+            t4 = time.perf_counter()
+            model(new, max_length=_MAX_MODEL_LEN, truncation=True, batch_size=args.batch_size)
+            t5 = time.perf_counter()
+            line += f" {t4 - t3:>9.2f}s {t5 - t4:>8.2f}s"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+# benchmarks/run_benchmarks.py – suite de mesures par étape, comparée à une référence
+"""
+Usage : python -m benchmarks.run_benchmarks [--stages ocr_easyocr translate ...]
+                                            [--scales 4 16] [--repeat 3] [--tiny]
+                                            [--baseline benchmarks/baseline.json]
+                                            [--save-baseline benchmarks/baseline.json]
+
+Mesure chaque étape du pipeline dans un processus neuf (caches de résultats
+et mémoire de traduction désactivés) :
+- ocr_easyocr, ocr_tesseract : OCRProcessor.extract_text ;
+- lang_detect, translate     : LanguageAnalyzer.detect_language / translate_text ;
+- detect_type                : DocumentTypeDetector.detect_document_type ;
+- summarize                  : DocumentSummarizer.summarize_text.
+Jeux de données : "corpus" (documents de Documents/, leur texte OCR pour les
+étapes texte) et "long_xN" pour chaque N de --scales (N textes du corpus
+bout à bout, ou PDF de N pages pour l'OCR).
+
+Par étape et jeu : premier appel (chargement du modèle compris pour le
+premier jeu), latences à chaud p50 / p95 / moyenne sur --repeat passes,
+éléments/s et pic de mémoire du processus (RSS). Résultats en JSON dans
+benchmarks/results/ (ou --output) avec commit, machine et modèles utilisés.
+
+--tiny remplace les modèles par de petits modèles construits localement
+(benchmarks/tiny_models.py) : mesure rapide et sans réseau, utile en CI,
+comparable seulement à une référence elle aussi obtenue avec --tiny.
+--baseline : code de sortie 1 si une latence p50 ou un pic de mémoire
+dépasse la référence de plus de --tolerance (défaut 20 %) et, pour la
+latence, d'au moins --min-delta secondes.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+STAGES = ("ocr_easyocr", "ocr_tesseract", "lang_detect", "translate", "detect_type", "summarize")
+OCR_STAGES = ("ocr_easyocr", "ocr_tesseract")
+
+# textes de repli si l'OCR du corpus est impossible (easyocr absent)
+SAMPLES = [
+    "FACTURE N° 2023-118\nDate : 12/03/2023\nClient : Société Martin SARL\n"
+    "Désignation : maintenance annuelle du parc informatique\nTotal HT : 1 250,00 €\n"
+    "TVA 20 % : 250,00 €\nTotal TTC : 1 500,00 €\nPaiement à 30 jours par virement.",
+    "CONTRAT DE PRESTATION DE SERVICES\nEntre les soussignés, la société Durand, ci-après "
+    "le Prestataire, et la société Leroy, ci-après le Client, il a été convenu ce qui suit. "
+    "Article 1 : le Prestataire s'engage à fournir les services décrits en annexe. "
+    "Article 2 : le présent contrat est conclu pour une durée d'un an renouvelable.",
+    "SERVICE AGREEMENT\nThis agreement is entered into between Acme Corp and the Client. "
+    "The provider shall deliver the services described in Schedule A. Payment is due within "
+    "thirty days of invoice. Either party may terminate this agreement with a written notice.",
+    "Madame, Monsieur,\nJe vous prie de trouver ci-joint les documents demandés lors de notre "
+    "entretien du 4 avril. Je reste à votre disposition pour tout renseignement complémentaire.\n"
+    "Veuillez agréer, Madame, Monsieur, l'expression de mes salutations distinguées.",
+]
+
+
+# ─────────────── worker (un processus par étape) ───────────────
+def _stage_fn(stage: str):
+    if stage == "ocr_easyocr":
+        from ocr_processor import OCRProcessor
+        ocr = OCRProcessor()
+        return lambda item: ocr.extract_text(io.BytesIO(item[0]), item[1])
+    if stage == "ocr_tesseract":
+        from ocr_processor_tesseract import OCRProcessor
+        ocr = OCRProcessor()
+        return lambda item: ocr.extract_text(io.BytesIO(item[0]), item[1])
+    if stage in ("lang_detect", "translate"):
+        from langage_analyser import LanguageAnalyzer
+        la = LanguageAnalyzer()
+        return la.detect_language if stage == "lang_detect" else la.translate_text
+    if stage == "detect_type":
+        from document_type_detector import DocumentTypeDetector
+        return DocumentTypeDetector().detect_document_type
+    if stage == "summarize":
+        from document_summarizer import DocumentSummarizer
+        ds = DocumentSummarizer()
+        return lambda text: ds.summarize_text(text, max_length=150)
+    raise ValueError(f"Étape inconnue : {stage}")
+
+
+def _datasets(stage: str, texts: list[str], scales: list[int]) -> dict[str, list]:
+    if stage in OCR_STAGES:
+        from benchmarks._common import corpus_files, make_pdf, read_bytes
+        data = {"corpus": [(read_bytes(p), p.rsplit(".", 1)[-1].lower()) for p in corpus_files()]}
+        data.update({f"long_x{s}": [(make_pdf(s), "pdf")] for s in scales})
+    else:
+        data = {"corpus": texts}
+        data.update({f"long_x{s}": ["\n\n".join(texts[i % len(texts)] for i in range(s))]
+                     for s in scales})
+    return data
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def worker(stage: str, texts: list[str], scales: list[int], repeat: int) -> dict:
+    """Mesures d'une étape ; une erreur est consignée par jeu, pas levée."""
+    out = {"datasets": {}}
+    t0 = time.perf_counter()
+    try:
+        fn = _stage_fn(stage)
+        out["setup_s"] = round(time.perf_counter() - t0, 3)
+        datasets = _datasets(stage, texts, scales)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}", "peak_rss_mb": _peak_rss_mb()}
+
+    for name, items in datasets.items():
+        try:
+            t = time.perf_counter()
+            fn(items[0])                       # premier appel (chargement compris)
+            first = time.perf_counter() - t
+            lat = []
+            t = time.perf_counter()
+            for _ in range(repeat):
+                for item in items:
+                    s = time.perf_counter()
+                    fn(item)
+                    lat.append(time.perf_counter() - s)
+            total = time.perf_counter() - t
+        except Exception as e:
+            out["datasets"][name] = {"error": f"{type(e).__name__}: {e}"}
+            continue
+        lat.sort()
+        out["datasets"][name] = {
+            "items": len(items), "first_s": round(first, 4),
+            "p50_s": round(statistics.median(lat), 4), "p95_s": round(_percentile(lat, 0.95), 4),
+            "mean_s": round(statistics.mean(lat), 4),
+            "items_per_s": round(len(lat) / total, 3) if total else None,
+            "rss_mb": _peak_rss_mb(),          # pic atteint à la fin de ce jeu
+        }
+    out["peak_rss_mb"] = _peak_rss_mb()
+    return out
+
+
+# ─────────────── orchestration ───────────────
+def _run_json(args: list[str], env: dict) -> dict:
+    proc = subprocess.run([sys.executable, *args], cwd=ROOT, env=env,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip()
+                           else f"code {proc.returncode}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def prepare_texts() -> list[str]:
+    """Texte OCR des documents du corpus (cache de résultats actif)."""
+    from benchmarks._common import corpus_files, read_bytes
+    from ocr_processor import OCRProcessor
+    ocr = OCRProcessor()
+    texts = [ocr.extract_text(io.BytesIO(read_bytes(p)), p.rsplit(".", 1)[-1]) for p in corpus_files()]
+    return [t for t in texts if t.strip()]
+
+
+def _git(*args: str) -> str | None:
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _meta(tiny: bool, env: dict, texts_source: str) -> dict:
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(), "platform": platform.platform(),
+        "cpus": os.cpu_count(), "tiny": tiny, "texts": texts_source,
+        "env": {k: v for k, v in sorted(env.items()) if k.startswith("NLP_")},
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float, min_delta: float = 0.005) -> list[str]:
+    """Régressions (p50 ou pic de mémoire) par rapport à la référence.
+
+    Un écart de latence inférieur à `min_delta` secondes est ignoré : sur les
+    étapes de quelques millisecondes, il n'est que du bruit de mesure.
+    """
+    if baseline["meta"].get("tiny") != report["meta"].get("tiny"):
+        print("Attention : référence et mesure n'utilisent pas les mêmes modèles (--tiny).")
+    problems = []
+    for stage, res in report["stages"].items():
+        ref = baseline["stages"].get(stage)
+        if not ref or "error" in ref or "error" in res:
+            continue
+        for name, cur in res["datasets"].items():
+            old = ref["datasets"].get(name)
+            if not old or "error" in old or "error" in cur:
+                continue
+            for key in ("p50_s", "rss_mb"):
+                if key == "p50_s" and cur[key] - old[key] < min_delta:
+                    continue
+                if old[key] and cur[key] > old[key] * (1 + tolerance):
+                    problems.append(f"{stage}/{name} {key} : {old[key]} → {cur[key]} "
+                                    f"(+{cur[key] / old[key] - 1:.0%})")
+    return problems
+
+
+def print_report(report: dict) -> None:
+    for stage, res in report["stages"].items():
+        if "error" in res:
+            print(f"{stage:<14} erreur : {res['error']}")
+            continue
+        for name, r in res["datasets"].items():
+            if "error" in r:
+                print(f"{stage:<14} {name:<9} erreur : {r['error']}")
+                continue
+            print(f"{stage:<14} {name:<9} 1er {r['first_s']:8.3f}s  p50 {r['p50_s']:8.3f}s  "
+                  f"p95 {r['p95_s']:8.3f}s  {r['items_per_s']:8.2f}/s  RSS {r['rss_mb']:7.1f} Mo")
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Mesures par étape du pipeline.")
+    ap.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    ap.add_argument("--scales", type=int, nargs="+", default=[4, 16],
+                    help="tailles des documents longs (textes ou pages du corpus)")
+    ap.add_argument("--repeat", type=int, default=3, help="passes à chaud par jeu")
+    ap.add_argument("--tiny", action="store_true", help="petits modèles locaux, sans réseau")
+    ap.add_argument("--output", help="fichier JSON (défaut : benchmarks/results/<date>-<commit>.json)")
+    ap.add_argument("--baseline", help="référence à comparer ; code 1 en cas de régression")
+    ap.add_argument("--save-baseline", help="copie aussi les résultats vers ce fichier")
+    ap.add_argument("--tolerance", type=float, default=0.2)
+    ap.add_argument("--min-delta", type=float, default=0.005,
+                    help="écart de latence (s) en deçà duquel on ne signale rien")
+    ap.add_argument("--worker", choices=STAGES, help=argparse.SUPPRESS)
+    ap.add_argument("--texts", help=argparse.SUPPRESS)
+    ap.add_argument("--prepare", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.prepare:
+        print(json.dumps(prepare_texts(), ensure_ascii=False))
+        return 0
+    if args.worker:
+        with open(args.texts, encoding="utf-8") as f:
+            texts = json.load(f)
+        print(json.dumps(worker(args.worker, texts, args.scales, max(1, args.repeat))))
+        return 0
+
+    env = dict(os.environ)
+    try:
+        texts, source = _run_json(["-m", "benchmarks.run_benchmarks", "--prepare"], env), "ocr"
+    except Exception as e:
+        print(f"OCR du corpus impossible ({e}) : textes d'exemple intégrés.")
+        texts = []
+    if not texts:
+        texts, source = SAMPLES, "samples"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        texts_path = os.path.join(tmp, "texts.json")
+        with open(texts_path, "w", encoding="utf-8") as f:
+            json.dump(texts, f, ensure_ascii=False)
+        if args.tiny:
+            env.update(_run_json(["-m", "benchmarks.tiny_models", texts_path], env))
+        # chaque étape mesurée sans cache, dans un processus neuf
+        env.update(NLP_CACHE="0", NLP_TRANSLATION_MEMORY="0")
+
+        report = {"meta": _meta(args.tiny, env, source), "stages": {}}
+        for stage in args.stages:
+            print(f"… {stage}", flush=True)
+            cmd = ["-m", "benchmarks.run_benchmarks", "--worker", stage, "--texts", texts_path,
+                   "--repeat", str(args.repeat), "--scales", *map(str, args.scales)]
+            try:
+                report["stages"][stage] = _run_json(cmd, env)
+            except Exception as e:
+                report["stages"][stage] = {"error": str(e)}
+
+    print_report(report)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{report['meta']['commit'] or 'nogit'}.json")
+    for path in filter(None, (output, args.save_baseline)):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nRésultats : {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(report, json.load(f), args.tolerance, args.min_delta)
+        for p in problems:
+            print(f"RÉGRESSION {p}")
+        if problems:
+            return 1
+        print(f"Aucune régression au-delà de {args.tolerance:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+# benchmarks/tiny_models.py – petits modèles locaux pour mesurer hors ligne
+"""
+Modèles minuscules, à poids aléatoires, construits localement (aucun
+téléchargement) pour faire tourner la suite de mesures sans réseau :
+
+- "nli"     : BERT 2 couches, étiquettes contradiction / neutral /
+              entailment, pour le détecteur zero-shot ;
+- "seq2seq" : T5 2 couches, pour la traduction et le résumé.
+
+Le tokenizer (WordPiece) est entraîné sur les textes fournis. Les sorties
+n'ont aucun sens : seuls les temps et la mémoire sont comparables d'une
+exécution à l'autre, pas avec les vrais modèles.
+"""
+from __future__ import annotations
+
+import os
+
+from result_cache import cache_dir
+
+SPECIALS = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "</s>"]
+
+
+def tiny_dir() -> str:
+    return os.path.join(cache_dir(), "tiny_models")
+
+
+def _tokenizer(texts: list[str], seq2seq: bool):
+    from tokenizers import Tokenizer, decoders, models, normalizers, pre_tokenizers, processors, trainers
+    from transformers import PreTrainedTokenizerFast
+
+    tok = Tokenizer(models.WordPiece(unk_token="[UNK]"))
+    tok.normalizer = normalizers.BertNormalizer(lowercase=True)
+    tok.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    tok.decoder = decoders.WordPiece()
+    tok.train_from_iterator(texts, trainers.WordPieceTrainer(vocab_size=2000, special_tokens=SPECIALS))
+    ids = {t: tok.token_to_id(t) for t in SPECIALS}
+    if seq2seq:
+        # comme T5 : fin de séquence seulement
+        tok.post_processor = processors.TemplateProcessing(
+            single="$A </s>", pair="$A </s> $B </s>", special_tokens=[("</s>", ids["</s>"])])
+    else:
+        tok.post_processor = processors.TemplateProcessing(
+            single="[CLS] $A [SEP]", pair="[CLS] $A [SEP] $B:1 [SEP]:1",
+            special_tokens=[("[CLS]", ids["[CLS]"]), ("[SEP]", ids["[SEP]"])])
+    return PreTrainedTokenizerFast(tokenizer_object=tok, unk_token="[UNK]", pad_token="[PAD]",
+                                   cls_token="[CLS]", sep_token="[SEP]", eos_token="</s>",
+                                   model_max_length=512)
+
+
+def build(texts: list[str]) -> dict[str, str]:
+    """Construit (une fois) les deux modèles ; renvoie {nom: dossier}."""
+    import torch
+    from transformers import BertConfig, BertForSequenceClassification, T5Config, T5ForConditionalGeneration
+
+    paths = {"nli": os.path.join(tiny_dir(), "nli"), "seq2seq": os.path.join(tiny_dir(), "seq2seq")}
+    if all(os.path.exists(os.path.join(p, "config.json")) for p in paths.values()):
+        return paths
+    torch.manual_seed(0)
+
+    tok = _tokenizer(texts, seq2seq=False)
+    labels = {0: "contradiction", 1: "neutral", 2: "entailment"}
+    nli = BertForSequenceClassification(BertConfig(
+        vocab_size=len(tok), hidden_size=64, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=128, max_position_embeddings=512, type_vocab_size=2,
+        pad_token_id=tok.pad_token_id, id2label=labels, label2id={v: k for k, v in labels.items()}))
+    nli.save_pretrained(paths["nli"])
+    tok.save_pretrained(paths["nli"])
+
+    tok = _tokenizer(texts, seq2seq=True)
+    t5 = T5ForConditionalGeneration(T5Config(
+        vocab_size=len(tok), d_model=64, d_ff=128, d_kv=16, num_layers=2, num_decoder_layers=2,
+        num_heads=2, pad_token_id=tok.pad_token_id, eos_token_id=tok.eos_token_id,
+        decoder_start_token_id=tok.pad_token_id))
+    t5.save_pretrained(paths["seq2seq"])
+    tok.save_pretrained(paths["seq2seq"])
+    return paths
+
+
+def env(paths: dict[str, str]) -> dict[str, str]:
+    """Variables qui substituent les petits modèles aux vrais, sans réseau."""
+    return {"NLP_DETECTOR_MODEL": paths["nli"], "NLP_MODEL_EN_FR": paths["seq2seq"],
+            "NLP_MODEL_FR_EN": paths["seq2seq"], "NLP_SUM_MODEL": paths["seq2seq"],
+            "HF_HUB_OFFLINE": "1", "TRANSFORMERS_OFFLINE": "1"}
+
+
+if __name__ == "__main__":
+    # python -m benchmarks.tiny_models textes.json : construit et affiche les variables
+    import json
+    import sys
+    with open(sys.argv[1], encoding="utf-8") as f:
+        print(json.dumps(env(build(json.load(f)))))
@@ -0,0 +1,108 @@
+# document.py – document partagé entre les étages du pipeline
+"""
+Un `Document` transporte le résultat de l'OCR (page par page) et tout ce
+que les étages en tirent, pour qu'aucun ne refasse le travail d'un autre :
+
+- `pages` / `text` : sortie de l'OCR (texte complet calculé une fois) ;
+- `derive(nom, calcul, **params)` : intermédiaires mémoïsés — texte
+  normalisé propre à un étage, ids de tokens par modèle, segments… ;
+- `result(étage, calcul, **params)` : résultats des étages (langue,
+  traduction, type, résumé), aussi visibles dans `results`.
+
+Les paramètres (modèle, moteur, longueurs…) font partie de la clé : un
+même document résumé avec deux longueurs donne deux entrées. Le texte ne
+change plus après la création, il n'y a donc rien à invalider.
+
+Les étages (LanguageAnalyzer, DocumentTypeDetector, DocumentSummarizer)
+acceptent indifféremment une chaîne ou un Document.
+"""
+from __future__ import annotations
+
+import functools
+import io
+import threading
+from typing import Any, Callable
+
+from result_cache import content_hash
+
+
+def _memo_key(name: str, params: dict) -> tuple:
+    return (name, tuple(sorted(params.items())))
+
+
+class Document:
+    """Texte OCR d'un document et résultats calculés, paresseux et mémoïsés."""
+
+    def __init__(self, text: str | None = None, pages: list[dict] | None = None,
+                 name: str | None = None):
+        if text is None and pages is None:
+            raise ValueError("Document : `text` ou `pages` requis")
+        # pages : [{"page": n, "source": "text" | "ocr", "text": ...}…]
+        self.pages = pages if pages is not None else [{"page": 1, "source": "text", "text": text}]
+        if text is not None:
+            self.__dict__["text"] = text
+        self.name = name
+        self.results: dict[str, Any] = {}
+        self._memo: dict[tuple, Any] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_file(cls, file_obj: io.BytesIO, file_extension: str, ocr=None,
+                  name: str | None = None) -> Document:
+        """OCR complet du fichier (EasyOCR par défaut) ; voir OCRProcessor.iter_pages."""
+        if ocr is None:
+            from ocr_processor import OCRProcessor
+            ocr = OCRProcessor()
+        return cls(pages=list(ocr.iter_pages(file_obj, file_extension)), name=name)
+
+    @functools.cached_property
+    def text(self) -> str:
+        return "\n\n".join(p["text"] for p in self.pages)
+
+    @functools.cached_property
+    def sha(self) -> str:
+        return content_hash(self.text)
+
+    # ------------------------------------------------------------------
+    def lookup(self, name: str, **params) -> tuple[bool, Any]:
+        """(trouvé, valeur) sans rien calculer."""
+        key = _memo_key(name, params)
+        with self._lock:
+            if key in self._memo:
+                return True, self._memo[key]
+        return False, None
+
+    def derive(self, name: str, compute: Callable[[], Any], **params) -> Any:
+        """Valeur intermédiaire `name`, calculée au premier appel seulement."""
+        key = _memo_key(name, params)
+        with self._lock:
+            if key not in self._memo:
+                self._memo[key] = compute()
+            return self._memo[key]
+
+    def store(self, stage: str, value: Any, **params) -> Any:
+        with self._lock:
+            self._memo[_memo_key(stage, params)] = value
+            self.results[stage] = value
+        return value
+
+    def result(self, stage: str, compute: Callable[[], Any], **params) -> Any:
+        """Résultat d'un étage (mémoïsé), dernier calculé exposé dans `results`."""
+        with self._lock:
+            found, value = self.lookup(stage, **params)
+            if not found:
+                value = compute()
+            return self.store(stage, value, **params)
+
+    # ------------------------------------------------------------------
+    @property
+    def language(self) -> str | None:
+        return self.results.get("language")
+
+    def as_dict(self) -> dict:
+        return {"name": self.name, "sha256": self.sha, "pages": len(self.pages),
+                "page_sources": [p["source"] for p in self.pages], "text": self.text,
+                **self.results}
+
+    def __repr__(self) -> str:
+        return f"Document({self.name or self.sha[:12]!r}, {len(self.pages)} page(s), {sorted(self.results)})"
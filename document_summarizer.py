@@ -1,26 +1,35 @@
-# document_summarizer.py  –  résumé FR fiable avec fallback si pas de Java
+# document_summarizer.py  –  résumé FR fiable, correction grammaticale hors du chemin critique
 from __future__ import annotations
-from transformers import pipeline
 import unicodedata
+import math
+import os
 import re
 import logging
+from concurrent.futures import Future
 
-# Modèle de résumé français
-_SUM_MODEL = "plguillou/t5-base-fr-sum-cnndm"
-
-# Essaye d'activer LanguageTool (nécessite Java); sinon on désactive la correction
-try:
-    import language_tool_python
-    _TOOL = language_tool_python.LanguageTool("fr")
-    _GRAMMAR_ENABLED = True
-    logging.info("LanguageTool activé pour correction grammaticale.")
-except (ModuleNotFoundError, OSError) as e:
-    _TOOL = None
-    _GRAMMAR_ENABLED = False
-    logging.warning(
-        "LanguageTool désactivé (pas de Java ou installation manquante). "
-        "Le résumé sera retourné sans correction grammaticale."
-    )
+from grammar_pool import pool as grammar
+from model_registry import registry
+from inference_backend import backend_for, load_pipeline, model_tag, require_backend
+from result_cache import cache
+from metrics import metrics
+from document import Document
+
+# Modèle de résumé français (NLP_SUM_MODEL pour en changer)
+_SUM_MODEL = os.environ.get("NLP_SUM_MODEL", "plguillou/t5-base-fr-sum-cnndm")
+_PREFIX = "summarize: "   # préfixe requis par T5
+
+# Documents longs (map-reduce) : segments d'au plus _CHUNK_TOKENS tokens
+# résumés par lots, puis résumé des résumés partiels. _MAX_CALLS borne le
+# nombre total de générations, donc la latence, quelle que soit la longueur.
+_CHUNK_TOKENS = int(os.environ.get("NLP_SUM_CHUNK_TOKENS", "480"))
+_MAX_CALLS    = int(os.environ.get("NLP_SUM_MAX_CALLS", "16"))
+_BATCH_SIZE   = int(os.environ.get("NLP_SUM_BATCH_SIZE", "4"))
+_LONG_MODE    = os.environ.get("NLP_SUM_LONG", "1") != "0"
+
+# préfixe des messages d'erreur rendus à la place d'un résumé
+ERROR_PREFIX = "⚠️ Erreur lors du résumé : "
+
+_rx_sentence = re.compile(r"(?<=[.!?;])\s+")
 
 def _clean(txt: str) -> str:
     """Nettoyage minimal : unicode, ponctuation non désirée, espaces."""
@@ -28,64 +37,371 @@ def _clean(txt: str) -> str:
     txt = re.sub(r"[^\w\s\.,;:!\?()€%/\-]", " ", txt)
     return re.sub(r"\s+", " ", txt).strip()
 
+def _split_chunks(text: str, tok, limit: int) -> list[str]:
+    """
+    Segments d'au plus `limit` tokens, coupés entre les phrases (une phrase
+    trop longue est elle-même coupée entre les mots). Une seule tokenisation
+    groupée des phrases : coût linéaire.
+    """
+    sents = [s for s in _rx_sentence.split(text) if s.strip()]
+    if not sents:
+        return []
+    lengths = [len(ids) for ids in tok(sents, add_special_tokens=False)["input_ids"]]
+    metrics.count("tokens", sum(lengths), stage="summary")
+    units = []
+    for sent, n in zip(sents, lengths):
+        if n <= limit:
+            units.append((sent, n))
+            continue
+        # découpe en parts égales en nombre de mots (marge de 10 %)
+        words = sent.split()
+        k = math.ceil(n / (0.9 * limit))
+        step = math.ceil(len(words) / k)
+        units += [(" ".join(words[i:i + step]), math.ceil(n / k)) for i in range(0, len(words), step)]
+
+    parts, buffer, size = [], [], 0
+    for unit, n in units:
+        if buffer and size + n > limit:
+            parts.append(" ".join(buffer))
+            buffer, size = [], 0
+        buffer.append(unit)
+        size += n
+    if buffer:
+        parts.append(" ".join(buffer))
+    return parts
+
+
+def _spread(items: list[str], budget: int) -> list[str]:
+    """Au plus `budget` éléments, répartis uniformément (premier et dernier compris)."""
+    if len(items) <= budget:
+        return items
+    if budget <= 1:
+        return items[:budget]
+    last = len(items) - 1
+    return [items[round(i * last / (budget - 1))] for i in range(budget)]
+
+
+def _leaf_budget(max_calls: int, fan: int) -> int:
+    """
+    Plus grand nombre de segments n tel que n générations, plus celles des
+    niveaux de réduction (n / fan, n / fan², …, 1), tiennent dans max_calls.
+    """
+    for n in range(max(1, max_calls), 1, -1):
+        calls, m = n, n
+        while m > 1:
+            m = math.ceil(m / fan)
+            calls += m
+        if calls <= max_calls:
+            return n
+    return 1
+
+
+def _summarizer(model_name: str, device: int, backend: str = "torch", strict: bool = False):
+    """Pipeline de résumé partagé par tout le processus (voir model_registry)."""
+    def load():
+        # transformers importé par load_pipeline : premier résumé seulement
+        try:
+            return load_pipeline("summarization", model_name, device, backend, strict=strict)
+        except Exception as e:
+            logging.error(f"Impossible de charger le modèle {model_name} : {e}")
+            raise
+    pipe = registry.get(f"summarization:{model_name}:{device}:{backend}", load)
+    if strict:
+        require_backend(pipe, backend)
+    return pipe
+
+registry.register_warmup(lambda: _summarizer(_SUM_MODEL, -1, backend_for("summary")))
+
+def _correct(raw: str) -> str:
+    """Résumé corrigé ; le résumé brut si la correction échoue."""
+    try:
+        return grammar.correct(raw)
+    except Exception as e:
+        logging.error(f"Échec correction grammaticale : {e}")
+        return raw
+
 class DocumentSummarizer:
     """Génère un résumé en français, avec correction grammaticale si possible."""
 
     def __init__(
         self,
         model_name: str | None = None,
-        device: int = -1
+        device: int = -1,
+        max_calls: int | None = None,
+        batch_size: int | None = None,
+        backend: str | None = None
     ):
-        model_name = model_name or _SUM_MODEL
-        try:
-            self.pipe = pipeline(
-                task="summarization",
-                model=model_name,
-                tokenizer=model_name,
-                device=device
-            )
-        except Exception as e:
-            logging.error(f"Impossible de charger le modèle {model_name} : {e}")
-            raise
+        """
+        max_calls  : nombre maximal de générations par résumé
+                     (défaut : NLP_SUM_MAX_CALLS, 16).
+        batch_size : segments générés par passe du modèle
+                     (défaut : NLP_SUM_BATCH_SIZE, 4).
+        backend    : moteur d'inférence, "torch", "int8" ou "onnx"
+                     (défaut : NLP_BACKEND_SUMMARY, puis NLP_BACKEND) ;
+                     passé explicitement, erreur s'il ne se charge pas.
+        """
+        self.model_name = model_name or _SUM_MODEL
+        self.device = device
+        self.max_calls = max(1, max_calls or _MAX_CALLS)
+        self.batch_size = batch_size or _BATCH_SIZE
+        self.backend = backend_for("summary", backend)
+        self._strict = backend is not None
+        # générations du dernier résumé calculé (hors cache)
+        self.last_calls = 0
+
+    @property
+    def pipe(self):
+        # récupéré à chaque usage pour que le registre puisse l'évincer
+        return _summarizer(self.model_name, self.device, self.backend, self._strict)
 
     def summarize_text(
         self,
-        text: str,
+        text: str | Document,
         max_length: int = 120,
         min_length: int = 20,
         do_sample: bool = False
     ) -> str:
+        """Résumé corrigé (synchrone) ; gardé dans `doc.results` pour un Document."""
+        raw, ok = self._raw_summary(text, max_length, min_length, do_sample)
+        if not ok:
+            return raw
+        # correction grammaticale si disponible (pool LanguageTool + cache)
+        if isinstance(text, Document) and not do_sample:
+            return text.result("summary", lambda: _correct(raw),
+                               **self._cache_params(max_length, min_length))
+        return _correct(raw)
+
+    def summarize_async(
+        self,
+        text: str | Document,
+        max_length: int = 120,
+        min_length: int = 20,
+        do_sample: bool = False
+    ) -> tuple[str, Future]:
+        """
+        Résumé brut tout de suite, et Future de sa version corrigée : la
+        correction LanguageTool ne s'ajoute pas à la latence affichée.
+        """
+        raw, ok = self._raw_summary(text, max_length, min_length, do_sample)
+        done = Future()
+        if not ok:
+            done.set_result(raw)
+            return raw, done
+        if not isinstance(text, Document) or do_sample:
+            return raw, grammar.submit(raw)
+        doc, params = text, self._cache_params(max_length, min_length)
+        found, corrected = doc.lookup("summary", **params)
+        if found:
+            done.set_result(corrected)
+            return raw, done
+        future = grammar.submit(raw)
+        future.add_done_callback(
+            lambda f: f.exception() is None and doc.store("summary", f.result(), **params))
+        return raw, future
+
+    @metrics.timed("summary")
+    def _raw_summary(self, text: str | Document, max_length: int, min_length: int,
+                     do_sample: bool) -> tuple[str, bool]:
+        """Résumé non corrigé ; (message d'erreur, False) en cas d'échec."""
+        doc = text if isinstance(text, Document) else None
+        params = self._cache_params(max_length, min_length)
+        if doc is not None:
+            text = doc.text
+            found, raw = doc.lookup("summary_raw", **params)
+            if found and not do_sample:
+                return raw, True
         if not text or not text.strip():
-            return ""
+            return "", False
+
+        try:
+            # 1) nettoyage du texte d'entrée (sans préfixe T5)
+            if doc is not None:
+                txt = doc.derive("clean", lambda: self._prepare(text), stage="summary")
+            else:
+                txt = self._prepare(text)
+
+            # 2) génération du résumé (mise en cache si déterministe)
+            def generate():
+                pipe = self.pipe
+                return self._summarize(txt, max_length, min_length, do_sample,
+                                       self._pieces(txt, doc, pipe), pipe)
+
+            if do_sample:
+                return generate(), True
+            raw = cache.get(cache.make_key("summary", txt, **params))
+            if raw is None:
+                raw = generate()
+                # clé du moteur réellement chargé (repli éventuel sur torch)
+                params = self._cache_params(max_length, min_length)
+                cache.set(cache.make_key("summary", txt, **params), raw)
+            if doc is not None:
+                doc.store("summary_raw", raw, **params)
+            return raw, True
+
+        except Exception as e:
+            logging.error(f"Erreur lors du résumé : {e}")
+            return f"{ERROR_PREFIX}{e}", False
+
+    @metrics.timed("summary")
+    def summarize_texts(
+        self,
+        texts: list[str | Document],
+        max_length: int = 120,
+        min_length: int = 20
+    ) -> list[str]:
+        """
+        Version par lots (déterministe), résumés corrigés : les textes
+        courts sont générés ensemble en appels groupés, les textes longs
+        passent un à un par le map-reduce. Les Documents déjà résumés
+        (mêmes paramètres) sont servis tels quels.
+        """
+        docs = [t if isinstance(t, Document) else None for t in texts]
+        out: list[str | None] = [None] * len(texts)
+        ok = [False] * len(texts)
+        params = self._cache_params(max_length, min_length)
+        todo: dict[str, list[int]] = {}
+        owner: dict[str, Document] = {}
+        for k, text in enumerate(texts):
+            doc = docs[k]
+            if doc is not None:
+                found, summary = doc.lookup("summary", **params)
+                if found:
+                    out[k] = summary
+                    continue
+                text = doc.text
+            if not text or not text.strip():
+                out[k] = ""
+                continue
+            if doc is not None:
+                txt = doc.derive("clean", lambda: self._prepare(text), stage="summary")
+                owner.setdefault(txt, doc)
+            else:
+                txt = self._prepare(text)
+            hit = cache.get(cache.make_key("summary", txt, **params))
+            if hit is not None:
+                out[k], ok[k] = hit, True
+            else:
+                todo.setdefault(txt, []).append(k)
 
         try:
-            # 1) nettoyage du texte d'entrée
-            txt = _clean(text)
+            short, raws = [], {}
+            pipe = self.pipe if todo else None
+            if pipe is not None:
+                # moteur réellement chargé (repli éventuel sur torch)
+                params = self._cache_params(max_length, min_length)
+            for txt in todo:
+                pieces = self._pieces(txt, owner.get(txt), pipe)
+                if len(pieces) <= 1 or self.max_calls == 1:
+                    short.append(txt)
+                else:
+                    raws[txt] = self._summarize(txt, max_length, min_length, False, pieces, pipe)
+            if short:
+                raws.update(zip(short, self._generate(short, max_length, min_length, False, pipe)))
+            for txt, raw in raws.items():
+                cache.set(cache.make_key("summary", txt, **params), raw)
+                for k in todo[txt]:
+                    out[k], ok[k] = raw, True
+        except Exception as e:
+            logging.error(f"Erreur lors du résumé : {e}")
+            for k in range(len(texts)):
+                if out[k] is None:
+                    out[k] = f"{ERROR_PREFIX}{e}"
+
+        # corrections en parallèle dans le pool LanguageTool
+        pending = {k: grammar.submit(out[k]) for k in range(len(texts)) if ok[k]}
+        for k, fut in pending.items():
+            if docs[k] is not None:
+                docs[k].store("summary_raw", out[k], **params)
+            try:
+                out[k] = fut.result()
+            except Exception as e:
+                logging.error(f"Échec correction grammaticale : {e}")
+            if docs[k] is not None:
+                docs[k].store("summary", out[k], **params)
+        return out
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _prepare(text: str) -> str:
+        txt = _clean(text)
+        # le préfixe T5 est ajouté à chaque segment par _generate
+        if txt.lower().startswith("summarize:"):
+            txt = txt[len("summarize:"):].strip()
+        return txt
 
-            # 2) préfixe requis par T5
-            if not txt.lower().startswith("summarize:"):
-                txt = "summarize: " + txt
+    def _cache_params(self, max_length: int, min_length: int) -> dict:
+        return dict(model=model_tag(self.model_name, self.backend),
+                    max_length=max_length, min_length=min_length,
+                    long=_LONG_MODE, chunk=_CHUNK_TOKENS, max_calls=self.max_calls)
 
-            # 3) génération du résumé
-            raw = self.pipe(
-                txt,
+    def _pieces(self, txt: str, doc: Document | None = None, pipe=None) -> list[str]:
+        """Segmentation map-reduce de `txt` (gardée sur le Document, par modèle)."""
+        def split():
+            tok = (self.pipe if pipe is None else pipe).tokenizer
+            return _split_chunks(txt, tok, self._chunk_limit(tok)) if _LONG_MODE else [txt]
+        if doc is None:
+            return split()
+        return doc.derive("chunks", split, model=self.model_name, chunk=_CHUNK_TOKENS)
+
+    @staticmethod
+    def _chunk_limit(tok) -> int:
+        # place du préfixe et du token de fin dans l'entrée du modèle
+        overhead = len(tok(_PREFIX)["input_ids"])
+        return min(_CHUNK_TOKENS, tok.model_max_length - overhead)
+
+    def _generate(self, texts: list[str], max_length: int, min_length: int,
+                  do_sample: bool, pipe=None) -> list[str]:
+        """Résume plusieurs textes en appels groupés ; l'ordre est conservé."""
+        pipe = self.pipe if pipe is None else pipe
+        # longueurs voisines dans un même lot : moins de remplissage
+        order = sorted(range(len(texts)), key=lambda k: len(texts[k]), reverse=True)
+        with metrics.span("summary.generate"):
+            results = pipe(
+                [_PREFIX + texts[k] for k in order],
                 max_length=max_length,
                 min_length=min_length,
                 do_sample=do_sample,
+                truncation=True,
+                batch_size=self.batch_size,
                 clean_up_tokenization_spaces=True,
-            )[0]["summary_text"].strip()
-
-            # 4) correction grammaticale si disponible
-            if _GRAMMAR_ENABLED and _TOOL is not None:
-                try:
-                    return _TOOL.correct(raw).strip()
-                except Exception as e:
-                    logging.warning(f"Échec correction grammaticale : {e}")
-                    return raw
+            )
+        self.last_calls += len(texts)
+        metrics.count("model_calls", stage="summary")
+        metrics.count("model_inputs", len(texts), stage="summary")
+        out = [""] * len(texts)
+        for k, r in zip(order, results):
+            out[k] = r["summary_text"].strip()
+        return out
 
-            # sinon on renvoie juste le résumé brut
-            return raw
+    def _summarize(self, txt: str, max_length: int, min_length: int, do_sample: bool,
+                   pieces: list[str] | None = None, pipe=None) -> str:
+        """
+        Texte court : une génération. Texte long : map-reduce — segments
+        résumés par lots, résumés partiels concaténés puis re-segmentés,
+        jusqu'à tenir en un segment. Au plus self.max_calls générations : si
+        le document est trop long, les segments retenus sont répartis
+        uniformément dans le texte. `pieces` : segmentation déjà calculée ;
+        `pipe` : pipeline déjà obtenu du registre (un seul accès par résumé).
+        """
+        self.last_calls = 0
+        pipe = self.pipe if pipe is None else pipe
+        tok = pipe.tokenizer
+        limit = self._chunk_limit(tok)
+        if pieces is None:
+            pieces = _split_chunks(txt, tok, limit) if _LONG_MODE else [txt]
+        if len(pieces) <= 1 or self.max_calls == 1:
+            return self._generate([txt], max_length, min_length, do_sample, pipe)[0]
 
-        except Exception as e:
-            logging.error(f"Erreur lors du résumé : {e}")
-            return f"⚠️ Erreur lors du résumé : {e}"
+        # résumés partiels assez courts pour que plusieurs tiennent dans un segment
+        partial_len = min(max_length, limit // 3)
+        partial_min = min(min_length, partial_len // 2)
+        fan = max(2, limit // partial_len)
+        pieces = _spread(pieces, _leaf_budget(self.max_calls, fan))
+        while len(pieces) > 1:
+            remaining = self.max_calls - self.last_calls - 1   # 1 : résumé final
+            if remaining < 2:
+                break
+            partials = self._generate(_spread(pieces, remaining), partial_len, partial_min, do_sample, pipe)
+            pieces = _split_chunks(" ".join(partials), tok, limit)
+        # résumé final (tronqué par le modèle si le budget est épuisé)
+        return self._generate([" ".join(pieces)], max_length, min_length, do_sample, pipe)[0]
@@ -1,23 +1,41 @@
-# document_type_detector.py – v4.1 (examen prioritaire)
+# document_type_detector.py – v4.2 (cascade règles → NLI par lots, fenêtres par offsets)
 
-from transformers import pipeline, AutoTokenizer
-import torch, functools, re, collections
+import re, os, time, functools, collections
+import numpy as np
 
-_MODEL_ID = "MoritzLaurer/mDeBERTa-v3-base-mnli-xnli"
+from model_registry import registry, default_device
+from inference_backend import backend_for, load_pipeline, model_tag, require_backend
+from result_cache import cache
+from metrics import metrics
+from document import Document
+
+_VERSION  = "4.2"
+# modèle NLI (NLP_DETECTOR_MODEL : autre identifiant HF ou dossier local)
+_MODEL_ID = os.environ.get("NLP_DETECTOR_MODEL", "MoritzLaurer/mDeBERTa-v3-base-mnli-xnli")
 _HYPOTPL  = "Ce document est un(e) {}."
+# paires (fenêtre, hypothèse) par passe du modèle NLI
+_BATCH_SIZE = int(os.environ.get("NLP_NLI_BATCH_SIZE", "32"))
+
+def _classifier(dev:int, backend:str="torch", strict:bool=False):
+    # transformers importé par load_pipeline : première détection seulement
+    clf = registry.get(f"zero-shot:{_MODEL_ID}:{dev}:{backend}",
+                       lambda: load_pipeline("zero-shot-classification", _MODEL_ID, dev, backend,
+                                             strict=strict,
+                                             framework="pt",
+                                             hypothesis_template=_HYPOTPL,
+                                             truncation=True))
+    if strict:
+        require_backend(clf, backend)
+    return clf
 
-@functools.lru_cache
-def _classifier(dev:int):
-    return pipeline("zero-shot-classification",
-                    model=_MODEL_ID,
-                    device=dev,
-                    framework="pt",
-                    hypothesis_template=_HYPOTPL,
-                    truncation=True)
+registry.register_warmup(lambda: _classifier(default_device(), backend_for("detector")))
 
-@functools.lru_cache
-def _tok():
-    return AutoTokenizer.from_pretrained(_MODEL_ID)
+@functools.lru_cache(maxsize=64)
+def _encode(txt:str, tok):
+    """Tokenisation d'un texte nettoyé, une seule fois : ids + offsets."""
+    enc = tok(txt, add_special_tokens=False, return_offsets_mapping=True)
+    metrics.count("tokens", len(enc["input_ids"]), stage="detect")
+    return tuple(enc["input_ids"]), tuple(enc["offset_mapping"])
 
 # ────────────────────────────────────────────────────────────────────
 class DocumentTypeDetector:
@@ -76,6 +94,14 @@ class DocumentTypeDetector:
     PEN_LET_CONTR   = 0.4
     PEN_CONTR_JUR   = 0.5
 
+    # bonus mot‑clé aussi pour les alias de plusieurs mots ("relevé de compte"…)
+    KW_PHRASES      = True
+
+    # cascade : règles d'abord, modèle seulement si le cas est ambigu
+    CASCADE          = True
+    CASCADE_MARGIN   = 0.5  # écart (part des indices) entre 1er et 2e type
+    CASCADE_MIN_HITS = 3    # indices minimum pour le type gagnant
+
     # regex
     _rx_art = re.compile(r"[|_—]+")
     _rx_spc = re.compile(r"\s+")
@@ -87,72 +113,307 @@ class DocumentTypeDetector:
     _rx_jur  = re.compile(r"\b(autorisation|tribunal|juridiction|article|loi|règlement|responsabilité)\b", re.I)
     _rx_exam = re.compile(r"\b(examen|épreuve|fiche d'évaluation|bar[eè]me|note[s]?|session|jury|oral|dnb)\b", re.I)
 
+    # un motif par type (alias les plus longs d'abord) + marqueurs spécifiques
+    _rx_alias = {c: re.compile(r"\b(" + "|".join(sorted(map(re.escape, v), key=len, reverse=True)) + r")\b")
+                 for c, v in ALIASES.items()}
+    _MARKERS = {"relevé bancaire": _rx_bank, "contrat": _rx_ctr, "lettre": _rx_let,
+                "document juridique": _rx_jur, "sujet d'évaluation": _rx_exam}
+
     # ----------------------------------------------------------------
-    def __init__(self, device=None):
-        device = 0 if (device is None and torch.cuda.is_available()) else -1
-        self.clf = _classifier(device)
-        self.tok = _tok()
+    def __init__(self, device=None, batch_size:int|None=None, backend:str|None=None):
+        self._device_arg = device
+        # moteur d'inférence : torch, int8 ou onnx (voir inference_backend)
+        self.backend = backend_for("detector", backend)
+        # moteur passé explicitement : pas de repli silencieux sur torch
+        self._strict = backend is not None
+        self.batch_size = batch_size or _BATCH_SIZE
+        # décisions par étage : "rules", "model" (et "cache" pour les résultats relus)
+        self.stage_counts = collections.Counter()
+        self._engine = _HeuristicEngine(self)
+        # temps cumulés par étape : tokenize, nli, heuristics (secondes)
+        self.timings = collections.defaultdict(float)
+
+    # résolu au premier passage par le modèle : torch n'est pas importé
+    # tant que les règles suffisent
+    @functools.cached_property
+    def device(self):
+        return default_device() if self._device_arg is None else -1
+
+    # modèles partagés via le registre (chargés au premier usage)
+    @property
+    def clf(self):
+        return _classifier(self.device, self.backend, self._strict)
+
+    @property
+    def tok(self):
+        return self.clf.tokenizer
 
     def _clean(self, t:str) -> str:
         return self._rx_spc.sub(" ", self._rx_art.sub(" ", t)).replace("’", "'").lower().strip()
 
-    # heuristique
-    def _adj(self, lbl, chunk, s):
-        if lbl in self.ALIASES["facture"]:
-            return s * self.BOOST_INV
-
-        if lbl in self.ALIASES["relevé bancaire"]:
-            return s * self.BOOST_BANK if len(self._rx_bank.findall(chunk)) >= 2 else s
-
-        if lbl in self.ALIASES["contrat"]:
-            nb_c, nb_j = len(self._rx_ctr.findall(chunk)), len(self._rx_jur.findall(chunk))
-            if nb_j >= 3 and nb_c <= 1:
-                return s * self.PEN_CONTR_JUR
-            if nb_c >= 2:
-                return s * self.BOOST_CONTRAT
-            return s
-
-        if lbl in self.ALIASES["document juridique"]:
-            return s * self.BOOST_JUR if len(self._rx_jur.findall(chunk)) >= 2 else s
-
-        if lbl in self.ALIASES["sujet d'évaluation"]:
-            nb_e = len(self._rx_exam.findall(chunk))
-            return s * self.BOOST_EXAM if nb_e >= 2 else s * self.PEN_EXAM_FEW
-
-        if lbl in self.ALIASES["lettre"]:
-            nb_l = len(self._rx_let.findall(chunk))
-            if nb_l == 0:
-                return s * self.PEN_LET_NO_MARK
-            if len(self._rx_bank.findall(chunk)) >= 2:
-                return s * self.PEN_LET_BANK
-            if len(self._rx_ctr.findall(chunk)) >= 2:
-                return s * self.PEN_LET_CONTR
-            if nb_l >= 2:
-                return s * self.BOOST_LETTER
-            return s
-        return s
+    # cascade – étage 1 : indices lexicaux sur tout le texte
+    def _rule_hits(self, txt:str):
+        hits = {c: len(rx.findall(txt)) for c, rx in self._rx_alias.items()}
+        for c, rx in self._MARKERS.items():
+            hits[c] += len(rx.findall(txt))
+        return hits
 
-    # API
-    def detect_document_type(self, text:str):
-        if not text.strip():
-            return []
+    def _rule_decision(self, txt:str):
+        """Scores par règles si un type l'emporte nettement, sinon None."""
+        hits = self._rule_hits(txt)
+        ranked = sorted(hits.items(), key=lambda x: x[1], reverse=True)
+        tot = sum(hits.values())
+        if not tot or ranked[0][1] < self.CASCADE_MIN_HITS:
+            return None
+        if (ranked[0][1] - ranked[1][1]) / tot < self.CASCADE_MARGIN:
+            return None
+        return [(l, n / tot) for l, n in ranked]
+
+    # moteur NLI par lots
+    def _hyp_ids(self, tok=None):
+        """Hypothèses tokenisées une fois pour toutes (par tokenizer)."""
+        tok = self.tok if tok is None else tok
+        if getattr(self, "_hyp_cache", (None,))[0] is not tok:
+            hyps = [_HYPOTPL.format(c) for c in self.CANDIDATES]
+            self._hyp_cache = (tok, tok(hyps, add_special_tokens=False)["input_ids"])
+        return self._hyp_cache[1]
 
-        txt = self._clean(text)
-        ids = self.tok(txt, add_special_tokens=False)["input_ids"]
-        raw = collections.defaultdict(float)
+    def _nli_scores(self, windows, clf=None):
+        """
+        Scores zero‑shot (softmax des logits d'entailment sur CANDIDATES) de
+        chaque fenêtre, donnée par ses ids de tokens : les paires
+        (fenêtre, hypothèse) sont assemblées directement en ids (pas de
+        decode / re‑tokenisation), triées par longueur puis passées au modèle
+        par lots de `batch_size`. Même calcul que le pipeline
+        (multi_label=False). Retourne un tableau (n_fenêtres, n_candidats).
+        `clf` : pipeline déjà obtenu du registre par l'appelant.
+        """
+        import torch   # import différé : seulement si la cascade passe au modèle
+        clf = self.clf if clf is None else clf
+        tok, model = clf.tokenizer, clf.model
+        hyps = self._hyp_ids(tok)
+        n_h = len(hyps)
+        max_len = min(tok.model_max_length, 512)
+        feats = []
+        for win in windows:
+            for hyp in hyps:
+                # troncature "only_first" : on raccourcit la fenêtre, jamais l'hypothèse
+                first = list(win[:max_len - len(hyp) - tok.num_special_tokens_to_add(pair=True)])
+                feats.append({"input_ids": tok.build_inputs_with_special_tokens(first, hyp),
+                              "token_type_ids": tok.create_token_type_ids_from_sequences(first, hyp)})
+        # tri par longueur : des lots homogènes limitent le padding
+        order = sorted(range(len(feats)), key=lambda k: len(feats[k]["input_ids"]))
+        entail = np.empty(len(order), dtype=np.float32)
+        t = time.perf_counter()
+        with torch.no_grad():
+            for b in range(0, len(order), self.batch_size):
+                idx = order[b:b + self.batch_size]
+                batch = tok.pad([feats[j] for j in idx], return_tensors="pt").to(model.device)
+                logits = model(**batch).logits
+                entail[idx] = logits[:, clf.entailment_id].float().cpu().numpy()
+                metrics.count("model_calls", stage="detect")
+        dt = time.perf_counter() - t
+        self.timings["nli"] += dt
+        metrics.observe("detect.nli", dt)
+        metrics.count("model_inputs", len(feats), stage="detect")
+        entail = entail.reshape(len(windows), n_h)
+        return np.exp(entail) / np.exp(entail).sum(-1, keepdims=True)
 
+    def _windows(self, txt:str, doc:Document|None=None, tok=None):
+        """
+        Fenêtres glissantes sur un texte nettoyé : (ids, texte) de chaque
+        fenêtre. Le texte est découpé dans `txt` via les offsets du
+        tokenizer, sans decode. Les ids d'un Document lui restent attachés
+        (par modèle). `tok` : tokenizer déjà obtenu par l'appelant.
+        """
+        t = time.perf_counter()
+        tok = self.tok if tok is None else tok
+        if doc is None:
+            ids, offsets = _encode(txt, tok)
+        else:
+            ids, offsets = doc.derive("tokens", lambda: _encode(txt, tok),
+                                      model=_MODEL_ID, clean="detector")
+        windows = []
         for i in range(0, len(ids), self.WINDOW - self.OVERLAP):
-            chunk = self.tok.decode(ids[i:i+self.WINDOW], skip_special_tokens=True)
-            words = set(self._rx_w.findall(chunk))
-            kw = {a: len(words & {a}) * self.KW for a in self.CANDIDATES}
+            j = min(i + self.WINDOW, len(ids))
+            windows.append((ids[i:j], txt[offsets[i][0]:offsets[j - 1][1]].strip()))
+        dt = time.perf_counter() - t
+        self.timings["tokenize"] += dt
+        metrics.observe("detect.tokenize", dt)
+        metrics.count("windows", len(windows))
+        return windows
 
-            out = self.clf(chunk, self.CANDIDATES, multi_label=False)
-            for lbl, sc in zip(out["labels"], out["scores"]):
-                raw[lbl] += self._adj(lbl, chunk, sc + kw.get(lbl, 0))
+    def _aggregate(self, chunks, nli):
+        eng = self._engine
+        t = time.perf_counter()
+        raw = np.zeros(len(self.CANDIDATES))
+        for chunk, sc_vec in zip(chunks, np.asarray(nli, dtype=np.float64)):
+            raw += eng.adjust(chunk, sc_vec)
+        dt = time.perf_counter() - t
+        self.timings["heuristics"] += dt
+        metrics.observe("detect.heuristics", dt)
 
-        scores = [(c, sum(raw[a] for a in alias)) for c, alias in self.ALIASES.items()]
+        scores = [(c, sum(raw[eng.index[a]] for a in alias)) for c, alias in self.ALIASES.items()]
         scores.sort(key=lambda x: x[1], reverse=True)
         tot = sum(s for _, s in scores) or 1
-        return [(l, s / tot) for l, s in scores]
+        return [(l, float(s / tot)) for l, s in scores]
+
+    # API
+    def detect_document_type(self, text:str|Document):
+        return self.detect_detailed([text])[0]["scores"]
+
+    def detect_document_types(self, texts):
+        return [d["scores"] for d in self.detect_detailed(texts)]
+
+    @metrics.timed("detect")
+    def detect_detailed(self, texts):
+        """
+        Version multi‑documents, avec l'étage qui a décidé :
+        [{"scores": [(type, score)…], "stage": "rules" | "model" | "empty"}…]
+        Les documents tranchés par les règles n'atteignent pas le modèle ;
+        les fenêtres des autres partagent les mêmes lots NLI. Un Document
+        garde son texte nettoyé, ses ids de tokens et son résultat ("type").
+        """
+        params = dict(model=model_tag(_MODEL_ID, self.backend), version=_VERSION, **self._hparams())
+        docs = [t if isinstance(t, Document) else None for t in texts]
+        texts = [d.text if d is not None else t for d, t in zip(docs, texts)]
+        results, todo = [], {}
+        # pipeline demandé une fois au registre pour tout l'appel (pas un
+        # « hit » par texte) et seulement si un texte passe au modèle
+        clf = None
+        for k, text in enumerate(texts):
+            if docs[k] is not None:
+                found, value = docs[k].lookup("type", **params)
+                if found:
+                    results.append(value)
+                    continue
+            if not text.strip():
+                results.append({"scores": [], "stage": "empty"})
+                continue
+            # cache disque : clé = texte + modèle + hyper‑paramètres
+            key = cache.make_key("doctype", text, **params)
+            hit = cache.get(key)
+            if hit is not None:
+                self.stage_counts["cache"] += 1
+                metrics.count("detect_decisions", stage="cache")
+                results.append({"scores": [(l, s) for l, s in hit["scores"]], "stage": hit["stage"]})
+                continue
+            if docs[k] is not None:
+                txt = docs[k].derive("clean", lambda: self._clean(text), stage="detector")
+            else:
+                txt = self._clean(text)
+            rules = self._rule_decision(txt) if self.CASCADE else None
+            if rules is not None:
+                results.append({"scores": rules, "stage": "rules"})
+                self.stage_counts["rules"] += 1
+                metrics.count("detect_decisions", stage="rules")
+                cache.set(key, results[k])
+            else:
+                results.append(None)
+                if clf is None:
+                    clf = self.clf
+                    # moteur effectivement chargé (repli éventuel sur torch)
+                    params["model"] = model_tag(_MODEL_ID, self.backend)
+                todo[k] = self._windows(txt, docs[k], clf.tokenizer)
+
+        if todo:
+            windows = [w for ws in todo.values() for w in ws]
+            nli = (self._nli_scores([ids for ids, _ in windows], clf) if windows
+                   else np.empty((0, len(self.CANDIDATES))))
+            start = 0
+            for k, ws in todo.items():
+                chunks = [chunk for _, chunk in ws]
+                results[k] = {"scores": self._aggregate(chunks, nli[start:start + len(ws)]), "stage": "model"}
+                start += len(ws)
+                self.stage_counts["model"] += 1
+                metrics.count("detect_decisions", stage="model")
+                cache.set(cache.make_key("doctype", texts[k], **params), results[k])
+        for doc, result in zip(docs, results):
+            if doc is not None:
+                doc.store("type", result, **params)
+        return results
+
+    def _hparams(self):
+        # valeurs effectives : réglages modifiés sur l'instance compris
+        # (det.CASCADE = False…), sinon ils partageraient le cache du défaut
+        values = {k: getattr(self, k) for k in dir(type(self)) if k.isupper()}
+        return {k: v for k, v in values.items() if isinstance(v, (int, float))}
 
     __call__ = detect_document_type
+
+
+# ────────────────────────────────────────────────────────────────────
+class _HeuristicEngine:
+    """
+    Boosts / pénalités heuristiques, vectorisés sur CANDIDATES.
+
+    Tout ce qui ne dépend que du détecteur est précalculé (type de chaque
+    label, index alias → position, motifs) ; pour chaque fenêtre, les
+    marqueurs sont comptés en une seule passe, puis les facteurs appliqués
+    d'un coup au vecteur de scores. Résultat identique, bit à bit, à
+    l'ancienne boucle label par label (avec KW_PHRASES = False).
+    """
+    # ordre de priorité des règles : un label présent dans plusieurs listes
+    # reçoit le traitement du premier type
+    ORDER = ["facture", "relevé bancaire", "contrat", "document juridique",
+             "sujet d'évaluation", "lettre"]
+    _MARK = {"let": "_rx_let", "bank": "_rx_bank", "ctr": "_rx_ctr",
+             "jur": "_rx_jur", "exam": "_rx_exam"}
+
+    def __init__(self, det:DocumentTypeDetector):
+        self.det = det
+        cands = det.CANDIDATES
+        self.index = {a: j for j, a in enumerate(cands)}
+        # type de chaque label (len(ORDER) = sans règle, facteur 1)
+        self.kind = np.array([next((k for k, c in enumerate(self.ORDER) if a in det.ALIASES[c]),
+                                   len(self.ORDER)) for a in cands])
+        # mots simples → index ; alias de plusieurs mots → un seul motif
+        self.words = {a: self.index[a] for a in cands if re.fullmatch(r"\w+", a)}
+        phrases = sorted((a for a in cands if a not in self.words), key=len, reverse=True)
+        self._rx_phrase = re.compile(r"(?=\b(" + "|".join(map(re.escape, phrases)) + r")\b)")
+        # tous les marqueurs en une passe (vocabulaires disjoints : mêmes comptes
+        # que cinq findall séparés)
+        self._rx_mark = re.compile("|".join(
+            f"(?P<{g}>{getattr(det, rx).pattern})" for g, rx in self._MARK.items()), re.I)
+
+    def markers(self, chunk:str):
+        counts = dict.fromkeys(self._MARK, 0)
+        for m in self._rx_mark.finditer(chunk):
+            counts[m.lastgroup] += 1
+        return counts
+
+    def factors(self, n):
+        d = self.det
+        if n["jur"] >= 3 and n["ctr"] <= 1:
+            ctr = d.PEN_CONTR_JUR
+        else:
+            ctr = d.BOOST_CONTRAT if n["ctr"] >= 2 else 1.0
+        if n["let"] == 0:
+            let = d.PEN_LET_NO_MARK
+        elif n["bank"] >= 2:
+            let = d.PEN_LET_BANK
+        elif n["ctr"] >= 2:
+            let = d.PEN_LET_CONTR
+        else:
+            let = d.BOOST_LETTER if n["let"] >= 2 else 1.0
+        return np.array([
+            d.BOOST_INV,
+            d.BOOST_BANK if n["bank"] >= 2 else 1.0,
+            ctr,
+            d.BOOST_JUR if n["jur"] >= 2 else 1.0,
+            d.BOOST_EXAM if n["exam"] >= 2 else d.PEN_EXAM_FEW,
+            let,
+            1.0,
+        ])
+
+    def keywords(self, chunk:str):
+        kw = np.zeros(len(self.index))
+        hit = [self.words[w] for w in set(self.det._rx_w.findall(chunk)) if w in self.words]
+        if self.det.KW_PHRASES:
+            hit += [self.index[m.group(1)] for m in self._rx_phrase.finditer(chunk)]
+        kw[hit] = self.det.KW
+        return kw
+
+    def adjust(self, chunk:str, scores):
+        """(scores + bonus mots‑clés) × facteur du type de chaque label."""
+        return (scores + self.keywords(chunk)) * self.factors(self.markers(chunk))[self.kind]
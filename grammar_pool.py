@@ -0,0 +1,150 @@
+# grammar_pool.py – correction grammaticale (LanguageTool) hors du chemin critique
+"""
+Correction des résumés par LanguageTool sans bloquer la génération :
+
+- un seul serveur LanguageTool (JVM) local, démarré à la première
+  correction, ou un serveur distant (NLP_LANGUAGETOOL_URL) ;
+- un pool de `workers` clients (threads) qui l'interrogent en parallèle :
+  les utilisateurs simultanés ne sont plus sérialisés derrière une instance ;
+- les corrections sont mises en cache (result_cache, étage "grammar"),
+  clé = texte : un résumé déjà corrigé ne repasse pas par la JVM ;
+- `submit` renvoie un Future : l'appelant affiche le résumé brut tout de
+  suite et la version corrigée quand elle est prête.
+
+Si Java ou language_tool_python manquent, la correction est désactivée
+pour le processus et les textes sont renvoyés tels quels.
+
+Variables d'environnement :
+- NLP_GRAMMAR_WORKERS    nombre de clients en parallèle (défaut : 2) ;
+- NLP_LANGUAGETOOL_URL   serveur LanguageTool existant (ex. http://lt:8010).
+"""
+from __future__ import annotations
+
+import atexit
+import contextvars
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from result_cache import cache
+from metrics import metrics
+
+
+def _done(value) -> Future:
+    fut = Future()
+    fut.set_result(value)
+    return fut
+
+
+class GrammarPool:
+    """Clients LanguageTool partagés, démarrés au premier usage."""
+
+    def __init__(self, lang: str = "fr", workers: int | None = None, server: str | None = None):
+        self.lang = lang
+        self.workers = max(1, workers or int(os.environ.get("NLP_GRAMMAR_WORKERS", "2")))
+        self.server = server if server is not None else os.environ.get("NLP_LANGUAGETOOL_URL") or None
+        self.enabled = True          # passe à False si LanguageTool ne peut démarrer
+        self._tools: queue.Queue = queue.Queue()
+        self._owned = []             # instances à fermer à la sortie
+        self._started = False
+        self._lock = threading.Lock()
+        # threads créés à la demande : rien ne démarre avant le premier submit
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix="grammar")
+        self.counters = {"corrections": 0, "cache_hits": 0, "errors": 0}
+
+    # ------------------------------------------------------------------
+    def _start(self) -> bool:
+        with self._lock:
+            if self._started or not self.enabled:
+                return self.enabled
+            try:
+                import language_tool_python
+                first = language_tool_python.LanguageTool(self.lang, remote_server=self.server)
+            except Exception as e:
+                # pas de Java, installation manquante, téléchargement ou
+                # démarrage de la JVM en échec : correction désactivée
+                self.enabled = False
+                logging.warning(
+                    "LanguageTool désactivé (pas de Java, installation manquante ou démarrage impossible). "
+                    f"Le résumé sera retourné sans correction grammaticale. ({e})"
+                )
+                return False
+            tools = [first]
+            # les autres clients interrogent le même serveur (une seule JVM)
+            url = self.server or getattr(first, "_url", "").rsplit("v2/", 1)[0]
+            if url:
+                for _ in range(self.workers - 1):
+                    try:
+                        tools.append(language_tool_python.LanguageTool(self.lang, remote_server=url))
+                    except Exception as e:
+                        logging.warning(f"Client LanguageTool supplémentaire impossible : {e}")
+                        break
+            for tool in tools:
+                self._tools.put(tool)
+            self._owned = tools
+            self._started = True
+            logging.info(f"LanguageTool activé pour correction grammaticale ({len(tools)} client(s)).")
+            return True
+
+    def _key(self, text: str) -> str:
+        return cache.make_key("grammar", text, lang=self.lang, tool="languagetool")
+
+    def correct(self, text: str) -> str:
+        """Texte corrigé (synchrone) ; le texte tel quel si la correction échoue."""
+        if not text or not text.strip():
+            return text
+        key = self._key(text)
+        hit = cache.get(key)
+        if hit is not None:
+            self.counters["cache_hits"] += 1
+            return hit
+        if not self._start():
+            return text
+        tool = self._tools.get()
+        try:
+            with metrics.span("grammar.languagetool"):
+                corrected = tool.correct(text).strip()
+        except Exception as e:
+            self.counters["errors"] += 1
+            logging.warning(f"Échec correction grammaticale : {e}")
+            return text
+        finally:
+            self._tools.put(tool)
+        self.counters["corrections"] += 1
+        cache.set(key, corrected)
+        return corrected
+
+    def submit(self, text: str) -> Future:
+        """Correction asynchrone : Future du texte corrigé."""
+        if not text or not text.strip() or not self.enabled:
+            return _done(text)
+        hit = cache.get(self._key(text))
+        if hit is not None:
+            self.counters["cache_hits"] += 1
+            return _done(hit)
+        # contexte copié : la correction compte dans la trace de l'appelant
+        return self._executor.submit(contextvars.copy_context().run, self.correct, text)
+
+    def stats(self) -> dict:
+        return {**self.counters, "enabled": self.enabled,
+                "clients": len(self._owned), "server": self.server or "local"}
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            for tool in self._owned:
+                try:
+                    tool.close()
+                except Exception:
+                    pass
+            self._owned = []
+            self._started = False
+            self._tools = queue.Queue()
+
+
+# instance partagée par le processus
+pool = GrammarPool()
+atexit.register(pool.close)
@@ -0,0 +1,165 @@
+# image_preprocessing.py – préparation des images avant OCR
+"""
+Le coût de l'OCR croît avec le nombre de pixels : une photo de téléphone ou
+un scan à 300 DPI coûte cher sans gain de précision. Ce module ramène les
+images à une taille utile avant EasyOCR / Tesseract :
+
+- réduction sous un budget de pixels et/ou vers une hauteur de ligne cible ;
+- niveaux de gris, binarisation (Otsu), redressement (deskew) ;
+- choix du DPI de rastérisation par page pour les PDF.
+
+Préréglages (variable NLP_OCR_PREPROCESS) : "off", "fast" (défaut),
+"full". Chaque appel renvoie aussi le temps passé par étape.
+"""
+from __future__ import annotations
+
+import math
+import os
+import time
+from dataclasses import asdict, dataclass
+
+import numpy as np
+from PIL import Image
+
+
+@dataclass(frozen=True)
+class PreprocessConfig:
+    enabled: bool = True
+    max_pixels: int = 4_000_000      # budget de pixels par image (0 = illimité)
+    target_text_height: int = 0      # hauteur de ligne visée en px (0 = pas d'estimation)
+    grayscale: bool = True
+    binarize: bool = False
+    deskew: bool = False
+    max_deskew_angle: float = 5.0    # degrés
+    min_dpi: int = 100               # bornes du DPI de rastérisation PDF
+    max_dpi: int = 300
+
+    @classmethod
+    def preset(cls, name: str) -> "PreprocessConfig":
+        if name == "off":
+            return cls(enabled=False)
+        if name == "fast":
+            return cls()
+        if name == "full":
+            return cls(target_text_height=32, binarize=True, deskew=True)
+        raise ValueError(f"Préréglage de prétraitement inconnu : {name}")
+
+    @classmethod
+    def from_env(cls) -> "PreprocessConfig":
+        return cls.preset(os.environ.get("NLP_OCR_PREPROCESS", "fast"))
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+    # ── PDF ──
+    def pdf_dpi(self, width_pt: float, height_pt: float) -> int | None:
+        """DPI qui respecte le budget de pixels pour une page de w × h points."""
+        if not self.enabled or not self.max_pixels:
+            return None
+        area_in2 = (width_pt / 72) * (height_pt / 72)
+        dpi = math.sqrt(self.max_pixels / area_in2) if area_in2 > 0 else self.max_dpi
+        return int(min(self.max_dpi, max(self.min_dpi, dpi)))
+
+
+# ─────────────── opérations élémentaires ───────────────
+def otsu_threshold(gray: np.ndarray) -> int:
+    """Seuil d'Otsu sur une image uint8 (encre = pixels <= seuil)."""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = hist.sum()
+    if total == 0:
+        return 128
+    levels = np.arange(256)
+    w0 = np.cumsum(hist)
+    w1 = total - w0
+    m0 = np.cumsum(hist * levels)
+    mt = m0[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mt * w0 / total - m0) ** 2 / (w0 * w1)
+    if np.isnan(between).all():
+        return 128          # image uniforme (page blanche) : une seule classe
+    return int(np.nanargmax(between))
+
+
+def estimate_text_height(gray: np.ndarray) -> float | None:
+    """
+    Hauteur médiane des lignes de texte (px), d'après le profil horizontal
+    de l'encre. None si moins de trois lignes sont repérées.
+    """
+    ink = gray <= otsu_threshold(gray)
+    rows = ink.mean(axis=1) > 0.01
+    # longueurs des suites de lignes encrées
+    edges = np.diff(np.concatenate(([0], rows.astype(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    heights = ends - starts
+    heights = heights[(heights >= 4) & (heights < gray.shape[0] // 5)]
+    return float(np.median(heights)) if heights.size >= 3 else None
+
+
+def deskew_angle(binary: np.ndarray, max_angle: float, step: float = 0.5) -> float:
+    """
+    Angle (degrés) qui aligne le mieux les lignes : celui qui maximise la
+    variance du profil horizontal, cherché sur une vignette. À égalité
+    (page sans encre), le plus petit angle l'emporte.
+    """
+    img = Image.fromarray((binary * 255).astype(np.uint8))
+    if img.width > 800:
+        img = img.resize((800, max(1, img.height * 800 // img.width)), Image.NEAREST)
+    best, best_score = 0.0, -1.0
+    for angle in sorted(np.arange(-max_angle, max_angle + step / 2, step), key=abs):
+        rotated = np.asarray(img.rotate(float(angle), resample=Image.NEAREST, fillcolor=0))
+        score = float(rotated.sum(axis=1, dtype=np.float64).var())
+        if score > best_score:
+            best, best_score = float(angle), score
+    return best
+
+
+def _scale(image: Image.Image, factor: float) -> Image.Image:
+    size = (max(1, round(image.width * factor)), max(1, round(image.height * factor)))
+    return image.resize(size, Image.LANCZOS)
+
+
+# ─────────────── chaîne complète ───────────────
+MIN_SCALE = 0.25   # jamais de réduction plus forte (estimation de hauteur erronée)
+
+
+def preprocess(image: Image.Image, config: PreprocessConfig) -> tuple[Image.Image, dict[str, float]]:
+    """Applique la configuration ; renvoie l'image et le temps par étape (s)."""
+    timings: dict[str, float] = {}
+    if not config.enabled:
+        return image, timings
+
+    t = time.perf_counter()
+    gray = config.grayscale or config.binarize or config.deskew or config.target_text_height
+    img = image.convert("L") if gray else image.convert("RGB")
+    timings["grayscale"] = time.perf_counter() - t
+
+    # 1) budget de pixels : réduction avant toute autre opération
+    t = time.perf_counter()
+    if config.max_pixels and img.width * img.height > config.max_pixels:
+        img = _scale(img, math.sqrt(config.max_pixels / (img.width * img.height)))
+    timings["resize"] = time.perf_counter() - t
+
+    # 2) redressement, pour que le profil des lignes soit net
+    if config.deskew:
+        t = time.perf_counter()
+        arr = np.asarray(img)
+        angle = deskew_angle(arr <= otsu_threshold(arr), config.max_deskew_angle)
+        if angle:
+            img = img.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+        timings["deskew"] = time.perf_counter() - t
+
+    # 3) hauteur de ligne cible
+    if config.target_text_height:
+        t = time.perf_counter()
+        height = estimate_text_height(np.asarray(img))
+        if height and height > 1.5 * config.target_text_height:
+            img = _scale(img, max(MIN_SCALE, config.target_text_height / height))
+        timings["text_height"] = time.perf_counter() - t
+
+    # 4) binarisation
+    if config.binarize:
+        t = time.perf_counter()
+        arr = np.asarray(img)
+        img = Image.fromarray(np.where(arr <= otsu_threshold(arr), 0, 255).astype(np.uint8))
+        timings["binarize"] = time.perf_counter() - t
+    return img, timings
@@ -0,0 +1,184 @@
+# inference_backend.py – moteur d'inférence CPU des pipelines transformers
+"""
+Sans GPU, les trois modèles transformers (zero-shot, MarianMT, T5) tournent
+en PyTorch fp32. Ce module construit leurs pipelines avec un moteur au choix :
+
+- "torch" : PyTorch fp32 (comportement historique, seul moteur sur GPU) ;
+- "int8"  : PyTorch avec quantification dynamique int8 des couches
+            linéaires (torch.quantization.quantize_dynamic) ;
+- "onnx"  : export ONNX exécuté par ONNX Runtime (dépendance optionnelle
+            `optimum[onnxruntime]`).
+
+Un moteur demandé explicitement (argument `backend` des étages) qui ne se
+charge pas lève une erreur. Demandé par l'environnement, il se replie sur
+"torch" avec un avertissement ; le moteur réellement chargé est alors
+retenu (`effective_backend`) et c'est lui qui entre dans les clés de cache
+et de la mémoire de traduction (`model_tag`).
+
+Les artefacts (poids quantifiés, export ONNX) sont construits une seule
+fois puis relus depuis NLP_MODEL_DIR (défaut : <NLP_CACHE_DIR>/models).
+
+Variables d'environnement :
+- NLP_BACKEND                moteur par défaut des trois modèles (torch) ;
+- NLP_BACKEND_DETECTOR,
+  NLP_BACKEND_TRANSLATION,
+  NLP_BACKEND_SUMMARY        moteur propre à un modèle ;
+- NLP_NUM_THREADS            threads d'inférence (défaut : réglage de torch).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+
+from result_cache import cache_dir
+
+BACKENDS = ("torch", "int8", "onnx")
+
+# tâche du pipeline → (classe transformers, classe optimum)
+_AUTO = {
+    "zero-shot-classification": ("AutoModelForSequenceClassification", "ORTModelForSequenceClassification"),
+    "translation": ("AutoModelForSeq2SeqLM", "ORTModelForSeq2SeqLM"),
+    "summarization": ("AutoModelForSeq2SeqLM", "ORTModelForSeq2SeqLM"),
+}
+
+_threads_lock = threading.Lock()
+_threads_set = False
+
+# (modèle, moteur demandé) → moteur chargé à la place (repli sur torch)
+_fallbacks: dict[tuple[str, str], str] = {}
+
+
+def backend_for(role: str, backend: str | None = None) -> str:
+    """Moteur d'un modèle : argument explicite, puis NLP_BACKEND_<ROLE>, puis NLP_BACKEND."""
+    backend = (backend or os.environ.get(f"NLP_BACKEND_{role.upper()}")
+               or os.environ.get("NLP_BACKEND") or "torch").lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Moteur d'inférence inconnu : {backend} (attendu : {', '.join(BACKENDS)})")
+    return backend
+
+
+def effective_backend(model_id: str, backend: str) -> str:
+    """Moteur réellement chargé pour `model_id` (le moteur demandé sauf repli)."""
+    return _fallbacks.get((model_id, backend), backend)
+
+
+def model_tag(model_id: str, backend: str) -> str:
+    """
+    Identifiant du modèle pour les clés de cache (inchangé en torch), avec
+    le moteur effectif : après un repli, les sorties torch ne sont pas
+    rangées sous « +onnx » ou « +int8 ».
+    """
+    backend = effective_backend(model_id, backend)
+    return model_id if backend == "torch" else f"{model_id}+{backend}"
+
+
+def require_backend(pipe, backend: str) -> None:
+    """Erreur si `pipe` ne tourne pas avec le moteur demandé (repli antérieur)."""
+    loaded = getattr(pipe, "backend", "torch")
+    if loaded != backend:
+        raise RuntimeError(f"Moteur {backend} demandé mais {loaded} chargé "
+                           f"(voir les avertissements du chargement)")
+
+
+def num_threads() -> int | None:
+    value = os.environ.get("NLP_NUM_THREADS", "").strip()
+    return max(1, int(value)) if value else None
+
+
+def _apply_threads() -> None:
+    # une seule fois par processus (set_num_threads est global à torch)
+    global _threads_set
+    with _threads_lock:
+        if _threads_set:
+            return
+        n = num_threads()
+        if n is not None:
+            import torch
+            torch.set_num_threads(n)
+        _threads_set = True
+
+
+def artifact_dir(model_id: str, backend: str) -> str:
+    root = os.environ.get("NLP_MODEL_DIR") or os.path.join(cache_dir(), "models")
+    return os.path.join(root, model_id.replace("/", "__"), backend)
+
+
+# ─────────────── chargement ───────────────
+def _quantized(task: str, model_id: str):
+    """Modèle int8 ; poids quantifiés relus depuis le disque s'ils existent."""
+    import torch
+    import transformers
+    auto = getattr(transformers, _AUTO[task][0])
+    path = os.path.join(artifact_dir(model_id, "int8"), "model.pt")
+    if os.path.exists(path):
+        # architecture seule (pas de poids fp32), quantifiée, puis poids int8
+        config = transformers.AutoConfig.from_pretrained(model_id)
+        model = torch.quantization.quantize_dynamic(
+            auto.from_config(config), {torch.nn.Linear}, dtype=torch.qint8)
+        model.load_state_dict(torch.load(path, map_location="cpu"))
+    else:
+        model = torch.quantization.quantize_dynamic(
+            auto.from_pretrained(model_id), {torch.nn.Linear}, dtype=torch.qint8)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        torch.save(model.state_dict(), path + ".tmp")
+        os.replace(path + ".tmp", path)
+        logging.info(f"Poids int8 enregistrés : {path}")
+    return model.eval()
+
+
+def _onnx(task: str, model_id: str):
+    """Modèle ONNX Runtime ; exporté au premier usage puis relu depuis le disque."""
+    import onnxruntime
+    import optimum.onnxruntime
+    ort_model = getattr(optimum.onnxruntime, _AUTO[task][1])
+    options = onnxruntime.SessionOptions()
+    if num_threads() is not None:
+        options.intra_op_num_threads = num_threads()
+    path = artifact_dir(model_id, "onnx")
+    if os.path.exists(os.path.join(path, "config.json")):
+        return ort_model.from_pretrained(path, session_options=options)
+    model = ort_model.from_pretrained(model_id, export=True, session_options=options)
+    model.save_pretrained(path)
+    logging.info(f"Export ONNX enregistré : {path}")
+    return model
+
+
+def load_pipeline(task: str, model_id: str, device: int, backend: str = "torch",
+                  strict: bool = False, **kwargs):
+    """
+    Pipeline transformers `task` pour `model_id` avec le moteur demandé ;
+    le moteur chargé est noté dans `pipe.backend`. int8 et onnx sont
+    réservés au CPU ; en cas d'échec (optimum absent, export impossible…) :
+    erreur si `strict`, sinon repli sur torch avec un avertissement, retenu
+    pour les clés de cache (voir effective_backend).
+    """
+    from transformers import AutoTokenizer, pipeline
+    _apply_threads()
+    requested = backend
+    if backend != "torch" and device != -1:
+        if strict:
+            raise RuntimeError(f"Moteur {backend} réservé au CPU ({model_id}, device={device})")
+        logging.warning(f"Moteur {backend} réservé au CPU : {model_id} chargé en torch sur GPU.")
+        backend = "torch"
+    if backend != "torch":
+        try:
+            model = _quantized(task, model_id) if backend == "int8" else _onnx(task, model_id)
+            pipe = pipeline(task, model=model, tokenizer=AutoTokenizer.from_pretrained(model_id),
+                            device=-1, **kwargs)
+            pipe.backend = backend
+            _fallbacks.pop((model_id, requested), None)
+            return pipe
+        except Exception as e:
+            if strict:
+                raise RuntimeError(f"Moteur {backend} indisponible pour {model_id} : {e}") from e
+            if isinstance(e, ImportError):
+                logging.warning(f"Moteur {backend} indisponible ({e}) : {model_id} chargé en torch.")
+            else:
+                logging.warning(f"Échec du moteur {backend} pour {model_id} ({e}) : chargé en torch.")
+        backend = "torch"
+    pipe = pipeline(task, model=model_id, device=device, **kwargs)
+    pipe.backend = backend
+    if backend != requested:
+        _fallbacks[(model_id, requested)] = backend
+    return pipe
@@ -0,0 +1,356 @@
+# inference_service.py – service d'inférence local avec micro-lots entre requêtes
+"""
+Usage : python inference_service.py [--host 127.0.0.1] [--port 8765]
+        puis, côté application : NLP_INFERENCE_URL=http://127.0.0.1:8765
+
+Un seul processus détient les modèles (détecteur, traducteur, résumeur) et
+sert toutes les sessions. Serveur HTTP minimal (asyncio, bibliothèque
+standard) ; pour chaque modèle, une file d'attente bornée regroupe les
+requêtes simultanées en micro-lots :
+
+- un lot part dès qu'il atteint `max_batch` requêtes, ou `max_wait_ms`
+  après l'arrivée de la première ;
+- les lots d'un modèle s'exécutent l'un après l'autre dans un thread
+  dédié, les trois modèles en parallèle ;
+- file pleine : réponse 503 (Retry-After) au lieu d'une attente sans fin.
+
+Routes (JSON) :
+  POST /v1/detect     {"text"}                              → {"scores", "stage"}
+  POST /v1/translate  {"text", "lang"?}                     → {"translation"}
+  POST /v1/summarize  {"text", "max_length"?, "min_length"?} → {"summary"}
+  GET  /v1/stats, GET /health
+  GET  /metrics  (format texte Prometheus, voir metrics.py ; --metrics ou NLP_METRICS=1)
+
+Variables d'environnement : NLP_SERVICE_MAX_BATCH (16),
+NLP_SERVICE_MAX_WAIT_MS (10), NLP_SERVICE_QUEUE (256) ; côté client,
+NLP_INFERENCE_URL et NLP_INFERENCE_TIMEOUT (300 s).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import collections
+import json
+import logging
+import os
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from metrics import metrics
+
+MAX_BODY = 32 * 1024 * 1024
+MAX_GENERATION = 1024        # borne de max_length / min_length (tokens)
+
+
+class Overloaded(Exception):
+    """File d'attente pleine (→ 503)."""
+
+
+class ServiceBusy(RuntimeError):
+    """Côté client : le service a refusé la requête (503)."""
+
+
+# ─────────────── micro-lots ───────────────
+class MicroBatcher:
+    """File bornée d'un modèle ; regroupe les requêtes en lots pour `fn`."""
+
+    def __init__(self, name: str, fn: Callable[[list[dict]], list[Any]],
+                 max_batch: int, max_wait_ms: float, max_queue: int):
+        self.name = name
+        self.fn = fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        # un thread par modèle : ses lots ne se chevauchent pas
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"batch-{name}")
+        self.counters = {"requests": 0, "batches": 0, "rejected": 0, "errors": 0}
+        self.busy_seconds = 0.0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, payload: dict) -> Any:
+        if self.queue.full():
+            self.counters["rejected"] += 1
+            raise Overloaded(self.name)
+        fut = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((payload, fut))
+        self.counters["requests"] += 1
+        return await fut
+
+    async def _collect(self) -> list[tuple[dict, asyncio.Future]]:
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            live = [(p, f) for p, f in batch if not f.cancelled()]
+            if not live:
+                continue
+            t = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self._executor, self.fn, [p for p, _ in live])
+            except Exception as e:
+                self.counters["errors"] += 1
+                logging.exception(f"Échec d'un lot {self.name}")
+                for _, fut in live:
+                    if not fut.done():
+                        fut.set_exception(e)
+            else:
+                for (_, fut), result in zip(live, results):
+                    if not fut.done():
+                        fut.set_result(result)
+            self.busy_seconds += time.perf_counter() - t
+            self.counters["batches"] += 1
+
+    def stats(self) -> dict:
+        n = self.counters["batches"]
+        return {**self.counters, "queued": self.queue.qsize(),
+                "mean_batch": round(self.counters["requests"] / n, 2) if n else None,
+                "busy_seconds": round(self.busy_seconds, 2)}
+
+
+# ─────────────── validation ───────────────
+def _int_field(payload: dict, name: str, default: int) -> int:
+    value = payload.get(name, default)
+    if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= MAX_GENERATION:
+        raise ValueError(f"champ '{name}' : entier de 1 à {MAX_GENERATION} attendu")
+    return value
+
+
+def validate(name: str, payload) -> dict:
+    """
+    Requête de la route `name` vérifiée et normalisée, ValueError sinon :
+    une requête invalide est refusée (400) avant la file, elle ne peut pas
+    faire échouer le lot où elle serait tombée.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("objet JSON attendu")
+    if not isinstance(payload.get("text"), str):
+        raise ValueError("champ 'text' manquant")
+    clean = {"text": payload["text"]}
+    if name == "translate":
+        lang = payload.get("lang")
+        if lang is not None and not isinstance(lang, str):
+            raise ValueError("champ 'lang' : chaîne attendue")
+        clean["lang"] = lang
+    elif name == "summarize":
+        clean["max_length"] = _int_field(payload, "max_length", 120)
+        clean["min_length"] = _int_field(payload, "min_length", 20)
+        if clean["min_length"] > clean["max_length"]:
+            raise ValueError("min_length supérieur à max_length")
+    return clean
+
+
+# ─────────────── fonctions de lot (threads des modèles) ───────────────
+def _detect_batch(det) -> Callable[[list[dict]], list[dict]]:
+    def run(payloads):
+        return det.detect_detailed([p["text"] for p in payloads])
+    return run
+
+
+def _translate_batch(analyzer) -> Callable[[list[dict]], list[dict]]:
+    def run(payloads):
+        texts = [p["text"] for p in payloads]
+        return [{"translation": t}
+                for t in analyzer.translate_texts(texts, [p.get("lang") for p in payloads])]
+    return run
+
+
+def _summarize_batch(summarizer) -> Callable[[list[dict]], list[dict]]:
+    def run(payloads):
+        # un appel groupé par jeu de paramètres de génération
+        groups = collections.defaultdict(list)
+        for k, p in enumerate(payloads):
+            groups[(p["max_length"], p["min_length"])].append(k)
+        out = [None] * len(payloads)
+        for (max_length, min_length), idx in groups.items():
+            summaries = summarizer.summarize_texts([payloads[k]["text"] for k in idx],
+                                                   max_length=max_length, min_length=min_length)
+            for k, summary in zip(idx, summaries):
+                out[k] = {"summary": summary}
+        return out
+    return run
+
+
+# ─────────────── serveur HTTP ───────────────
+class InferenceService:
+    ROUTES = {"/v1/detect": "detect", "/v1/translate": "translate", "/v1/summarize": "summarize"}
+
+    def __init__(self, max_batch: int | None = None, max_wait_ms: float | None = None,
+                 max_queue: int | None = None):
+        self.max_batch = max_batch or int(os.environ.get("NLP_SERVICE_MAX_BATCH", "16"))
+        self.max_wait_ms = (max_wait_ms if max_wait_ms is not None
+                            else float(os.environ.get("NLP_SERVICE_MAX_WAIT_MS", "10")))
+        self.max_queue = max_queue or int(os.environ.get("NLP_SERVICE_QUEUE", "256"))
+        self.batchers: dict[str, MicroBatcher] = {}
+
+    def _build(self) -> None:
+        from document_type_detector import DocumentTypeDetector
+        from langage_analyser import LanguageAnalyzer
+        from document_summarizer import DocumentSummarizer
+        fns = {"detect": _detect_batch(DocumentTypeDetector()),
+               "translate": _translate_batch(LanguageAnalyzer()),
+               "summarize": _summarize_batch(DocumentSummarizer())}
+        for name, fn in fns.items():
+            self.batchers[name] = MicroBatcher(name, fn, self.max_batch, self.max_wait_ms, self.max_queue)
+            self.batchers[name].start()
+
+    def stats(self) -> dict:
+        from model_registry import registry
+        return {"batchers": {n: b.stats() for n, b in self.batchers.items()},
+                "policy": {"max_batch": self.max_batch, "max_wait_ms": self.max_wait_ms,
+                           "max_queue": self.max_queue},
+                "models": registry.stats(), "metrics": metrics.snapshot()}
+
+    async def _respond(self, writer, status: int, body: dict | str, extra: str = "") -> None:
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+                  500: "Internal Server Error", 503: "Service Unavailable"}[status]
+        if isinstance(body, str):
+            data, ctype = body.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            data, ctype = json.dumps(body, ensure_ascii=False).encode("utf-8"), "application/json"
+        writer.write((f"HTTP/1.1 {status} {reason}\r\nContent-Type: {ctype}\r\n"
+                      f"Content-Length: {len(data)}\r\nConnection: close\r\n{extra}\r\n").encode()
+                     + data)
+        await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                key, _, value = line.partition(":")
+                headers[key.strip().lower()] = value.strip()
+            if len(request_line) < 2:
+                return await self._respond(writer, 400, {"error": "requête invalide"})
+            method, path = request_line[0], request_line[1]
+
+            if method == "GET" and path == "/health":
+                return await self._respond(writer, 200, {"status": "ok"})
+            if method == "GET" and path == "/v1/stats":
+                return await self._respond(writer, 200, self.stats())
+            if method == "GET" and path == "/metrics":
+                return await self._respond(writer, 200, metrics.prometheus())
+            name = self.ROUTES.get(path)
+            if method != "POST" or name is None:
+                return await self._respond(writer, 404, {"error": f"{method} {path} inconnu"})
+
+            try:
+                length = int(headers.get("content-length", "0"))
+            except ValueError:
+                length = -1
+            if length < 0:
+                return await self._respond(writer, 400, {"error": "Content-Length invalide"})
+            if length > MAX_BODY:
+                return await self._respond(writer, 413, {"error": "requête trop volumineuse"})
+            try:
+                payload = validate(name, json.loads(await reader.readexactly(length)))
+            except ValueError as e:        # JSON invalide compris
+                return await self._respond(writer, 400, {"error": str(e)})
+
+            try:
+                result = await self.batchers[name].submit(payload)
+            except Overloaded:
+                return await self._respond(writer, 503, {"error": "file d'attente pleine"},
+                                           "Retry-After: 1\r\n")
+            except Exception as e:
+                return await self._respond(writer, 500, {"error": str(e)})
+            await self._respond(writer, 200, result)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int, preload: bool = True) -> None:
+        if preload:
+            from model_registry import registry
+            await asyncio.get_running_loop().run_in_executor(None, registry.preload)
+        self._build()
+        server = await asyncio.start_server(self._handle, host, port, backlog=1024)
+        logging.info(f"Service d'inférence à l'écoute sur http://{host}:{port} "
+                     f"(lots ≤ {self.max_batch}, attente ≤ {self.max_wait_ms} ms, "
+                     f"file ≤ {self.max_queue})")
+        async with server:
+            await server.serve_forever()
+
+
+# ─────────────── client ───────────────
+class InferenceClient:
+    """Client HTTP du service (utilisé par app.py si NLP_INFERENCE_URL est défini)."""
+
+    def __init__(self, url: str | None = None, timeout: float | None = None):
+        self.url = (url or os.environ["NLP_INFERENCE_URL"]).rstrip("/")
+        self.timeout = timeout or float(os.environ.get("NLP_INFERENCE_TIMEOUT", "300"))
+
+    def _call(self, path: str, payload: dict | None = None) -> dict:
+        data = None if payload is None else json.dumps(payload).encode("utf-8")
+        req = urllib.request.Request(self.url + path, data=data,
+                                     headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            detail = e.read().decode("utf-8", errors="replace")
+            if e.code == 503:
+                raise ServiceBusy(f"Service d'inférence saturé : {detail}") from e
+            raise RuntimeError(f"Service d'inférence ({e.code}) : {detail}") from e
+
+    def detect(self, text: str) -> dict:
+        """Même résultat que DocumentTypeDetector.detect_detailed([text])[0]."""
+        result = self._call("/v1/detect", {"text": text})
+        result["scores"] = [tuple(s) for s in result["scores"]]
+        return result
+
+    def translate(self, text: str, lang: str | None = None) -> str:
+        return self._call("/v1/translate", {"text": text, "lang": lang})["translation"]
+
+    def summarize(self, text: str, max_length: int = 120, min_length: int = 20) -> str:
+        return self._call("/v1/summarize", {"text": text, "max_length": max_length,
+                                            "min_length": min_length})["summary"]
+
+    def stats(self) -> dict:
+        return self._call("/v1/stats")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Service d'inférence local avec micro-lots.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--max-batch", type=int, default=None)
+    ap.add_argument("--max-wait-ms", type=float, default=None)
+    ap.add_argument("--max-queue", type=int, default=None)
+    ap.add_argument("--no-preload", action="store_true", help="modèles chargés à la première requête")
+    ap.add_argument("--metrics", action="store_true", help="active les mesures exposées sur /metrics")
+    args = ap.parse_args()
+    if args.metrics:
+        metrics.enable()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    service = InferenceService(args.max_batch, args.max_wait_ms, args.max_queue)
+    try:
+        asyncio.run(service.serve(args.host, args.port, preload=not args.no_preload))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
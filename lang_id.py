@@ -0,0 +1,234 @@
+# lang_id.py – identification rapide de la langue (n-grammes, numpy)
+"""
+Remplace l'appel direct à langdetect (Python pur, échantillonnage
+aléatoire répété sur tout le texte) par un classifieur bayésien sur les
+mêmes profils de n-grammes (1 à 3 caractères, fichiers de langdetect) :
+
+- index précalculé : matrice log P(n-gramme | langue) (n-grammes × 55
+  langues, float32), construite une fois puis relue depuis
+  <NLP_CACHE_DIR>/lang_id-*.npz ;
+- le texte n'est lu que sur un échantillon borné (NLP_LANGID_SAMPLE
+  caractères, répartis en plusieurs extraits sur tout le texte) ;
+- score = comptes des n-grammes × matrice (un produit numpy), confiance =
+  probabilité a posteriori de la langue retenue ;
+- confiance sous NLP_LANGID_MIN_CONFIDENCE (défaut 0.9), texte trop
+  pauvre ou langue hors de NLP_LANGID_LANGS (défaut "fr,en", les langues
+  du pipeline) : retour à langdetect sur le texte complet.
+
+Mêmes codes de langue que langdetect ("fr", "en", "zh-cn"…).
+NLP_LANGID=0 rétablit langdetect seul.
+"""
+from __future__ import annotations
+
+import collections
+import functools
+import json
+import logging
+import os
+import re
+import threading
+
+import numpy as np
+
+from metrics import metrics
+from result_cache import cache_dir
+
+
+def _env_number(name: str, default: float, cast=float, low: float = 0.0, high: float = float("inf")):
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return default
+    try:
+        number = cast(value)
+    except ValueError:
+        number = None
+    if number is None or not low <= number <= high:
+        logging.warning(f"{name} invalide : {value!r} (valeur par défaut {default})")
+        return default
+    return number
+
+
+SAMPLE_CHARS = _env_number("NLP_LANGID_SAMPLE", 2000, int, low=100)
+MIN_CONFIDENCE = _env_number("NLP_LANGID_MIN_CONFIDENCE", 0.9, float, high=1.0)
+ENABLED = os.environ.get("NLP_LANGID", "1") != "0"
+# langues que le chemin rapide peut rendre (celles que le pipeline traite) ;
+# toute autre réponse repasse par langdetect. Vide : toutes les langues.
+LANGUAGES = frozenset(l.strip() for l in os.environ.get("NLP_LANGID_LANGS", "fr,en").split(",") if l.strip())
+# version de l'algorithme : fait partie de la clé du cache de résultats
+VERSION = "ngram-2"
+
+_ALPHA = 0.5            # lissage des probabilités (valeurs de langdetect)
+_BASE_FREQ = 10000
+# chaque caractère entre dans jusqu'à 6 n-grammes (1 + 2 + 3) : la
+# log-vraisemblance est divisée d'autant pour ne compter chaque indice
+# qu'une fois ; la confiance croît ainsi avec la longueur du texte
+_CORRELATION = 6.0
+_MIN_NGRAMS = 40        # en deçà (~3 mots), pas assez d'indices : langdetect
+_EXCERPTS = 4           # extraits répartis dans le texte
+
+_rx_url = re.compile(r"https?://[-_.?&~;+=/#0-9A-Za-z]{1,2076}")
+_rx_mail = re.compile(r"[-_.0-9A-Za-z]{1,64}@[-_0-9A-Za-z]{1,255}[-_.0-9A-Za-z]{1,255}")
+
+
+@functools.lru_cache(maxsize=4096)
+def _norm_char(ch: str) -> str:
+    # même normalisation que langdetect (blocs Unicode, ponctuation → espace)
+    from langdetect.utils.ngram import NGram
+    return NGram.normalize(ch)
+
+
+def _sample(text: str, size: int = SAMPLE_CHARS) -> str:
+    """Au plus `size` caractères, en extraits répartis sur tout le texte."""
+    if len(text) <= size:
+        return text
+    part = size // _EXCERPTS
+    step = (len(text) - part) / (_EXCERPTS - 1)
+    return " ".join(text[int(k * step):int(k * step) + part] for k in range(_EXCERPTS))
+
+
+@functools.lru_cache(maxsize=65536)
+def _word_grams(word: str) -> tuple[str, ...]:
+    padded = f" {word} "
+    return tuple(padded[i:i + n] for n in (1, 2, 3) for i in range(len(padded) - n + 1)
+                 if padded[i:i + n] != " ")
+
+
+def ngrams(text: str) -> collections.Counter:
+    """
+    N-grammes de 1 à 3 caractères, extraits comme langdetect : mots bordés
+    d'espaces, mots entièrement en capitales ignorés (sigles, en-têtes OCR).
+    Chaque mot distinct n'est découpé qu'une fois.
+    """
+    text = _rx_mail.sub(" ", _rx_url.sub(" ", text))
+    words = collections.Counter("".join(map(_norm_char, text)).split())
+    grams = collections.Counter()
+    for word, count in words.items():
+        if len(word) > 1 and word.isupper():
+            continue
+        for g in _word_grams(word):
+            grams[g] += count
+    return grams
+
+
+class LanguageIdentifier:
+    """Index des profils langdetect et classification vectorisée."""
+
+    def __init__(self, profile_dir: str | None = None):
+        self.profile_dir = profile_dir
+        self._lock = threading.Lock()
+        self._index = None
+
+    def _path(self) -> str | None:
+        if self.profile_dir is not None:
+            return None              # profils personnalisés : pas d'index sur disque
+        from importlib.metadata import version
+        return os.path.join(cache_dir(), f"lang_id-{VERSION}-langdetect{version('langdetect')}.npz")
+
+    def _load(self):
+        path = self._path()
+        if path and os.path.exists(path):
+            try:
+                with np.load(path, allow_pickle=False) as data:
+                    vocab = data["vocab"].tolist()
+                    return data["langs"].tolist(), {g: i for i, g in enumerate(vocab)}, data["logp"]
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"Index de langues illisible, reconstruit : {e}")
+        langs, vocab, logp = self._build()
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.tmp.npz"
+                np.savez(tmp, langs=np.array(langs), vocab=np.array(vocab), logp=logp)
+                os.replace(tmp, path)
+            except OSError as e:
+                logging.warning(f"Index de langues non enregistré : {e}")
+        return langs, {g: i for i, g in enumerate(vocab)}, logp
+
+    def _build(self):
+        profile_dir = self.profile_dir
+        if profile_dir is None:
+            import langdetect
+            profile_dir = os.path.join(os.path.dirname(langdetect.__file__), "profiles")
+        profiles = {}
+        for name in sorted(os.listdir(profile_dir)):
+            with open(os.path.join(profile_dir, name), encoding="utf-8") as f:
+                profiles[name] = json.load(f)
+        langs = list(profiles)
+        vocab = sorted({g for p in profiles.values() for g in p["freq"]})
+        position = {g: i for i, g in enumerate(vocab)}
+        sizes = np.array([len(g) for g in vocab]) - 1
+        freq = np.zeros((len(vocab), len(langs)), dtype=np.float64)
+        totals = np.zeros((3, len(langs)), dtype=np.float64)
+        for j, lang in enumerate(langs):
+            p = profiles[lang]
+            for g, c in p["freq"].items():
+                freq[position[g], j] = c
+            totals[:, j] = p["n_words"]
+        # log P(g | langue), lissé comme langdetect : les profils sont élagués,
+        # un n-gramme absent coûte autant à toutes les langues
+        logp = np.log(freq / totals[sizes] + _ALPHA / _BASE_FREQ)
+        return langs, vocab, logp.astype(np.float32)
+
+    @property
+    def index(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._load()
+        return self._index
+
+    def scores(self, text: str) -> tuple[list[str], np.ndarray, int]:
+        """(langues, probabilités a posteriori, nombre de n-grammes connus)."""
+        langs, position, logp = self.index
+        grams = ngrams(_sample(text))
+        idx = np.fromiter((position[g] for g in grams if g in position), dtype=np.int64)
+        if idx.size == 0:
+            return langs, np.full(len(langs), 1 / len(langs)), 0
+        counts = np.fromiter((c for g, c in grams.items() if g in position), dtype=np.float32)
+        n = float(counts.sum())
+        ll = counts @ logp[idx]                 # log-vraisemblance par langue
+        ll = (ll - ll.max()) / _CORRELATION
+        post = np.exp(ll)
+        return langs, post / post.sum(), int(n)
+
+    def identify(self, text: str) -> tuple[str | None, float]:
+        """(langue, confiance) ; (None, 0.0) si le texte n'a aucun indice."""
+        langs, post, n = self.scores(text)
+        if n < _MIN_NGRAMS:
+            return None, 0.0
+        best = int(post.argmax())
+        return langs[best], float(post[best])
+
+
+identifier = LanguageIdentifier()
+
+
+def cache_tag() -> str:
+    """Réglages qui changent la réponse : partie de la clé du cache de résultats."""
+    if not ENABLED:
+        return "langdetect"
+    return (f"{VERSION}:sample={SAMPLE_CHARS}:min={MIN_CONFIDENCE:g}"
+            f":langs={','.join(sorted(LANGUAGES)) or '*'}+langdetect")
+
+
+def detect_detailed(text: str, min_confidence: float | None = None) -> tuple[str, float | None, str]:
+    """
+    (langue, confiance, chemin) : chemin "ngram" si la confiance suffit et
+    que la langue est dans LANGUAGES, sinon "langdetect" (confiance None ;
+    mêmes exceptions que langdetect.detect).
+    """
+    threshold = MIN_CONFIDENCE if min_confidence is None else min_confidence
+    if ENABLED:
+        lang, confidence = identifier.identify(text)
+        if lang is not None and confidence >= threshold and (not LANGUAGES or lang in LANGUAGES):
+            metrics.count("lang_id", path="ngram")
+            return lang, confidence, "ngram"
+    metrics.count("lang_id", path="langdetect")
+    from langdetect import DetectorFactory, detect as lang_detect
+    DetectorFactory.seed = 0
+    return lang_detect(text), None, "langdetect"
+
+
+def detect(text: str, min_confidence: float | None = None) -> str:
+    """Code de langue du texte, voir `detect_detailed`."""
+    return detect_detailed(text, min_confidence)[0]
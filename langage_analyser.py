@@ -1,8 +1,15 @@
-from functools import lru_cache
-from transformers import pipeline, AutoTokenizer
-import torch
+import functools
+import os
 import re
-from langdetect import detect as lang_detect, DetectorFactory, LangDetectException
+from langdetect import DetectorFactory, LangDetectException
+
+from model_registry import registry, default_device
+from inference_backend import backend_for, load_pipeline, model_tag, require_backend
+from result_cache import cache
+from translation_memory import memory, normalize
+from metrics import metrics
+from document import Document
+import lang_id
 
 # Configuration du détecteur de langue
 DetectorFactory.seed = 0
@@ -10,71 +17,266 @@ DetectorFactory.seed = 0
 # Limites pour la traduction automatique (MarianMT)
 _MAX_MODEL_LEN = 512       # longueur max du modèle
 _CHUNK_MARGIN   = 400      # marge (~80 % de la capacité)
+# segments traduits par passe du modèle (NLP_TRANSLATION_BATCH_SIZE)
+_BATCH_SIZE = int(os.environ.get("NLP_TRANSLATION_BATCH_SIZE", "8"))
+
+# préfixe des messages d'erreur rendus à la place d'une langue
+ERROR_PREFIX = "Erreur : "
+
+_rx_sentence  = re.compile(r'(?<=[.!?])\s+')
+_rx_paragraph = re.compile(r'\n\s*\n')
+
+# modèles de traduction (NLP_MODEL_EN_FR / NLP_MODEL_FR_EN pour en changer)
+_EN_FR = os.environ.get("NLP_MODEL_EN_FR", "Helsinki-NLP/opus-mt-en-fr")
+_FR_EN = os.environ.get("NLP_MODEL_FR_EN", "Helsinki-NLP/opus-mt-fr-en")
 
-@lru_cache
-def _translator(model_name: str, device: int):
-    """Retourne un pipeline de traduction pré‑chargé."""
-    return pipeline("translation", model=model_name, device=device)
+def _translator(model_name: str, device: int, backend: str = "torch", strict: bool = False):
+    """Retourne un pipeline de traduction partagé (voir model_registry)."""
+    # transformers importé par load_pipeline : première traduction seulement
+    pipe = registry.get(f"translation:{model_name}:{device}:{backend}",
+                        lambda: load_pipeline("translation", model_name, device, backend, strict=strict))
+    if strict:
+        require_backend(pipe, backend)
+    return pipe
+
+registry.register_warmup(lambda: [_translator(m, default_device(), backend_for("translation"))
+                                  for m in (_EN_FR, _FR_EN)])
 
 class LanguageAnalyzer:
-    def __init__(self):
-        self.device = 0 if torch.cuda.is_available() else -1
-        # pipelines de traduction
-        self.en_fr = _translator("Helsinki-NLP/opus-mt-en-fr", self.device)
-        self.fr_en = _translator("Helsinki-NLP/opus-mt-fr-en", self.device)
-        # tokenizers correspondants
-        self.en_tok = AutoTokenizer.from_pretrained("Helsinki-NLP/opus-mt-en-fr")
-        self.fr_tok = AutoTokenizer.from_pretrained("Helsinki-NLP/opus-mt-fr-en")
-
-    def detect_language(self, text: str):
+    def __init__(self, batch_size: int | None = None, backend: str | None = None):
+        # segments traduits par passe du modèle
+        self.batch_size = batch_size or _BATCH_SIZE
+        # moteur d'inférence : torch, int8 ou onnx (voir inference_backend)
+        self.backend = backend_for("translation", backend)
+        # moteur passé explicitement : pas de repli silencieux sur torch
+        self._strict = backend is not None
+
+    # résolu à la première traduction : la détection de langue seule
+    # n'importe pas torch
+    @functools.cached_property
+    def device(self):
+        return default_device()
+
+    # pipelines de traduction, chargés au premier usage
+    @property
+    def en_fr(self):
+        return _translator(_EN_FR, self.device, self.backend, self._strict)
+
+    @property
+    def fr_en(self):
+        return _translator(_FR_EN, self.device, self.backend, self._strict)
+
+    # tokenizers correspondants (ceux des pipelines, pas de rechargement)
+    @property
+    def en_tok(self):
+        return self.en_fr.tokenizer
+
+    @property
+    def fr_tok(self):
+        return self.fr_en.tokenizer
+
+    @metrics.timed("lang.detect")
+    def detect_language(self, text: str | Document):
         """
         Détecte la langue d'un texte (retourne 'en' ou 'fr').
         En cas d'erreur de détection, renvoie un message d'erreur.
+        Document : détectée une seule fois, gardée dans `doc.results` (un
+        message d'erreur n'y est pas gardé : la détection sera retentée).
+        Identification rapide par n-grammes (lang_id.py), langdetect
+        seulement si la confiance est insuffisante.
         """
+        if isinstance(text, Document):
+            doc = text
+            found, lang = doc.lookup("language")
+            if not found:
+                lang = self.detect_language(doc.text)
+                if not lang.startswith(ERROR_PREFIX):
+                    doc.store("language", lang)
+            return lang
         try:
-            return lang_detect(text)
+            return cache.cached("lang", text, lambda: lang_id.detect(text), detector=lang_id.cache_tag())
         except LangDetectException as e:
-            return f"Erreur : {e}"
+            return f"{ERROR_PREFIX}{e}"
 
-    def translate_text(self, text: str):
+    def translate_text(self, text: str | Document, lang: str | None = None):
         """
         Traduit un texte de l'anglais vers le français ou vice versa.
         Ne prend en charge que 'en' et 'fr'.
+        lang : langue source si l'appelant l'a déjà détectée (évite une
+               seconde détection ; pour un Document, celle qu'il porte).
         """
-        lang = self.detect_language(text)
-        if lang not in ("en", "fr"):
-            return "Langue non prise en charge."
+        return self.translate_texts([text], [lang])[0]
 
-        # Choix du modèle et du tokenizer
-        if lang == "en":
-            model, tokenizer = self.en_fr, self.en_tok
-        else:
-            model, tokenizer = self.fr_en, self.fr_tok
+    @metrics.timed("translate")
+    def translate_texts(self, texts: list[str | Document],
+                        langs: list[str | None] | None = None) -> list[str]:
+        """
+        Version par lots de translate_text : les textes d'une même langue
+        partagent les appels groupés au modèle (et la mémoire de traduction).
+        Les Documents déjà traduits (même sens, même moteur) ne sont pas
+        retraduits ; les autres reçoivent leur traduction.
+        """
+        docs = [t if isinstance(t, Document) else None for t in texts]
+        texts = [d.text if d is not None else t for d, t in zip(docs, texts)]
+        langs = list(langs or [None] * len(texts))
+        out: list[str | None] = [None] * len(texts)
+        todo: dict[str, list[int]] = {}
+        for k, text in enumerate(texts):
+            lang = langs[k] or self.detect_language(docs[k] or text)
+            if lang not in ("en", "fr"):
+                out[k] = "Langue non prise en charge."
+                continue
+            if docs[k] is not None:
+                found, value = docs[k].lookup("translation", lang=lang, backend=self.backend)
+                if found:
+                    out[k] = value
+                    continue
+            hit = cache.get(self._cache_key(text, lang))
+            if hit is not None:
+                out[k] = hit
+            else:
+                todo.setdefault(lang, []).append(k)
+            langs[k] = lang
+
+        for lang, idx in todo.items():
+            for k, result in zip(idx, self._translate([texts[k] for k in idx], lang)):
+                out[k] = result
+                cache.set(self._cache_key(texts[k], lang), result)
+        for k, doc in enumerate(docs):
+            if doc is not None and langs[k] in ("en", "fr"):
+                doc.store("translation", out[k], lang=langs[k], backend=self.backend)
+        return out
+
+    def _cache_key(self, text: str, lang: str) -> str:
+        model_name = _EN_FR if lang == "en" else _FR_EN
+        return cache.make_key("translation", text, model=model_tag(model_name, self.backend),
+                              max_len=_MAX_MODEL_LEN, chunk=_CHUNK_MARGIN, tm=memory.enabled)
+
+    def _translate(self, texts: list[str], lang: str) -> list[str]:
+        # Choix du modèle et du tokenizer (un seul accès au registre)
+        model = self.en_fr if lang == "en" else self.fr_en
+        tokenizer = model.tokenizer
+
+        if memory.enabled:
+            return self._translate_sentences(texts, lang, model, tokenizer)
 
         # Découpage intelligent pour ne pas dépasser la longueur max
-        chunks = self._smart_split(text, tokenizer)
-        translations = []
-        for chunk in chunks:
-            res = model(chunk, max_length=_MAX_MODEL_LEN, truncation=True)[0]["translation_text"]
-            translations.append(res.strip())
+        chunks = [self._smart_split(text, tokenizer) for text in texts]
+        flat = [c for parts in chunks for c in parts]
+        if not flat:
+            return [""] * len(texts)
+        # tous les segments de tous les textes en appels groupés
+        with metrics.span("translate.generate"):
+            results = list(model(flat, max_length=_MAX_MODEL_LEN, truncation=True,
+                                 batch_size=self.batch_size))
+        metrics.count("model_calls", stage="translate")
+        metrics.count("model_inputs", len(flat), stage="translate")
+        results = iter(results)
+        return ["\n\n".join(next(results)["translation_text"].strip() for _ in parts)
+                for parts in chunks]
+
+    def _translate_sentences(self, texts: list[str], lang: str, model, tokenizer) -> list[str]:
+        """
+        Traduction via la mémoire de traduction : seules les phrases jamais
+        vues (dans ce sens, avec ce modèle) passent par le modèle. Dans
+        chaque paragraphe, les suites de phrases inédites sont empaquetées
+        en segments d'environ _CHUNK_MARGIN tokens (comme _smart_split),
+        traduits en appels groupés ; les paragraphes sont conservés.
+        Chaque segment traduit est redécoupé en phrases pour alimenter la
+        mémoire ; si le nombre de phrases ne correspond pas, le segment
+        n'y est pas enregistré (pas d'alignement hasardeux).
+        """
+        model_name = model_tag(_EN_FR if lang == "en" else _FR_EN, self.backend)
+        direction = "en-fr" if lang == "en" else "fr-en"
+        docs = []
+        for text in texts:
+            paragraphs = [[normalize(s) for s in _rx_sentence.split(p) if s.strip()]
+                          for p in _rx_paragraph.split(text)]
+            docs.append([p for p in paragraphs if p])
+        sentences = [s for paragraphs in docs for p in paragraphs for s in p]
+        if not sentences:
+            return [""] * len(texts)
+
+        known = memory.lookup(sentences, direction, model_name)
+        missing = [s for s in dict.fromkeys(sentences) if s not in known]
+        lengths = dict(zip(missing, self._token_lengths(missing, tokenizer))) if missing else {}
 
-        return "\n\n".join(translations)
+        # paragraphe → morceaux : phrase connue (True) ou segment à traduire (False)
+        segments: dict[str, list[str]] = {}
+        layout = []
+        for paragraphs in docs:
+            doc_layout = []
+            for p in paragraphs:
+                pieces, run = [], []
+                for s in p + [None]:
+                    if s is not None and s not in known:
+                        run.append(s)
+                        continue
+                    for group in self._pack(run, [lengths[r] for r in run]):
+                        segment = " ".join(group)
+                        segments[segment] = group
+                        pieces.append((False, segment))
+                    run = []
+                    if s is not None:
+                        pieces.append((True, s))
+                doc_layout.append(pieces)
+            layout.append(doc_layout)
+
+        translated = {}
+        if segments:
+            # longueurs voisines dans un même lot : moins de remplissage
+            todo = sorted(segments, key=len, reverse=True)
+            with metrics.span("translate.generate"):
+                results = model(todo, max_length=_MAX_MODEL_LEN, truncation=True,
+                                batch_size=self.batch_size)
+            metrics.count("model_calls", stage="translate")
+            metrics.count("model_inputs", len(todo), stage="translate")
+            translated = {seg: r["translation_text"].strip() for seg, r in zip(todo, results)}
+            new = {}
+            for seg, out in translated.items():
+                group = segments[seg]
+                parts = [t for t in _rx_sentence.split(out) if t.strip()] if len(group) > 1 else [out]
+                if len(parts) == len(group):
+                    new.update(zip(group, parts))
+            memory.store_many(new, direction, model_name)
+        return ["\n\n".join(" ".join(known[x] if is_known else translated[x] for is_known, x in pieces)
+                            for pieces in doc_layout)
+                for doc_layout in layout]
 
     def _smart_split(self, text: str, tokenizer):
         """
         Scinde le texte en segments d'environ _CHUNK_MARGIN tokens
         sans couper au milieu des phrases.
+        Chaque phrase est tokenisée une seule fois (un appel groupé), puis les
+        phrases sont empaquetées en additionnant leurs longueurs : coût
+        linéaire en la longueur du texte.
         """
-        parts = []
-        buffer = ""
-        for sent in re.split(r'(?<=[.!?])\s+', text):
-            candidate = (buffer + " " + sent).strip()
-            if len(tokenizer(candidate)["input_ids"]) < _CHUNK_MARGIN:
-                buffer = candidate
+        sents = [s for s in _rx_sentence.split(text) if s.strip()]
+        if not sents:
+            return []
+        return [" ".join(group).strip()
+                for group in self._pack(sents, self._token_lengths(sents, tokenizer))]
+
+    @staticmethod
+    def _token_lengths(sents: list[str], tokenizer) -> list[int]:
+        """Longueur en tokens de chaque phrase (un seul appel au tokenizer)."""
+        lengths = [len(ids) for ids in tokenizer(sents, add_special_tokens=False)["input_ids"]]
+        metrics.count("tokens", sum(lengths), stage="translate")
+        return lengths
+
+    @staticmethod
+    def _pack(sents: list[str], lengths: list[int]) -> list[list[str]]:
+        """Phrases regroupées en paquets de moins de _CHUNK_MARGIN tokens."""
+        # +1 : token de fin de séquence ajouté par le tokenizer
+        groups, buffer, size = [], [], 1
+        for sent, n in zip(sents, lengths):
+            if size + n < _CHUNK_MARGIN:
+                buffer.append(sent)
+                size += n
             else:
                 if buffer:
-                    parts.append(buffer)
-                buffer = sent
+                    groups.append(buffer)
+                buffer, size = [sent], 1 + n
         if buffer:
-            parts.append(buffer)
-        return parts
+            groups.append(buffer)
+        return groups
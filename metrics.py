@@ -0,0 +1,252 @@
+# metrics.py – instrumentation des étapes du pipeline (durées, compteurs, mémoire)
+"""
+Mesures internes de tout le processus, désactivées par défaut
+(NLP_METRICS=1 ou `metrics.enable()` pour les activer) :
+
+- `span(nom, **labels)` : bloc chronométré (histogramme de durées) ;
+- `timed(nom, **labels)` : même chose pour une fonction entière ;
+- `observe(nom, secondes, **labels)` : durée déjà mesurée par l'appelant ;
+- `count(nom, valeur, **labels)` : compteur (pages, fenêtres, tokens,
+  appels de modèle, succès / échecs de cache…) ;
+- `trace(nom)` : regroupe les mesures d'un document (thread et tâche
+  courants) pour en afficher la ventilation, pic de mémoire compris.
+
+Export : `prometheus()` (format texte Prometheus) et `snapshot()` (JSON).
+Désactivé, chaque appel se réduit à un test de booléen. Les mesures sont
+propres au processus : les workers d'OCR parallèle ou de batch_pipeline.py
+ont les leurs.
+"""
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import functools
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:          # Windows
+    resource = None
+
+# bornes des histogrammes de durée (secondes)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_NOOP = contextlib.nullcontext()
+_current: contextvars.ContextVar[Trace | None] = contextvars.ContextVar("nlp_trace", default=None)
+
+
+def _mb(n: int | None) -> float | None:
+    return round(n / 2**20, 1) if n is not None else None
+
+
+def peak_rss_bytes() -> int | None:
+    """Pic de mémoire résidente du processus, None si inconnu."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def rss_bytes() -> int | None:
+    """Mémoire résidente actuelle (Linux), None ailleurs."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+
+def _label_str(labels: tuple, extra: str = "") -> str:
+    def esc(v):
+        return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    parts = [f'{k}="{esc(v)}"' for k, v in labels] + ([extra] if extra else [])
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _display(key: tuple) -> str:
+    name, labels = key
+    return name + (_label_str(labels) if labels else "")
+
+
+class Trace:
+    """Mesures d'un document : durée par étape, compteurs, mémoire."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stages: dict[str, list] = {}       # étape → [appels, secondes]
+        self.counters: dict[str, float] = {}
+        self._t0 = time.perf_counter()
+        self._rss0 = rss_bytes()
+        self.seconds = None
+        self.rss_delta = None
+
+    def _finish(self) -> None:
+        self.seconds = time.perf_counter() - self._t0
+        rss = rss_bytes()
+        if rss is not None and self._rss0 is not None:
+            self.rss_delta = rss - self._rss0
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "seconds": round(self.seconds, 4) if self.seconds is not None else None,
+            "stages": {k: {"calls": c, "seconds": round(s, 4)}
+                       for k, (c, s) in sorted(self.stages.items(), key=lambda kv: -kv[1][1])},
+            "counters": dict(sorted(self.counters.items())),
+            "rss_delta_mb": _mb(self.rss_delta),
+            "peak_rss_mb": _mb(peak_rss_bytes()),
+        }
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "labels", "t0")
+
+    def __init__(self, metrics: Metrics, name: str, labels: dict):
+        self.metrics, self.name, self.labels = metrics, name, labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.name, time.perf_counter() - self.t0, **self.labels)
+        if exc_type is not None:
+            self.metrics.count("errors", stage=self.name)
+        return False
+
+
+class Metrics:
+    """Histogrammes de durées et compteurs, thread-safe."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._hist: dict[tuple, list] = {}      # clé → [n, somme, max, compte par borne]
+        self._counters: dict[tuple, float] = {}
+        self.last_trace: Trace | None = None
+
+    def enable(self, on: bool = True) -> None:
+        self.enabled = on
+
+    # ------------------------------------------------------------------
+    def span(self, name: str, **labels):
+        """Bloc chronométré : `with metrics.span("ocr.easyocr"): ...`."""
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name, labels)
+
+    def timed(self, name: str, **labels):
+        """Décorateur : chaque appel de la fonction est un span `name`."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Span(self, name, labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            h = self._hist.get(key)
+            if h is None:
+                h = self._hist[key] = [0, 0.0, 0.0, [0] * len(BUCKETS)]
+            h[0] += 1
+            h[1] += seconds
+            h[2] = max(h[2], seconds)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    h[3][i] += 1
+                    break
+        tr = _current.get()
+        if tr is not None:
+            entry = tr.stages.setdefault(_display(key), [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        tr = _current.get()
+        if tr is not None:
+            shown = _display(key)
+            tr.counters[shown] = tr.counters.get(shown, 0) + value
+
+    @contextlib.contextmanager
+    def trace(self, name: str = "document"):
+        """Regroupe les mesures du bloc ; le résultat reste dans `last_trace`."""
+        tr = Trace(name)
+        if not self.enabled:
+            yield tr
+            return
+        token = _current.set(tr)
+        try:
+            yield tr
+        finally:
+            _current.reset(token)
+            tr._finish()
+            self.last_trace = tr
+
+    # ------------------------------------------------------------------
+    def snapshot(self) -> dict:
+        """Toutes les mesures, sérialisables en JSON."""
+        with self._lock:
+            hist = {k: (h[0], h[1], h[2]) for k, h in self._hist.items()}
+            counters = dict(self._counters)
+        return {
+            "enabled": self.enabled,
+            "stages": {_display(k): {"count": n, "seconds": round(s, 4), "mean": round(s / n, 4),
+                                     "max": round(m, 4)} for k, (n, s, m) in sorted(hist.items())},
+            "counters": {_display(k): v for k, v in sorted(counters.items())},
+            "process": {"peak_rss_mb": _mb(peak_rss_bytes()), "rss_mb": _mb(rss_bytes())},
+        }
+
+    def prometheus(self) -> str:
+        """Format texte d'exposition Prometheus."""
+        with self._lock:
+            hist = {k: (h[0], h[1], list(h[3])) for k, h in self._hist.items()}
+            counters = dict(self._counters)
+        lines = ["# HELP nlp_stage_seconds Durée des étapes du pipeline.",
+                 "# TYPE nlp_stage_seconds histogram"]
+        for (name, labels), (n, total, buckets) in sorted(hist.items()):
+            labels = (("stage", name),) + labels
+            cumul = 0
+            for bound, c in zip(BUCKETS, buckets):
+                cumul += c
+                le = 'le="%s"' % bound
+                lines.append(f"nlp_stage_seconds_bucket{_label_str(labels, le)} {cumul}")
+            le = 'le="+Inf"'
+            lines.append(f"nlp_stage_seconds_bucket{_label_str(labels, le)} {n}")
+            lines.append(f"nlp_stage_seconds_sum{_label_str(labels)} {total}")
+            lines.append(f"nlp_stage_seconds_count{_label_str(labels)} {n}")
+        for name in sorted({name for name, _ in counters}):
+            lines += [f"# TYPE nlp_{name}_total counter"]
+            lines += [f"nlp_{name}_total{_label_str(labels)} {v:g}"
+                      for (n, labels), v in sorted(counters.items()) if n == name]
+        for name, value in (("peak_rss", peak_rss_bytes()), ("rss", rss_bytes())):
+            if value is not None:
+                lines += [f"# TYPE nlp_process_{name}_bytes gauge", f"nlp_process_{name}_bytes {value}"]
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hist.clear()
+            self._counters.clear()
+
+
+# instance partagée par tous les modules
+metrics = Metrics(os.environ.get("NLP_METRICS", "0") == "1")
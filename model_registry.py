@@ -0,0 +1,213 @@
+# model_registry.py – registre de modèles partagé par tout le processus
+"""
+Un seul exemplaire de chaque modèle (EasyOCR, mDeBERTa zero-shot, opus-mt,
+T5…) par processus : les sessions Streamlit et les threads se partagent les
+mêmes objets au lieu de les recharger à chaque clic.
+
+- chargement paresseux au premier `get`, ou à l'avance via `preload()` ;
+- budget mémoire optionnel (variable NLP_MODEL_BUDGET_MB) : au-delà, les
+  modèles les moins récemment utilisés sont évincés (LRU) ;
+- compteurs loads / hits / evictions consultables via `stats()`.
+
+Les bibliothèques lourdes (torch, transformers, easyocr) ne sont importées
+que dans les fonctions de chargement : importer un module du projet reste
+quasi instantané.
+"""
+from __future__ import annotations
+
+import collections
+import gc
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable
+
+from metrics import metrics
+
+_BUDGET_ENV = "NLP_MODEL_BUDGET_MB"
+
+
+def gpu_available() -> bool:
+    import torch   # import différé : seulement quand un modèle va servir
+    return torch.cuda.is_available()
+
+
+def default_device() -> int:
+    """GPU 0 si disponible, sinon CPU (-1), convention des pipelines HF."""
+    return 0 if gpu_available() else -1
+
+
+# fichiers des modèles ONNX Runtime (optimum) : un seul pour les encodeurs,
+# encodeur + décodeurs pour les seq2seq
+_ONNX_PATHS = ("model_path", "encoder_model_path", "decoder_model_path",
+               "decoder_with_past_model_path")
+
+
+def _onnx_files(m: Any) -> set[str]:
+    """Fichiers .onnx d'un modèle optimum, poids externes (.onnx_data) compris."""
+    files = set()
+    for attr in _ONNX_PATHS:
+        path = getattr(m, attr, None)
+        if path is None or not os.path.isfile(str(path)):
+            continue
+        path = str(path)
+        folder, name = os.path.split(path)
+        files.update(os.path.join(folder, f) for f in os.listdir(folder)
+                     if f == name or f.startswith(name + "_") or f.startswith(name + "."))
+    return files
+
+
+def estimate_size(obj: Any) -> int:
+    """
+    Taille approximative (octets) des poids d'un modèle.
+    Gère les pipelines HF (`.model`), les Reader EasyOCR (`.detector`,
+    `.recognizer`), les nn.Module et les modèles ONNX Runtime (taille des
+    fichiers .onnx, que la session garde en mémoire) ; 0 pour le reste
+    (tokenizers…).
+    """
+    modules = [getattr(obj, a, None) for a in ("model", "detector", "recognizer")]
+    modules.append(obj)
+    seen, files, total = set(), set(), 0
+    for m in modules:
+        if m is None:
+            continue
+        if not hasattr(m, "parameters"):
+            files |= _onnx_files(m)
+            continue
+        tensors = list(m.parameters()) + list(getattr(m, "buffers", lambda: [])())
+        for t in tensors:
+            if id(t) not in seen:
+                seen.add(id(t))
+                total += t.numel() * t.element_size()
+    return total + sum(os.path.getsize(f) for f in files)
+
+
+class ModelRegistry:
+    """Cache LRU de modèles, thread-safe, borné par un budget mémoire."""
+
+    def __init__(self, budget_mb: float | None = None):
+        self.budget = int(budget_mb * 1024 * 1024) if budget_mb else None
+        self._loaders: dict[str, Callable[[], Any]] = {}
+        self._models: collections.OrderedDict[str, tuple[Any, int]] = collections.OrderedDict()
+        self._warmups: list[Callable[[], Any]] = []
+        self._lock = threading.RLock()
+        self._load_locks: dict[str, threading.Lock] = {}
+        self.counters = {"loads": 0, "hits": 0, "evictions": 0}
+        self.load_seconds = 0.0
+
+    # ------------------------------------------------------------------
+    def register(self, name: str, loader: Callable[[], Any]) -> None:
+        """Associe un nom à sa fonction de chargement (sans charger)."""
+        with self._lock:
+            self._loaders.setdefault(name, loader)
+
+    def register_warmup(self, fn: Callable[[], Any]) -> None:
+        """Ajoute une fonction qui charge les modèles par défaut d'un module."""
+        with self._lock:
+            self._warmups.append(fn)
+
+    def get(self, name: str, loader: Callable[[], Any] | None = None) -> Any:
+        """Retourne le modèle `name`, en le chargeant au besoin (une seule fois)."""
+        with self._lock:
+            hit = self._hit(name)
+            if hit is not None:
+                return hit
+            if loader is not None:
+                self._loaders.setdefault(name, loader)
+            if name not in self._loaders:
+                raise KeyError(f"Modèle inconnu : {name}")
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # un verrou par modèle : deux threads ne chargent jamais le même modèle
+        with load_lock:
+            with self._lock:
+                hit = self._hit(name)
+                if hit is not None:
+                    return hit
+                loader = self._loaders[name]
+            t0 = time.perf_counter()
+            obj = loader()
+            elapsed = time.perf_counter() - t0
+            metrics.observe("model.load", elapsed, model=name)
+            size = estimate_size(obj)
+            with self._lock:
+                self._models[name] = (obj, size)
+                self.counters["loads"] += 1
+                self.load_seconds += elapsed
+                logging.info(f"Modèle chargé : {name} ({size / 2**20:.0f} Mo, {elapsed:.1f} s)")
+                self._enforce_budget(keep=name)
+        return obj
+
+    def _hit(self, name: str) -> Any:
+        entry = self._models.get(name)
+        if entry is None:
+            return None
+        self._models.move_to_end(name)
+        self.counters["hits"] += 1
+        return entry[0]
+
+    def _enforce_budget(self, keep: str) -> None:
+        if self.budget is None:
+            return
+        evicted = False
+        for name in list(self._models):
+            if self.total_bytes() <= self.budget:
+                break
+            if name == keep:
+                continue
+            del self._models[name]
+            self.counters["evictions"] += 1
+            evicted = True
+            logging.info(f"Modèle évincé (budget mémoire) : {name}")
+        if evicted:
+            gc.collect()
+
+    # ------------------------------------------------------------------
+    def preload(self) -> None:
+        """Charge à l'avance les modèles par défaut de tous les modules importés."""
+        for fn in list(self._warmups):
+            try:
+                fn()
+            except Exception as e:
+                logging.warning(f"Préchargement impossible : {e}")
+
+    def evict(self, name: str) -> bool:
+        with self._lock:
+            if self._models.pop(name, None) is None:
+                return False
+            self.counters["evictions"] += 1
+        gc.collect()
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+        gc.collect()
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(size for _, size in self._models.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.counters,
+                "load_seconds": round(self.load_seconds, 3),
+                "loaded": {n: round(s / 2**20, 1) for n, (_, s) in self._models.items()},
+                "total_mb": round(self.total_bytes() / 2**20, 1),
+                "budget_mb": round(self.budget / 2**20, 1) if self.budget else None,
+            }
+
+
+def _budget_from_env() -> float | None:
+    value = os.environ.get(_BUDGET_ENV, "").strip()
+    try:
+        return float(value) if value else None
+    except ValueError:
+        logging.warning(f"{_BUDGET_ENV} invalide : {value!r} (budget ignoré)")
+        return None
+
+
+# instance unique du processus
+registry = ModelRegistry(budget_mb=_budget_from_env())
@@ -1,11 +1,36 @@
 # ocr_processor.py – extraction de texte avec EasyOCR
+from __future__ import annotations
 
+import collections
+import functools
 import io
+import os
+import time
+from typing import TYPE_CHECKING, Iterable, Iterator
 import numpy as np
 from PIL import Image
-from pdf2image import convert_from_bytes
-import easyocr
-import torch
+
+from model_registry import registry, gpu_available
+from result_cache import cache
+from metrics import metrics
+from pdf_utils import PdfPage, iter_pdf_pages
+from image_preprocessing import PreprocessConfig, preprocess as _preprocess
+import parallel_ocr
+
+if TYPE_CHECKING:
+    import easyocr
+
+
+def _reader(langs: tuple[str, ...], gpu: bool) -> easyocr.Reader:
+    """Reader EasyOCR partagé par tout le processus (voir model_registry)."""
+    def load():
+        import easyocr   # import différé (torch) : au premier OCR seulement
+        return easyocr.Reader(list(langs), gpu=gpu)
+    return registry.get(f"easyocr:{','.join(langs)}:{'gpu' if gpu else 'cpu'}", load)
+
+
+registry.register_warmup(lambda: _reader(("fr", "en"), gpu_available()))
+
 
 class OCRProcessor:
     """
@@ -13,50 +38,146 @@ class OCRProcessor:
     Nécessite : easyocr, pillow, pdf2image (et poppler pour PDF).
     """
 
-    def __init__(self, langs: list[str] | None = None):
+    def __init__(self, langs: list[str] | None = None, workers: int | None = None,
+                 text_layer: bool | None = None, preprocess: PreprocessConfig | None = None):
         """
-        langs : liste de codes de langue pour EasyOCR (ex. ['fr','en']).
+        langs      : liste de codes de langue pour EasyOCR (ex. ['fr','en']).
+        workers    : nombre de processus OCR pour les PDF multi‑pages
+                     (défaut : NLP_OCR_WORKERS, sinon 1 = séquentiel).
+        text_layer : lire la couche texte native des PDF avant l'OCR
+                     (défaut : NLP_PDF_TEXT_LAYER, activé).
+        preprocess : prétraitement des images avant l'OCR
+                     (défaut : préréglage NLP_OCR_PREPROCESS, "fast").
         """
-        langs = langs or ["fr", "en"]
-        # GPU si disponible, sinon CPU
-        use_gpu = torch.cuda.is_available()
-        self.reader = easyocr.Reader(langs, gpu=use_gpu)
+        self.langs = tuple(langs or ["fr", "en"])
+        self.workers = parallel_ocr.ocr_workers(workers)
+        if text_layer is None:
+            text_layer = os.environ.get("NLP_PDF_TEXT_LAYER", "1") != "0"
+        self.text_layer = text_layer
+        self.preprocess = preprocess or PreprocessConfig.from_env()
+        self.last_report: list[dict] = []
+        # temps cumulés par étape (prétraitement, OCR), en secondes
+        self.timings: dict[str, float] = collections.defaultdict(float)
+
+    # GPU si disponible, sinon CPU ; résolu au premier OCR (import de torch
+    # évité pour les PDF entièrement lus depuis leur couche texte)
+    @functools.cached_property
+    def use_gpu(self) -> bool:
+        return gpu_available()
+
+    @property
+    def reader(self) -> easyocr.Reader:
+        # récupéré à chaque usage pour que le registre puisse l'évincer
+        return _reader(self.langs, self.use_gpu)
 
     def extract_text_from_image(self, image: Image.Image) -> str:
         """
-        Extrait le texte d'une image PIL.Image via EasyOCR.
+        Extrait le texte d'une image PIL.Image via EasyOCR,
+        après prétraitement (réduction, niveaux de gris…).
         """
+        image = self._prepare(image)
+        t = time.perf_counter()
         img = image.convert("RGB")
         arr = np.array(img)
         # detail=0 => on ne récupère que les chaînes
         lines = self.reader.readtext(arr, detail=0)
+        dt = time.perf_counter() - t
+        self.timings["ocr"] += dt
+        metrics.observe("ocr.easyocr", dt)
         return "\n".join(lines)
 
-    def extract_text_from_pdf(self, file_obj: io.BytesIO) -> str:
+    def _prepare(self, image: Image.Image) -> Image.Image:
+        image, timings = _preprocess(image, self.preprocess)
+        for stage, dt in timings.items():
+            self.timings[f"preprocess.{stage}"] += dt
+            metrics.observe(f"ocr.preprocess.{stage}", dt)
+        return image
+
+    def _ocr_pages(self, pages: Iterable[PdfPage]) -> Iterator[str]:
+        """Texte de chaque page (couche native ou OCR), dans l'ordre."""
+        if self.workers <= 1:
+            for page in pages:
+                yield page.text if page.text is not None else self.extract_text_from_image(page.image)
+        elif self.use_gpu:
+            # GPU : un seul Reader, pages regroupées en lots
+            yield from parallel_ocr.easyocr_batched(self.reader, pages, self.workers, self._prepare)
+        else:
+            # CPU : un Reader par processus, ordre des pages conservé
+            yield from parallel_ocr.easyocr_pages(pages, self.langs, self.workers, self.preprocess)
+
+    def iter_pages_from_pdf(self, file_obj: io.BytesIO, first_page: int = 1) -> Iterator[dict]:
         """
-        Extrait le texte d'un PDF :
+        Extrait le texte d'un PDF page par page (générateur) :
         - Lit les bytes
-        - Convertit en images (une page = une image)
-        - OCR page par page
+        - Prend la couche texte native des pages qui en ont une
+        - Rastérise les autres quelques pages à la fois (mémoire bornée)
+          et les passe à l'OCR dès qu'elles sont prêtes
+        Chaque élément : {"page": n, "source": "text" | "ocr" | "error", "text": ...}
+        first_page : première page à produire (reprise après le cache).
         """
         file_obj.seek(0)
         pdf_bytes = file_obj.read()
-        pages = convert_from_bytes(pdf_bytes)
-        all_text = []
-        for page in pages:
-            all_text.append(self.extract_text_from_image(page))
-        return "\n\n".join(all_text)
+        sources = collections.deque()
+
+        def tracked():
+            for page in iter_pdf_pages(pdf_bytes, text_layer=self.text_layer,
+                                       dpi_for=self.preprocess.pdf_dpi, first_page=first_page):
+                sources.append((page.number, page.source))
+                yield page
+
+        for text in self._ocr_pages(tracked()):
+            number, source = sources.popleft()
+            yield {"page": number, "source": source, "text": text}
+
+    def iter_text_from_pdf(self, file_obj: io.BytesIO) -> Iterator[str]:
+        for page in self.iter_pages_from_pdf(file_obj):
+            yield page["text"]
+
+    def extract_text_from_pdf(self, file_obj: io.BytesIO) -> str:
+        """Extrait le texte complet d'un PDF."""
+        return "\n\n".join(self.iter_text_from_pdf(file_obj))
+
+    def iter_pages(self, file_obj: io.BytesIO, file_extension: str) -> Iterator[dict]:
+        """
+        Routeur selon l'extension ; génère les pages une à une
+        (une seule page pour une image), voir `iter_pages_from_pdf`.
+        file_extension : 'pdf', 'jpg', 'png', etc.
+        Les pages sont mises en cache sur disque une à une, dès qu'elles
+        sont prêtes (clé : hash du fichier, voir ResultCache.iter_pages) et
+        `last_report` indique, à la fin, le chemin suivi par chaque page.
+        """
+        ext = file_extension.lower()
+        if ext not in ["jpg", "jpeg", "png", "bmp", "tiff", "tif", "pdf"]:
+            raise ValueError(f"Format non supporté : {file_extension}")
+        file_obj.seek(0)
+        data = file_obj.read()
+        file_obj.seek(0)
+
+        key = cache.make_key("ocr", data, backend="easyocr", langs=self.langs, ext=ext,
+                             text_layer=self.text_layer, preprocess=self.preprocess.as_dict())
+
+        def produce(first: int) -> Iterator[dict]:
+            if ext == "pdf":
+                yield from self.iter_pages_from_pdf(file_obj, first_page=first)
+            elif first == 1:
+                text = self.extract_text_from_image(Image.open(file_obj))
+                yield {"page": 1, "source": "ocr", "text": text}
+
+        pages = []
+        for page, cached in cache.iter_pages(key, produce):
+            metrics.count("pages", source="cache" if cached else page["source"])
+            pages.append(page)
+            yield page
+        self.last_report = [{"page": p["page"], "source": p["source"]} for p in pages]
+
+    def iter_text(self, file_obj: io.BytesIO, file_extension: str) -> Iterator[str]:
+        """Texte page par page, voir `iter_pages`."""
+        for page in self.iter_pages(file_obj, file_extension):
+            yield page["text"]
 
     def extract_text(self, file_obj: io.BytesIO, file_extension: str) -> str:
         """
         Routeur selon l'extension.
         file_extension : 'pdf', 'jpg', 'png', etc.
         """
-        ext = file_extension.lower()
-        if ext in ["jpg", "jpeg", "png", "bmp", "tiff", "tif"]:
-            image = Image.open(file_obj)
-            return self.extract_text_from_image(image)
-        elif ext == "pdf":
-            return self.extract_text_from_pdf(file_obj)
-        else:
-            raise ValueError(f"Format non supporté : {file_extension}")
+        return "\n\n".join(self.iter_text(file_obj, file_extension))
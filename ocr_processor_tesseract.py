@@ -1,8 +1,16 @@
+import collections
+import os
+import time
+
 import pytesseract
 from PIL import Image
-import tempfile
-import os
-from pdf2image import convert_from_path
+
+from pdf_utils import iter_pdf_pages
+from image_preprocessing import PreprocessConfig, preprocess as _preprocess
+import parallel_ocr
+from result_cache import cache
+from metrics import metrics
+
 pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
 class OCRProcessor:
@@ -10,44 +18,102 @@ class OCRProcessor:
     Classe pour extraire le texte d'un fichier image ou PDF en utilisant OCR.
     Nécessite : pytesseract, pillow, pdf2image et poppler (pour pdf2image).
     """
-    def __init__(self):
-        pass
+    def __init__(self, workers=None, text_layer=None, preprocess=None):
+        # nombre de processus pour les PDF multi‑pages (défaut : NLP_OCR_WORKERS)
+        self.workers = parallel_ocr.ocr_workers(workers)
+        # couche texte native des PDF lue avant l'OCR (défaut : NLP_PDF_TEXT_LAYER)
+        if text_layer is None:
+            text_layer = os.environ.get("NLP_PDF_TEXT_LAYER", "1") != "0"
+        self.text_layer = text_layer
+        # prétraitement des images (défaut : préréglage NLP_OCR_PREPROCESS)
+        self.preprocess = preprocess or PreprocessConfig.from_env()
+        self.last_report = []
+        self.timings = collections.defaultdict(float)
 
     def extract_text_from_image(self, image):
-        """Extrait le texte d'une image PIL."""
-        return pytesseract.image_to_string(image)
+        """Extrait le texte d'une image PIL, après prétraitement."""
+        image, timings = _preprocess(image, self.preprocess)
+        for stage, dt in timings.items():
+            self.timings[f"preprocess.{stage}"] += dt
+            metrics.observe(f"ocr.preprocess.{stage}", dt)
+        t = time.perf_counter()
+        text = pytesseract.image_to_string(image)
+        dt = time.perf_counter() - t
+        self.timings["ocr"] += dt
+        metrics.observe("ocr.tesseract", dt)
+        return text
 
-    def extract_text_from_pdf(self, file):
+    def iter_pages_from_pdf(self, file, first_page=1):
         """
-        Extrait le texte d'un fichier PDF.
-        Le fichier est sauvegardé temporairement, converti en images puis traité.
+        Extrait le texte d'un fichier PDF page par page (générateur).
+        Les pages avec une couche texte native sont lues directement, les
+        autres sont rastérisées par petits groupes puis passées à l'OCR.
+        Chaque élément : {"page": n, "source": "text" | "ocr" | "error", "text": ...}
+        first_page : première page à produire (reprise après le cache).
         """
-        # Sauvegarde du PDF dans un fichier temporaire
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(file.read())
-            tmp_path = tmp.name
-
-        # Conversion du PDF en images (une image par page)
-        pages = convert_from_path(tmp_path)
-        text = ""
-        for page in pages:
-            text += self.extract_text_from_image(page) + "\n"
-
-        # Suppression du fichier temporaire
-        os.remove(tmp_path)
-        return text
+        sources = collections.deque()
 
-    def extract_text(self, file, file_extension):
+        def tracked():
+            for page in iter_pdf_pages(file.read(), text_layer=self.text_layer,
+                                       dpi_for=self.preprocess.pdf_dpi, first_page=first_page):
+                sources.append((page.number, page.source))
+                yield page
+
+        if self.workers > 1:
+            texts = parallel_ocr.tesseract_pages(tracked(), self.workers, self.preprocess)
+        else:
+            texts = (p.text if p.text is not None else self.extract_text_from_image(p.image)
+                     for p in tracked())
+        for text in texts:
+            number, source = sources.popleft()
+            yield {"page": number, "source": source, "text": text + "\n"}
+
+    def iter_text_from_pdf(self, file):
+        for page in self.iter_pages_from_pdf(file):
+            yield page["text"]
+
+    def extract_text_from_pdf(self, file):
+        """Extrait le texte complet d'un fichier PDF."""
+        return "".join(self.iter_text_from_pdf(file))
+
+    def iter_pages(self, file, file_extension):
         """
-        Extrait le texte du fichier en fonction de son extension.
+        Génère les pages du fichier une à une selon son extension.
         file : objet file-like (par exemple un BytesIO)
         file_extension : extension du fichier (ex: "pdf", "jpg", "png", etc.)
+        Chaque page est mise en cache dès qu'elle est prête ; à la fin,
+        `last_report` indique le chemin suivi par chaque page.
         """
         file.seek(0)  # Réinitialiser le curseur
-        if file_extension.lower() in ['jpg', 'jpeg', 'png', 'bmp', 'tiff']:
-            image = Image.open(file)
-            return self.extract_text_from_image(image)
-        elif file_extension.lower() == 'pdf':
-            return self.extract_text_from_pdf(file)
-        else:
+        ext = file_extension.lower()
+        if ext not in ['jpg', 'jpeg', 'png', 'bmp', 'tiff', 'pdf']:
             raise ValueError("Format de fichier non supporté : " + file_extension)
+        data = file.read()
+        file.seek(0)
+
+        key = cache.make_key("ocr", data, backend="tesseract", ext=ext, text_layer=self.text_layer,
+                             preprocess=self.preprocess.as_dict())
+
+        def produce(first):
+            if ext == 'pdf':
+                file.seek(0)
+                yield from self.iter_pages_from_pdf(file, first_page=first)
+            elif first == 1:
+                text = self.extract_text_from_image(Image.open(file))
+                yield {"page": 1, "source": "ocr", "text": text}
+
+        pages = []
+        for page, cached in cache.iter_pages(key, produce):
+            metrics.count("pages", source="cache" if cached else page["source"])
+            pages.append(page)
+            yield page
+        self.last_report = [{"page": p["page"], "source": p["source"]} for p in pages]
+
+    def iter_text(self, file, file_extension):
+        """Génère le texte du fichier page par page selon son extension."""
+        for page in self.iter_pages(file, file_extension):
+            yield page["text"]
+
+    def extract_text(self, file, file_extension):
+        """Extrait le texte du fichier en fonction de son extension."""
+        return "".join(self.iter_text(file, file_extension))
@@ -0,0 +1,159 @@
+# parallel_ocr.py – OCR multi-pages réparti sur plusieurs cœurs
+"""
+Répartit les pages d'un document sur un pool de processus, en conservant
+l'ordre des pages et le fonctionnement en flux (au plus 2 × workers pages
+en vol à la fois).
+
+- Tesseract : chaque page est envoyée à `pytesseract` dans un processus ;
+- EasyOCR  : chaque processus charge une fois son Reader (initializer) et le
+  réutilise pour toutes les pages ; sur GPU, les pages sont regroupées en
+  lots pour `readtext_batched` dans le processus courant.
+
+Nombre de workers : paramètre `workers` des OCRProcessor ou variable
+NLP_OCR_WORKERS (défaut 1 = séquentiel).
+"""
+from __future__ import annotations
+
+import atexit
+import collections
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+from PIL import Image
+
+from pdf_utils import PdfPage
+
+_pools: dict[tuple, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def ocr_workers(workers: int | None = None) -> int:
+    if workers is None:
+        workers = int(os.environ.get("NLP_OCR_WORKERS", "1"))
+    return max(1, workers)
+
+
+def limit_threads(workers: int) -> None:
+    # évite la sur‑souscription : chaque worker n'utilise que sa part des cœurs
+    n = max(1, (os.cpu_count() or 1) // workers)
+    os.environ["OMP_NUM_THREADS"] = str(n)
+    try:
+        import torch
+        torch.set_num_threads(n)
+    except ImportError:
+        pass
+
+
+def get_pool(name: str, workers: int, initializer: Callable | None = None,
+             initargs: tuple = ()) -> ProcessPoolExecutor:
+    """Pool de processus réutilisé entre les appels (les modèles y restent chargés)."""
+    key = (name, workers, initargs)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            # "spawn" : pas de fork d'un processus qui a déjà des threads torch
+            pool = ProcessPoolExecutor(max_workers=workers,
+                                       mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=initializer, initargs=initargs)
+            _pools[key] = pool
+        return pool
+
+
+@atexit.register
+def shutdown_pools() -> None:
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
+
+
+def ordered_map(executor: Executor, fn: Callable[[Image.Image], str], pages: Iterable[PdfPage],
+                window: int) -> Iterator[str]:
+    """
+    Texte de chaque page, dans l'ordre : OCR (`fn`) dans le pool pour les
+    pages rastérisées, couche texte native telle quelle pour les autres.
+    Paresseux : au plus `window` tâches en vol.
+    """
+    pending = collections.deque()
+    for page in pages:
+        if page.text is not None:
+            fut = Future()
+            fut.set_result(page.text)
+        else:
+            fut = executor.submit(fn, page.image)
+        pending.append(fut)
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+# ─────────────── workers ───────────────
+# chaque processus garde son propre OCRProcessor (et donc son Reader EasyOCR)
+_worker_ocr = None
+
+
+def _init_tesseract(workers: int, preprocess) -> None:
+    global _worker_ocr
+    limit_threads(workers)
+    from ocr_processor_tesseract import OCRProcessor
+    _worker_ocr = OCRProcessor(workers=1, preprocess=preprocess)
+
+
+def _init_easyocr(langs: tuple[str, ...], workers: int, preprocess) -> None:
+    global _worker_ocr
+    limit_threads(workers)
+    from ocr_processor import OCRProcessor
+    _worker_ocr = OCRProcessor(list(langs), workers=1, preprocess=preprocess)
+    _worker_ocr.reader  # chargement du modèle dès le démarrage du worker
+
+
+def _ocr_page(image: Image.Image) -> str:
+    # prétraitement + OCR, tous deux exécutés dans le worker
+    return _worker_ocr.extract_text_from_image(image)
+
+
+def tesseract_pages(pages: Iterable[PdfPage], workers: int, preprocess) -> Iterator[str]:
+    pool = get_pool("tesseract", workers, _init_tesseract, (workers, preprocess))
+    return ordered_map(pool, _ocr_page, pages, 2 * workers)
+
+
+def easyocr_pages(pages: Iterable[PdfPage], langs: tuple[str, ...], workers: int,
+                  preprocess) -> Iterator[str]:
+    pool = get_pool("easyocr", workers, _init_easyocr, (langs, workers, preprocess))
+    return ordered_map(pool, _ocr_page, pages, 2 * workers)
+
+
+def easyocr_batched(reader, pages: Iterable[PdfPage], batch_size: int,
+                    prepare: Callable[[Image.Image], Image.Image] = lambda im: im) -> Iterator[str]:
+    """
+    Regroupe les pages de même taille en lots pour `readtext_batched` (GPU) ;
+    `prepare` est le prétraitement appliqué à chaque image.
+    """
+    batch: list[np.ndarray] = []
+
+    def flush():
+        h, w = batch[0].shape[:2]
+        results = reader.readtext_batched(batch, n_width=w, n_height=h, detail=0)
+        batch.clear()
+        return ["\n".join(lines) for lines in results]
+
+    for page in pages:
+        if page.text is not None:
+            # l'ordre des pages impose de vider le lot en cours d'abord
+            if batch:
+                yield from flush()
+            yield page.text
+            continue
+        arr = np.array(prepare(page.image).convert("RGB"))
+        if batch and arr.shape != batch[0].shape:
+            yield from flush()
+        batch.append(arr)
+        if len(batch) >= batch_size:
+            yield from flush()
+    if batch:
+        yield from flush()
@@ -0,0 +1,191 @@
+# pdf_utils.py – lecture PDF page par page (poppler via pdf2image / pdftotext)
+"""
+Outils PDF communs aux deux moteurs OCR.
+
+`iter_pdf_pages` ne traite que quelques pages à la fois (PAGE_BATCH) :
+la mémoire crête reste bornée quelle que soit la longueur du document et la
+première page est disponible sans attendre la conversion des suivantes.
+
+Avec `text_layer=True`, la couche texte native des PDF générés
+numériquement est lue avec `pdftotext` (poppler, déjà requis par pdf2image) ;
+seules les pages sans texte exploitable (scans, texte trop pauvre) sont
+rastérisées pour l'OCR, chacune au DPI choisi par `dpi_for`.
+"""
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import re
+import subprocess
+import tempfile
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+from pdf2image import convert_from_path, pdfinfo_from_path
+from PIL import Image
+
+from metrics import metrics
+
+# nombre de pages traitées simultanément (NLP_PDF_PAGE_BATCH)
+PAGE_BATCH = max(1, int(os.environ.get("NLP_PDF_PAGE_BATCH", "2")))
+
+# seuils d'une couche texte « exploitable »
+TEXT_LAYER_MIN_CHARS = 50     # caractères non blancs par page
+TEXT_LAYER_MIN_RATIO = 0.6    # part de caractères alphanumériques
+
+
+@dataclass
+class PdfPage:
+    """
+    Une page : soit son texte natif, soit son image à passer à l'OCR ;
+    page que poppler n'a pas pu rendre : texte vide et `error`.
+    """
+    number: int
+    text: str | None = None
+    image: Image.Image | None = None
+    error: str | None = None
+
+    @property
+    def source(self) -> str:
+        if self.error is not None:
+            return "error"
+        return "text" if self.text is not None else "ocr"
+
+
+@contextlib.contextmanager
+def pdf_on_disk(pdf_bytes: bytes) -> Iterator[str]:
+    """Écrit le PDF une seule fois dans un fichier temporaire (poppler lit un chemin)."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+        tmp.write(pdf_bytes)
+        path = tmp.name
+    try:
+        yield path
+    finally:
+        os.remove(path)
+
+
+def page_count(path: str) -> int:
+    return int(pdfinfo_from_path(path)["Pages"])
+
+
+_rx_size = re.compile(r"^Page\s+(\d+)\s+size:\s+([\d.]+) x ([\d.]+) pts", re.M)
+
+
+def page_sizes(path: str, first: int, last: int) -> dict[int, tuple[float, float]]:
+    """Dimensions (points) des pages first..last, via pdfinfo."""
+    try:
+        out = subprocess.run(["pdfinfo", "-f", str(first), "-l", str(last), path],
+                             capture_output=True, check=True).stdout.decode("utf-8", errors="replace")
+    except (OSError, subprocess.CalledProcessError) as e:
+        logging.warning(f"Dimensions des pages PDF illisibles : {e}")
+        return {}
+    return {int(n): (float(w), float(h)) for n, w, h in _rx_size.findall(out)}
+
+
+def usable_text(text: str) -> bool:
+    """Vrai si la couche texte d'une page suffit à se passer d'OCR."""
+    chars = [c for c in text if not c.isspace()]
+    if len(chars) < TEXT_LAYER_MIN_CHARS:
+        return False
+    return sum(c.isalnum() for c in chars) / len(chars) >= TEXT_LAYER_MIN_RATIO
+
+
+def extract_text_layer(path: str, first: int, last: int) -> list[str | None]:
+    """
+    Texte natif des pages first..last (None pour les pages inexploitables,
+    ou pour toutes si pdftotext est absent).
+    """
+    try:
+        out = subprocess.run(
+            ["pdftotext", "-f", str(first), "-l", str(last), "-enc", "UTF-8", path, "-"],
+            capture_output=True, check=True,
+        ).stdout.decode("utf-8", errors="replace")
+    except (OSError, subprocess.CalledProcessError) as e:
+        logging.warning(f"Couche texte PDF illisible, OCR de toutes les pages : {e}")
+        return [None] * (last - first + 1)
+    # pdftotext sépare les pages par un saut de page (\f)
+    pages = out.split("\f")[: last - first + 1]
+    pages += [""] * (last - first + 1 - len(pages))
+    return [p.strip() if usable_text(p) else None for p in pages]
+
+
+def _ranges(numbers: list[int], key: Callable[[int], object] = lambda n: None) -> Iterator[tuple[int, int]]:
+    """
+    [1, 2, 3, 6, 7] -> (1, 3), (6, 7) : une conversion poppler par plage de
+    pages consécutives partageant la même `key` (DPI).
+    """
+    start = prev = None
+    for n in numbers:
+        if start is None:
+            start = prev = n
+        elif n == prev + 1 and key(n) == key(start):
+            prev = n
+        else:
+            yield start, prev
+            start = prev = n
+    if start is not None:
+        yield start, prev
+
+
+def _rasterize(path: str, first: int, last: int, **kwargs) -> dict[int, Image.Image]:
+    """
+    Images des pages first..last. Si poppler en rend moins que demandé
+    (page corrompue), les pages manquantes sont rendues une à une ; celles
+    qui échouent encore sont absentes du résultat.
+    """
+    with metrics.span("pdf.rasterize"):
+        rendered = convert_from_path(path, first_page=first, last_page=last, **kwargs)
+    if len(rendered) == last - first + 1:
+        return {first + offset: image for offset, image in enumerate(rendered)}
+    logging.warning(f"Pages {first}-{last} : {len(rendered)} image(s) rendue(s), nouvel essai page par page")
+    images = {}
+    for number in range(first, last + 1):
+        try:
+            with metrics.span("pdf.rasterize"):
+                single = convert_from_path(path, first_page=number, last_page=number, **kwargs)
+        except Exception as e:
+            logging.warning(f"Page {number} non rendue : {e}")
+            continue
+        if single:
+            images[number] = single[0]
+    return images
+
+
+def iter_pdf_pages(pdf_bytes: bytes, batch: int | None = None, text_layer: bool = False,
+                   dpi_for: Callable[[float, float], int | None] | None = None,
+                   first_page: int = 1, **convert_kwargs) -> Iterator[PdfPage]:
+    """
+    Génère les pages dans l'ordre, à partir de `first_page`, en ne gardant
+    en mémoire que `batch` pages à la fois. `dpi_for(largeur_pt, hauteur_pt)`
+    choisit le DPI de rastérisation de chaque page ; `convert_kwargs` est
+    transmis à pdf2image (grayscale…). Une page impossible à rendre est
+    produite avec un texte vide et `error` (pas d'image None pour l'OCR).
+    """
+    batch = batch or PAGE_BATCH
+    with pdf_on_disk(pdf_bytes) as path:
+        n = page_count(path)
+        for first in range(max(1, first_page), n + 1, batch):
+            last = min(first + batch - 1, n)
+            if text_layer:
+                with metrics.span("pdf.text_layer"):
+                    texts = extract_text_layer(path, first, last)
+            else:
+                texts = [None] * (last - first + 1)
+            missing = [first + k for k, t in enumerate(texts) if t is None]
+            dpis = {}
+            if dpi_for is not None and missing:
+                sizes = page_sizes(path, missing[0], missing[-1])
+                dpis = {m: dpi_for(*sizes[m]) for m in missing if m in sizes}
+            images = {}
+            for a, b in _ranges(missing, key=dpis.get):
+                kwargs = dict(convert_kwargs)
+                if dpis.get(a):
+                    kwargs["dpi"] = dpis[a]
+                images.update(_rasterize(path, a, b, **kwargs))
+            for number in range(first, last + 1):
+                text, image = texts[number - first], images.pop(number, None)
+                if text is None and image is None:
+                    yield PdfPage(number, "", error="page non rendue par poppler")
+                else:
+                    yield PdfPage(number, text, image)
@@ -0,0 +1,275 @@
+# result_cache.py – cache disque des résultats, adressé par le contenu
+"""
+Cache persistant partagé par tous les étages (OCR, langue, traduction,
+type de document, résumé).
+
+La clé est un hash SHA-256 des données d'entrée (octets du fichier ou texte)
+combiné à l'étage, au modèle et aux paramètres : un même document retraité
+avec les mêmes réglages est servi depuis le disque sans appeler de modèle.
+
+Stockage SQLite (mode WAL) : plusieurs threads et processus peuvent lire et
+écrire en même temps. La taille est bornée ; au-delà, les entrées les moins
+récemment lues sont supprimées.
+
+Variables d'environnement :
+- NLP_CACHE=0          désactive le cache ;
+- NLP_CACHE_DIR        dossier du cache (défaut : ~/.cache/nlp_project) ;
+- NLP_CACHE_MAX_MB     taille maximale (défaut : 256).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator
+
+from metrics import metrics
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key         TEXT PRIMARY KEY,
+    stage       TEXT NOT NULL,
+    value       TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_lru ON entries(last_access);
+"""
+
+
+def content_hash(data: bytes | str) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultCache:
+    """Cache clé → valeur JSON sur disque, borné en taille."""
+
+    def __init__(self, path: str | None, max_mb: float = 256):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._local = threading.local()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def make_key(stage: str, data: bytes | str, **params) -> str:
+        """Clé = étage + hash du contenu + hash des paramètres (modèle, réglages…)."""
+        p = json.dumps(params, sort_keys=True, default=str)
+        return f"{stage}:{content_hash(data)}:{content_hash(p)[:16]}"
+
+    def _conn(self) -> sqlite3.Connection:
+        # une connexion par thread et par processus (sqlite3 n'est pas partageable)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if not self.enabled:
+            return default
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.counters["misses"] += 1
+                metrics.count("cache_misses", stage=key.split(":", 1)[0])
+                return default
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.counters["hits"] += 1
+            metrics.count("cache_hits", stage=key.split(":", 1)[0])
+            return json.loads(row[0])
+        except sqlite3.Error as e:
+            logging.warning(f"Cache indisponible (lecture) : {e}")
+            return default
+
+    def set(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        blob = json.dumps(value, ensure_ascii=False)
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries(key, stage, value, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, key.split(":", 1)[0], blob, len(blob.encode("utf-8")), time.time()),
+            )
+            self._evict(conn)
+        except sqlite3.Error as e:
+            logging.warning(f"Cache indisponible (écriture) : {e}")
+
+    def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """Lecture groupée : {clé: valeur} pour les clés présentes."""
+        if not self.enabled or not keys:
+            return {}
+        found: dict[str, Any] = {}
+        try:
+            conn = self._conn()
+            keys = list(dict.fromkeys(keys))
+            # par paquets (limite du nombre de paramètres SQLite)
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                marks = ",".join("?" * len(part))
+                rows = conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({marks})", part).fetchall()
+                if rows:
+                    now = time.time()
+                    conn.executemany("UPDATE entries SET last_access = ? WHERE key = ?",
+                                     [(now, k) for k, _ in rows])
+                found.update((k, json.loads(v)) for k, v in rows)
+        except sqlite3.Error as e:
+            logging.warning(f"Cache indisponible (lecture) : {e}")
+        self.counters["hits"] += len(found)
+        self.counters["misses"] += len(keys) - len(found)
+        if metrics.enabled:
+            stage = keys[0].split(":", 1)[0]
+            metrics.count("cache_hits", len(found), stage=stage)
+            metrics.count("cache_misses", len(keys) - len(found), stage=stage)
+        return found
+
+    def set_many(self, items: dict[str, Any]) -> None:
+        """Écriture groupée, en une transaction."""
+        if not self.enabled or not items:
+            return
+        now = time.time()
+        rows = []
+        for key, value in items.items():
+            blob = json.dumps(value, ensure_ascii=False)
+            rows.append((key, key.split(":", 1)[0], blob, len(blob.encode("utf-8")), now))
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO entries(key, stage, value, size, last_access) "
+                    "VALUES (?, ?, ?, ?, ?)", rows)
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+            self._evict(conn)
+        except sqlite3.Error as e:
+            logging.warning(f"Cache indisponible (écriture) : {e}")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # on redescend à 90 % du budget pour ne pas évincer à chaque écriture
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall()
+            for key, size in rows:
+                if freed >= target:
+                    break
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                freed += size
+                self.counters["evictions"] += 1
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+
+    def cached(self, stage: str, data: bytes | str, compute: Callable[[], Any], **params) -> Any:
+        """Retourne le résultat en cache, ou le calcule puis le stocke."""
+        if not self.enabled:
+            return compute()
+        key = self.make_key(stage, data, **params)
+        hit = self.get(key)
+        if hit is not None:
+            return hit
+        value = compute()
+        self.set(key, value)
+        return value
+
+    def iter_pages(self, key: str, produce: Callable[[int], Iterable[dict]]) -> Iterator[tuple[dict, bool]]:
+        """
+        Pages d'un document ({"page": n, …}), (page, lue_en_cache) dans
+        l'ordre. Chaque page est écrite dès qu'elle est produite (clé
+        `<key>:p<n>`) : une lecture abandonnée en route (affichage
+        progressif) garde les pages faites, la suivante reprend après
+        elles via `produce(première_page)`. `key` reçoit le nombre de pages
+        quand le document est complet. Une page en échec (source "error",
+        rendu impossible) n'est pas écrite et le document ne compte pas
+        comme complet : la lecture suivante la refait.
+        """
+        if not self.enabled:
+            for page in produce(1):
+                yield page, False
+            return
+        total = self.get(key)
+        if not isinstance(total, int):
+            total = None
+        done = 0
+        if total is not None:
+            found = self.get_many([f"{key}:p{n}" for n in range(1, total + 1)])
+            while done < total and f"{key}:p{done + 1}" in found:
+                done += 1
+                yield found[f"{key}:p{done}"], True
+            if done == total:
+                return
+        else:
+            while (page := self.get(f"{key}:p{done + 1}")) is not None:
+                done += 1
+                yield page, True
+        failed = False
+        for page in produce(done + 1):
+            if page.get("source") == "error":
+                failed = True
+            else:
+                self.set(f"{key}:p{page['page']}", page)
+            done = page["page"]
+            yield page, False
+        if not failed:
+            self.set(key, done)
+
+    def clear(self) -> None:
+        if self.enabled:
+            self._conn().execute("DELETE FROM entries")
+
+    def stats(self) -> dict:
+        out = dict(self.counters)
+        if self.enabled:
+            try:
+                n, size = self._conn().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+                out.update(entries=n, size_mb=round(size / 2**20, 2))
+            except sqlite3.Error:
+                pass
+        return out
+
+
+def cache_dir() -> str:
+    """Dossier des fichiers de cache (NLP_CACHE_DIR)."""
+    return os.environ.get("NLP_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "nlp_project")
+
+
+def _from_env() -> ResultCache:
+    if os.environ.get("NLP_CACHE", "1") == "0":
+        return ResultCache(None)
+    try:
+        max_mb = float(os.environ.get("NLP_CACHE_MAX_MB", "256"))
+    except ValueError:
+        max_mb = 256
+    return ResultCache(os.path.join(cache_dir(), "results.sqlite"), max_mb=max_mb)
+
+
+# instance partagée par tous les modules
+cache = _from_env()
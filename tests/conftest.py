@@ -0,0 +1,17 @@
+# tests/conftest.py – environnement commun des tests
+"""
+Les tests tournent sans torch ni modèles : ils couvrent les modules du
+pipeline qui n'en dépendent pas (caches, identification de langue,
+service, traitement par lots…). Cache et mémoire de traduction sont
+redirigés vers un dossier temporaire avant tout import.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ["NLP_CACHE_DIR"] = tempfile.mkdtemp(prefix="nlp_tests_")
+os.environ.setdefault("NLP_METRICS", "0")
+os.environ.setdefault("NLP_PRELOAD", "0")
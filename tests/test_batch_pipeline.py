@@ -0,0 +1,141 @@
+import json
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import batch_pipeline
+import parallel_ocr
+from document_summarizer import ERROR_PREFIX
+
+
+class FakeOCR:
+    def iter_pages(self, file_obj, ext):
+        yield {"page": 1, "source": "text", "text": file_obj.read().decode("utf-8")}
+
+
+class FakeLang:
+    def detect_language(self, doc):
+        return "fr"
+
+
+class FakeSummarizer:
+    """Échoue (message d'erreur, comme DocumentSummarizer) `failures` fois."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+
+    def summarize_text(self, doc, max_length=120):
+        self.calls += 1
+        if self.calls <= self.failures:
+            return f"{ERROR_PREFIX}modèle indisponible"
+        return doc.text[:20]
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    monkeypatch.setattr(batch_pipeline, "_worker", {"ocr": FakeOCR(), "lang": FakeLang()})
+    monkeypatch.setattr(parallel_ocr, "limit_threads", lambda workers: None)
+    return batch_pipeline._worker
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for k in range(3):
+        p = tmp_path / f"doc{k}.pdf"
+        p.write_text(f"Document numéro {k}, contenu de test.", encoding="utf-8")
+        paths.append(str(p))
+    return paths
+
+
+def records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_stage_error_message_is_retried(worker, files, tmp_path):
+    worker["summary"] = FakeSummarizer(failures=1)
+    out = str(tmp_path / "out.jsonl")
+    stats = batch_pipeline.run(files[:1], out, ("ocr", "lang", "summary"), 1, retries=1)
+    assert stats["retries"] == 1 and stats["ok"] == 1
+    (record,) = records(out)
+    assert record["status"] == "ok" and record["attempts"] == 2
+    assert not record["summary"].startswith(ERROR_PREFIX)
+
+
+def test_stage_error_without_retry_is_recorded_as_error(worker, files, tmp_path):
+    worker["summary"] = FakeSummarizer(failures=5)
+    out = str(tmp_path / "out.jsonl")
+    stats = batch_pipeline.run(files[:1], out, ("ocr", "summary"), 1, retries=0)
+    assert stats["errors"] == 1
+    (record,) = records(out)
+    assert record["status"] == "error" and "modèle indisponible" in record["error"]
+    # relance : le fichier en échec est retraité
+    worker["summary"] = FakeSummarizer()
+    stats = batch_pipeline.run(files[:1], out, ("ocr", "summary"), 1, retries=0)
+    assert stats["ok"] == 1 and stats["skipped"] == 0
+
+
+def test_resume_skips_done_files_for_same_stages(worker, files, tmp_path):
+    worker["summary"] = FakeSummarizer()
+    out = str(tmp_path / "out.jsonl")
+    batch_pipeline.run(files, out, ("ocr", "lang", "summary"), 1, retries=0)
+    stats = batch_pipeline.run(files, out, ("ocr", "lang", "summary"), 1, retries=0)
+    assert stats["skipped"] == 3 and stats["ok"] == 0
+    # sous-ensemble des étages : déjà couvert
+    stats = batch_pipeline.run(files, out, ("ocr", "lang"), 1, retries=0)
+    assert stats["skipped"] == 3
+
+
+def test_resume_redoes_files_missing_stages(worker, files, tmp_path):
+    worker["summary"] = FakeSummarizer()
+    out = str(tmp_path / "out.jsonl")
+    batch_pipeline.run(files, out, ("ocr", "lang"), 1, retries=0)
+    stats = batch_pipeline.run(files, out, ("ocr", "lang", "summary"), 1, retries=0)
+    assert stats["skipped"] == 0 and stats["ok"] == 3
+    assert all("summary" in r for r in records(out)[3:])
+
+
+def test_truncated_line_is_redone(worker, files, tmp_path):
+    worker["summary"] = FakeSummarizer()
+    out = tmp_path / "out.jsonl"
+    batch_pipeline.run(files[:1], str(out), ("ocr", "summary"), 1, retries=0)
+    out.write_text(out.read_text(encoding="utf-8")[:-10], encoding="utf-8")
+    assert batch_pipeline.done_shas(str(out), ("ocr", "summary")) == set()
+
+
+class BreakingExecutor:
+    """Premier pool : le worker meurt ; le suivant traite normalement."""
+    created = 0
+
+    def __init__(self):
+        type(self).created += 1
+        self.broken = type(self).created == 1
+
+    def submit(self, fn, *args):
+        fut = Future()
+        if self.broken:
+            fut.set_exception(BrokenProcessPool("worker mort"))
+        else:
+            fut.set_result(fn(*args))
+        return fut
+
+    def shutdown(self, **kwargs):
+        pass
+
+
+def test_broken_pool_is_recreated(worker, files, tmp_path, monkeypatch):
+    worker["summary"] = FakeSummarizer()
+    BreakingExecutor.created = 0
+
+    def executor(stages, workers):
+        worker["stages"] = stages
+        return BreakingExecutor()
+
+    monkeypatch.setattr(batch_pipeline, "_executor", executor)
+    out = str(tmp_path / "out.jsonl")
+    stats = batch_pipeline.run(files, out, ("ocr", "summary"), 2, retries=1)
+    assert stats["ok"] == 3 and stats["errors"] == 0
+    assert BreakingExecutor.created == 2
@@ -0,0 +1,169 @@
+import io
+import re
+
+import numpy as np
+import pytest
+from langdetect import LangDetectException
+
+import document_summarizer
+import document_type_detector
+import lang_id
+import langage_analyser
+from document import Document
+from document_summarizer import DocumentSummarizer
+from document_type_detector import DocumentTypeDetector
+from langage_analyser import LanguageAnalyzer
+from result_cache import ResultCache
+
+
+class FakeOCR:
+    def __init__(self):
+        self.calls = []
+
+    def iter_pages(self, file_obj, file_extension):
+        self.calls.append(file_extension)
+        yield {"page": 1, "source": "text", "text": "Première page."}
+        yield {"page": 2, "source": "ocr", "text": "Seconde page."}
+
+
+def test_text_or_pages_required():
+    with pytest.raises(ValueError):
+        Document()
+
+
+def test_text_joins_pages():
+    doc = Document(pages=[{"page": 1, "source": "text", "text": "a"},
+                          {"page": 2, "source": "ocr", "text": "b"}])
+    assert doc.text == "a\n\nb"
+    assert Document("a\n\nb").sha == doc.sha
+
+
+def test_from_file_uses_given_ocr():
+    ocr = FakeOCR()
+    doc = Document.from_file(io.BytesIO(b"%PDF"), "pdf", ocr=ocr, name="x.pdf")
+    assert ocr.calls == ["pdf"]
+    assert [p["source"] for p in doc.pages] == ["text", "ocr"]
+    assert doc.text == "Première page.\n\nSeconde page."
+    assert doc.as_dict()["page_sources"] == ["text", "ocr"]
+
+
+def test_derive_computes_once_per_params():
+    doc = Document("texte")
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert doc.derive("tokens", compute, model="a") == 1
+    assert doc.derive("tokens", compute, model="a") == 1
+    assert doc.derive("tokens", compute, model="b") == 2
+    assert len(calls) == 2
+
+
+def test_result_keyed_by_params_and_exposed():
+    doc = Document("texte")
+    assert doc.lookup("summary", max_length=100) == (False, None)
+    doc.result("summary", lambda: "court", max_length=100)
+    doc.result("summary", lambda: "long", max_length=300)
+    assert doc.results["summary"] == "long"
+    assert doc.result("summary", lambda: pytest.fail("recalculé"), max_length=100) == "court"
+    assert doc.lookup("summary", max_length=300) == (True, "long")
+    doc.store("language", "fr")
+    assert doc.language == "fr"
+
+
+def test_detect_language_memoized_on_document(monkeypatch):
+    analyzer = LanguageAnalyzer()
+    doc = Document("Bonjour, ceci est un document rédigé en français pour le test.")
+    assert analyzer.detect_language(doc) == "fr"
+    assert doc.results["language"] == "fr"
+    monkeypatch.setattr(analyzer, "detect_language",
+                        lambda text: pytest.fail("détection refaite"), raising=False)
+    assert LanguageAnalyzer.detect_language(analyzer, doc) == "fr"
+
+
+def test_detection_error_is_not_memoized(monkeypatch):
+    monkeypatch.setattr(langage_analyser, "cache", ResultCache(None))
+
+    def fail(text):
+        raise LangDetectException(0, "No features in text.")
+    monkeypatch.setattr(lang_id, "detect", fail)
+    analyzer = LanguageAnalyzer()
+    doc = Document("12 / 03 / 2024")
+    assert analyzer.detect_language(doc).startswith(langage_analyser.ERROR_PREFIX)
+    assert "language" not in doc.results and doc.language is None
+    monkeypatch.setattr(lang_id, "detect", lambda text: "fr")
+    assert analyzer.detect_language(doc) == "fr" and doc.language == "fr"
+
+
+# ── un document de quatre pages à travers les étages, deux fois ──────
+class OffsetTokenizer:
+    """Un token par mot, avec offsets ; compte les tokenisations."""
+    model_max_length = 512
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, texts, add_special_tokens=False, return_offsets_mapping=False):
+        self.calls += 1
+        if isinstance(texts, list):
+            return {"input_ids": [t.split() for t in texts]}
+        words = list(re.finditer(r"\S+", texts))
+        enc = {"input_ids": [hash(w.group()) for w in words]}
+        if return_offsets_mapping:
+            enc["offset_mapping"] = [w.span() for w in words]
+        return enc
+
+
+class CountingSummaryPipeline:
+    def __init__(self):
+        self.tokenizer = OffsetTokenizer()
+        self.calls = 0
+
+    def __call__(self, texts, **kwargs):
+        self.calls += 1
+        return [{"summary_text": "Résumé du document."} for _ in texts]
+
+
+def test_four_page_document_runs_each_step_once(monkeypatch):
+    for module in (langage_analyser, document_type_detector, document_summarizer):
+        monkeypatch.setattr(module, "cache", ResultCache(None))   # seul le Document mémorise
+    counts = {"lang": 0, "nli": 0, "grammar": 0}
+
+    def detect(text):
+        counts["lang"] += 1
+        return "fr"
+
+    def correct(text):
+        counts["grammar"] += 1
+        return text
+    monkeypatch.setattr(lang_id, "detect", detect)
+    monkeypatch.setattr(document_summarizer.grammar, "correct", correct)
+
+    det_tok = OffsetTokenizer()
+    monkeypatch.setattr(DocumentTypeDetector, "clf",
+                        property(lambda self: type("Clf", (), {"tokenizer": det_tok})()))
+    pipe = CountingSummaryPipeline()
+    monkeypatch.setattr(DocumentSummarizer, "pipe", property(lambda self: pipe))
+
+    analyzer, summarizer = LanguageAnalyzer(), DocumentSummarizer()
+    detector = DocumentTypeDetector()
+    detector.CASCADE = False                     # toujours le modèle
+
+    def nli(windows, clf=None):
+        counts["nli"] += 1
+        return np.zeros((len(windows), len(detector.CANDIDATES)))
+    detector._nli_scores = nli
+
+    doc = Document(pages=[{"page": n, "source": "ocr",
+                           "text": f"Page {n}. Montant de la facture numéro {n}, à régler sous trente jours."}
+                          for n in range(1, 5)])
+    results = []
+    for _ in range(2):
+        results.append((analyzer.detect_language(doc), detector.detect_document_type(doc),
+                        summarizer.summarize_text(doc, max_length=60)))
+    assert results[0] == results[1]
+    assert counts == {"lang": 1, "nli": 1, "grammar": 1}
+    assert pipe.calls == 1
+    assert det_tok.calls == 1                    # ids de tokens gardés sur le Document
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+import document_type_detector
+from document_type_detector import DocumentTypeDetector
+from result_cache import ResultCache
+
+
+def key(det, text="FACTURE N° 12 — Montant TTC : 120 €"):
+    return ResultCache.make_key("doctype", text, **det._hparams())
+
+
+def test_default_instances_share_cache_key():
+    assert key(DocumentTypeDetector()) == key(DocumentTypeDetector())
+
+
+def test_instance_overrides_change_cache_key():
+    default = key(DocumentTypeDetector())
+    for name, value in (("CASCADE", False), ("CASCADE_MARGIN", 0.8), ("KW_PHRASES", False)):
+        det = DocumentTypeDetector()
+        setattr(det, name, value)
+        assert det._hparams()[name] == value
+        assert key(det) != default
+
+
+def test_subclass_overrides_change_cache_key():
+    class Strict(DocumentTypeDetector):
+        CASCADE_MIN_HITS = 5
+    assert key(Strict()) != key(DocumentTypeDetector())
+
+
+# ── cascade : règles ou modèle ──────────────────────────────────────
+def text(factures, courriers):
+    """`factures` indices du type facture, `courriers` du type lettre."""
+    return " ".join(["facture"] * factures + ["courrier"] * courriers)
+
+
+def decision(det, txt):
+    return det._rule_decision(det._clean(txt))
+
+
+def test_min_hits_threshold():
+    det = DocumentTypeDetector()
+    assert det.CASCADE_MIN_HITS == 3
+    assert decision(det, text(2, 0)) is None                 # juste sous le seuil
+    scores = decision(det, text(3, 0))                       # au seuil
+    assert scores[0] == ("facture", 1.0)
+
+
+def test_margin_threshold():
+    det = DocumentTypeDetector()
+    assert det.CASCADE_MARGIN == 0.5
+    assert decision(det, text(5, 2)) is None                 # écart 3/7 ≈ 0.43
+    assert decision(det, text(3, 1))[0] == ("facture", 0.75)  # écart 2/4 = 0.5
+    assert decision(det, text(4, 1))[0] == ("facture", 0.8)   # écart 3/5 = 0.6
+
+
+def test_thresholds_follow_instance_settings():
+    det = DocumentTypeDetector()
+    det.CASCADE_MIN_HITS = 4
+    assert decision(det, text(3, 0)) is None
+    det.CASCADE_MARGIN = 0.7
+    assert decision(det, text(4, 1)) is None                 # 0.6 < 0.7
+
+
+class FakeClassifier:
+    tokenizer = None
+
+
+@pytest.fixture
+def model_stub(monkeypatch):
+    """Détecteur sans torch : une fenêtre par texte, scores NLI nuls."""
+    monkeypatch.setattr(document_type_detector, "cache", ResultCache(None))
+    monkeypatch.setattr(DocumentTypeDetector, "clf", property(lambda self: FakeClassifier()))
+
+    def make(**settings):
+        det = DocumentTypeDetector()
+        for name, value in settings.items():
+            setattr(det, name, value)
+        det.nli_calls = 0
+
+        def nli(windows, clf=None):
+            det.nli_calls += 1
+            return np.zeros((len(windows), len(det.CANDIDATES)))
+        det._windows = lambda txt, doc=None, tok=None: [((1, 2, 3), txt)]
+        det._nli_scores = nli
+        return det
+    return make
+
+
+def test_cascade_decides_without_model(model_stub):
+    det = model_stub()
+    clear, ambiguous = text(4, 1), text(5, 2)
+    stages = [r["stage"] for r in det.detect_detailed([clear, ambiguous])]
+    assert stages == ["rules", "model"]
+    assert det.nli_calls == 1 and det.stage_counts == {"rules": 1, "model": 1}
+
+
+def test_cascade_disabled_always_runs_model(model_stub):
+    det = model_stub(CASCADE=False)
+    results = det.detect_detailed([text(4, 1), text(10, 0)])
+    assert [r["stage"] for r in results] == ["model", "model"]
+    assert det.nli_calls == 1 and det.stage_counts == {"model": 2}
@@ -0,0 +1,62 @@
+import sys
+import types
+
+import document_summarizer
+from grammar_pool import GrammarPool
+
+
+def fake_language_tool(monkeypatch, tool_class):
+    module = types.ModuleType("language_tool_python")
+    module.LanguageTool = tool_class
+    monkeypatch.setitem(sys.modules, "language_tool_python", module)
+
+
+class UpperTool:
+    def __init__(self, lang, remote_server=None):
+        self._url = "http://localhost:8081/v2/"
+
+    def correct(self, text):
+        return text.upper()
+
+    def close(self):
+        pass
+
+
+def test_correction_and_cache(monkeypatch):
+    fake_language_tool(monkeypatch, UpperTool)
+    pool = GrammarPool(workers=2)
+    assert pool.correct("texte à corriger un") == "TEXTE À CORRIGER UN"
+    assert pool.submit("texte à corriger un").result() == "TEXTE À CORRIGER UN"
+    assert pool.counters["corrections"] == 1 and pool.counters["cache_hits"] == 1
+    pool.close()
+
+
+def test_start_failure_disables_correction(monkeypatch):
+    class Failing:
+        def __init__(self, lang, remote_server=None):
+            raise RuntimeError("JVM introuvable")
+    fake_language_tool(monkeypatch, Failing)
+    pool = GrammarPool()
+    assert pool.correct("texte à corriger deux") == "texte à corriger deux"
+    assert not pool.enabled
+    assert pool.submit("autre texte").result() == "autre texte"
+
+
+def test_correction_failure_returns_text(monkeypatch):
+    class Broken(UpperTool):
+        def correct(self, text):
+            raise ValueError("réponse invalide")
+    fake_language_tool(monkeypatch, Broken)
+    pool = GrammarPool(workers=1)
+    assert pool.correct("texte à corriger trois") == "texte à corriger trois"
+    assert pool.counters["errors"] == 1
+    pool.close()
+
+
+def test_summary_kept_when_correction_raises(monkeypatch):
+    def boom(text):
+        raise RuntimeError("LanguageTool arrêté")
+    monkeypatch.setattr(document_summarizer.grammar, "correct", boom)
+    monkeypatch.setattr(document_summarizer.DocumentSummarizer, "_raw_summary",
+                        lambda self, *args: ("résumé brut", True))
+    assert document_summarizer.DocumentSummarizer().summarize_text("Un texte.") == "résumé brut"
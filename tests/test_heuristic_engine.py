@@ -0,0 +1,57 @@
+import random
+
+import numpy as np
+import pytest
+
+from benchmarks.bench_heuristics import legacy_aggregate, synthetic_chunks
+from document_type_detector import DocumentTypeDetector
+
+# une fenêtre par branche de l'ancien _adj
+WINDOWS = [
+    "facture n° 12 montant ttc invoice",
+    "relevé de compte iban bic solde débit crédit",                       # banque ≥ 2
+    "iban seul sur la page",
+    "article loi tribunal responsabilité contrat",                         # juridique, contrat ≤ 1
+    "contrat cdi salaire smic avenant",                                    # contrat ≥ 2
+    "autorisation droit à l'image article règlement",                      # juridique ≥ 2
+    "examen épreuve barème session jury oral dnb",                         # évaluation ≥ 2
+    "une note seulement",                                                  # évaluation < 2
+    "courrier sans formule",                                               # lettre sans marqueur
+    "madame objet iban solde débit",                                       # lettre + banque
+    "monsieur contrat cdd salaire",                                        # lettre + contrat
+    "madame monsieur objet cordialement à l'attention",                    # lettre ≥ 2
+    "madame le texte continue",                                            # lettre = 1
+    "",
+]
+
+
+@pytest.fixture
+def det():
+    d = DocumentTypeDetector()
+    d.KW_PHRASES = False            # comme l'ancienne boucle
+    return d
+
+
+def scores(det, n, seed):
+    logits = np.random.default_rng(seed).normal(size=(n, len(det.CANDIDATES))).astype(np.float32)
+    return np.exp(logits) / np.exp(logits).sum(-1, keepdims=True)
+
+
+def test_engine_matches_legacy_on_every_branch(det):
+    nli = scores(det, len(WINDOWS), 0)
+    for k, window in enumerate(WINDOWS):
+        assert det._aggregate([window], nli[k:k + 1]) == legacy_aggregate(det, [window], nli[k:k + 1])
+    assert det._aggregate(WINDOWS, nli) == legacy_aggregate(det, WINDOWS, nli)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_engine_matches_legacy_on_synthetic_documents(det, seed):
+    chunks = synthetic_chunks(15, random.Random(seed))
+    nli = scores(det, len(chunks), seed)
+    assert det._aggregate(chunks, nli) == legacy_aggregate(det, chunks, nli)
+
+
+def test_engine_follows_instance_boosts(det):
+    nli = scores(det, len(WINDOWS), 1)
+    det.BOOST_EXAM, det.PEN_LET_NO_MARK = 3.0, 0.1
+    assert det._aggregate(WINDOWS, nli) == legacy_aggregate(det, WINDOWS, nli)
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_preprocessing import (PreprocessConfig, deskew_angle, estimate_text_height,
+                                 otsu_threshold, preprocess)
+
+A4 = (595, 842)          # points
+A0 = (2384, 3370)
+
+
+def lines_page(width=600, height=400, line=12, gap=18, ink=0, paper=255):
+    """Page synthétique : bandes d'encre horizontales régulières."""
+    arr = np.full((height, width), paper, dtype=np.uint8)
+    for top in range(gap, height - line - gap, line + gap):
+        arr[top:top + line, 40:width - 40] = ink
+    return arr
+
+
+def test_otsu_splits_bimodal_histogram():
+    rng = np.random.default_rng(0)
+    ink = rng.normal(50, 8, 3000)
+    paper = rng.normal(210, 8, 7000)
+    gray = np.clip(np.concatenate([ink, paper]), 0, 255).astype(np.uint8)
+    t = otsu_threshold(gray)
+    assert 50 < t < 210
+    assert (gray <= t).sum() == pytest.approx(3000, abs=10)
+
+
+def test_otsu_empty_and_uniform_images():
+    assert otsu_threshold(np.zeros((0, 0), dtype=np.uint8)) == 128
+    assert otsu_threshold(np.full((50, 50), 255, dtype=np.uint8)) == 128
+
+
+def test_blank_page_survives_full_preset():
+    out, _ = preprocess(Image.new("L", (300, 400), 255), PreprocessConfig.preset("full"))
+    assert out.size == (300, 400)
+
+
+def test_deskew_finds_known_rotation():
+    binary = lines_page(ink=255, paper=0) > 0
+    rotated = Image.fromarray((binary * 255).astype(np.uint8)).rotate(3, resample=Image.NEAREST)
+    assert deskew_angle(np.asarray(rotated) > 0, max_angle=5) == pytest.approx(-3, abs=0.5)
+    assert deskew_angle(binary, max_angle=5) == 0
+
+
+def test_text_height_of_regular_lines():
+    assert estimate_text_height(lines_page(line=12)) == pytest.approx(12, abs=1)
+    assert estimate_text_height(np.full((200, 200), 255, dtype=np.uint8)) is None
+
+
+def test_pdf_dpi_respects_pixel_budget():
+    config = PreprocessConfig()
+    dpi = config.pdf_dpi(*A4)
+    assert config.min_dpi < dpi < config.max_dpi
+    pixels = (A4[0] / 72 * dpi) * (A4[1] / 72 * dpi)
+    assert pixels <= config.max_pixels
+    assert (A4[0] / 72 * (dpi + 1)) * (A4[1] / 72 * (dpi + 1)) > config.max_pixels
+
+
+def test_pdf_dpi_bounds():
+    config = PreprocessConfig()
+    # A0 : le budget donnerait ~50 DPI, le plancher garde le texte lisible
+    assert config.pdf_dpi(*A0) == config.min_dpi
+    assert config.pdf_dpi(252, 144) == config.max_dpi      # carte de visite
+    assert config.pdf_dpi(0, 0) == config.max_dpi
+    assert PreprocessConfig(max_pixels=0).pdf_dpi(*A4) is None
+    assert PreprocessConfig.preset("off").pdf_dpi(*A4) is None
+
+
+def test_preprocess_caps_pixels_and_keeps_ratio():
+    image = Image.new("RGB", (3000, 2000), "white")
+    out, timings = preprocess(image, PreprocessConfig())
+    assert out.mode == "L"
+    assert out.width * out.height <= PreprocessConfig().max_pixels
+    assert out.width / out.height == pytest.approx(1.5, rel=0.01)
+    assert {"grayscale", "resize"} <= set(timings)
+
+
+def test_preprocess_off_and_small_images_untouched():
+    image = Image.new("RGB", (800, 600), "white")
+    out, timings = preprocess(image, PreprocessConfig.preset("off"))
+    assert out is image and timings == {}
+    out, _ = preprocess(image, PreprocessConfig())
+    assert out.size == (800, 600)
+
+
+def test_full_preset_binarizes_and_straightens():
+    page = Image.fromarray(lines_page()).rotate(3, resample=Image.BICUBIC, fillcolor=255)
+    out, timings = preprocess(page, PreprocessConfig.preset("full"))
+    assert set(np.unique(np.asarray(out))) <= {0, 255}
+    assert {"deskew", "text_height", "binarize"} <= set(timings)
+
+
+def test_unknown_preset():
+    with pytest.raises(ValueError):
+        PreprocessConfig.preset("turbo")
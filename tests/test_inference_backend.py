@@ -0,0 +1,82 @@
+import sys
+import types
+
+import pytest
+
+import inference_backend
+import langage_analyser
+from inference_backend import effective_backend, load_pipeline, model_tag, require_backend
+from langage_analyser import LanguageAnalyzer
+from model_registry import registry
+from result_cache import ResultCache
+
+MODEL = "test/repli-onnx"
+
+
+class FakeTranslator:
+    """Pipeline torch de substitution : « traduit » en majuscules."""
+
+    def __init__(self):
+        self.tokenizer = type("Tok", (), {"__call__": lambda self, sents, add_special_tokens=False:
+                                          {"input_ids": [s.split() for s in sents]}})()
+
+    def __call__(self, inputs, **kwargs):
+        return [{"translation_text": t.upper()} for t in inputs]
+
+
+@pytest.fixture
+def no_onnx(monkeypatch):
+    """optimum absent : l'export ONNX échoue, transformers charge le modèle torch."""
+    def onnx(task, model_id):
+        raise ImportError("No module named 'optimum'")
+    loaded = []
+
+    def pipeline(task, model=None, device=-1, **kwargs):
+        loaded.append(model)
+        return FakeTranslator()
+    monkeypatch.setattr(inference_backend, "_onnx", onnx)
+    monkeypatch.setattr(inference_backend, "_fallbacks", {})
+    monkeypatch.setitem(sys.modules, "transformers",
+                        types.SimpleNamespace(pipeline=pipeline, AutoTokenizer=None))
+    yield loaded
+    for key in list(registry.stats()["loaded"]):
+        if MODEL in key:
+            registry.evict(key)
+
+
+def test_fallback_is_recorded(no_onnx):
+    pipe = load_pipeline("translation", MODEL, -1, "onnx")
+    assert no_onnx == [MODEL] and pipe.backend == "torch"
+    assert effective_backend(MODEL, "onnx") == "torch"
+    # sorties torch : pas de clé « +onnx »
+    assert model_tag(MODEL, "onnx") == MODEL
+    assert model_tag("autre/modele", "onnx") == "autre/modele+onnx"
+    with pytest.raises(RuntimeError):
+        require_backend(pipe, "onnx")
+
+
+def test_explicit_backend_does_not_fall_back(no_onnx):
+    with pytest.raises(RuntimeError, match="onnx"):
+        load_pipeline("translation", MODEL, -1, "onnx", strict=True)
+    assert no_onnx == [] and effective_backend(MODEL, "onnx") == "onnx"
+
+
+def test_translation_cached_under_loaded_backend(no_onnx, monkeypatch, tmp_path):
+    monkeypatch.setenv("NLP_BACKEND_TRANSLATION", "onnx")
+    monkeypatch.setattr(langage_analyser, "_FR_EN", MODEL)
+    monkeypatch.setattr(langage_analyser, "cache", ResultCache(str(tmp_path / "cache.sqlite")))
+    monkeypatch.setattr(langage_analyser.memory, "store", ResultCache(None))
+    la = LanguageAnalyzer()
+    la.device = -1
+    assert la.backend == "onnx"
+    assert la.translate_texts(["Bonjour à tous."], ["fr"]) == ["BONJOUR À TOUS."]
+    key = langage_analyser.cache.make_key("translation", "Bonjour à tous.", model=MODEL,
+                                          max_len=langage_analyser._MAX_MODEL_LEN,
+                                          chunk=langage_analyser._CHUNK_MARGIN, tm=False)
+    assert langage_analyser.cache.get(key) == "BONJOUR À TOUS."
+
+    # demandé explicitement, le moteur replié n'est pas servi
+    strict = LanguageAnalyzer(backend="onnx")
+    strict.device = -1
+    with pytest.raises(RuntimeError):
+        strict.translate_texts(["Autre phrase."], ["fr"])
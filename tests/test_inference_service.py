@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+import pytest
+
+from inference_service import InferenceService, MicroBatcher, validate
+
+
+def test_validate_normalizes_summary_request():
+    assert validate("summarize", {"text": "abc"}) == {"text": "abc", "max_length": 120, "min_length": 20}
+    assert validate("translate", {"text": "abc", "lang": "fr"}) == {"text": "abc", "lang": "fr"}
+
+
+@pytest.mark.parametrize("name, payload", [
+    ("detect", ["pas", "un", "objet"]),
+    ("detect", {"texte": "abc"}),
+    ("translate", {"text": "abc", "lang": 3}),
+    ("summarize", {"text": "abc", "max_length": "beaucoup"}),
+    ("summarize", {"text": "abc", "max_length": -5}),
+    ("summarize", {"text": "abc", "max_length": True}),
+    ("summarize", {"text": "abc", "max_length": 50, "min_length": 80}),
+])
+def test_validate_rejects(name, payload):
+    with pytest.raises(ValueError):
+        validate(name, payload)
+
+
+async def _exchange(port: int, raw: bytes) -> tuple[int, dict]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+def _post(path: str, body: bytes, length: str | None = None) -> bytes:
+    length = str(len(body)) if length is None else length
+    return (f"POST {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {length}\r\n\r\n").encode() + body
+
+
+def test_malformed_requests_get_400_and_do_not_break_the_batch():
+    seen = []
+
+    def summarize(payloads):
+        seen.append(payloads)
+        return [{"summary": p["text"][:3], "max": p["max_length"]} for p in payloads]
+
+    async def scenario():
+        service = InferenceService(max_batch=8, max_wait_ms=50, max_queue=8)
+        service.batchers["summarize"] = MicroBatcher("summarize", summarize, 8, 50, 8)
+        service.batchers["summarize"].start()
+        server = await asyncio.start_server(service._handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await asyncio.gather(
+                _exchange(port, _post("/v1/summarize", b'{"text": "bonjour", "max_length": 60}')),
+                _exchange(port, _post("/v1/summarize", b'{"text": "salut", "max_length": "x"}')),
+                _exchange(port, _post("/v1/summarize", b'{"text": "abc"}', length="abc")),
+                _exchange(port, _post("/v1/summarize", b'{"text": "abc"}', length="-4")),
+                _exchange(port, _post("/v1/summarize", b'{"text": ')),
+            )
+
+    results = asyncio.run(scenario())
+    assert results[0] == (200, {"summary": "bon", "max": 60})
+    assert [status for status, _ in results[1:]] == [400, 400, 400, 400]
+    assert len(seen) == 1 and len(seen[0]) == 1
@@ -0,0 +1,73 @@
+import pytest
+
+import lang_id
+from langage_analyser import LanguageAnalyzer
+
+FRENCH = [
+    "Merci de votre confiance et à bientôt.",
+    "Date limite de paiement : le quinze avril.",
+    "Bonjour Madame, je vous remercie pour votre réponse rapide.",
+    "Adresse de livraison : 12 rue des Lilas, Lyon",
+    "FACTURE N° 2024-017\nDate : 12/03/2024\nClient : Société Martin\nMontant TTC : 1 250,00 €",
+    "Madame, Monsieur,\n\nSuite à notre entretien, je vous confirme ma candidature.\n"
+    "Je reste à votre disposition.\n\nCordialement,\nJean Dupont",
+]
+ENGLISH = [
+    "Thank you for your prompt reply.",
+    "Please find attached the invoice for March.",
+    "Dear Sir or Madam, I am writing to confirm our meeting.",
+    "Total amount due before June 30.",
+]
+
+
+@pytest.mark.parametrize("text", FRENCH)
+def test_short_french(text):
+    assert lang_id.detect(text) == "fr"
+
+
+@pytest.mark.parametrize("text", ENGLISH)
+def test_short_english(text):
+    assert lang_id.detect(text) == "en"
+
+
+def test_confidence_grows_with_evidence():
+    sentence = "Le locataire s'engage à payer le loyer chaque mois. "
+    _, short = lang_id.identifier.identify(sentence)
+    _, longer = lang_id.identifier.identify(sentence * 4)
+    assert short < longer
+
+
+def test_too_little_text_goes_to_langdetect():
+    assert lang_id.identifier.identify("Oui.") == (None, 0.0)
+    assert lang_id.detect_detailed("Bonjour Madame")[2] == "langdetect"
+
+
+def test_languages_outside_pipeline_go_to_langdetect():
+    text = "Der Vertrag tritt mit der Unterzeichnung durch beide Parteien in Kraft und gilt für ein Jahr."
+    assert lang_id.detect_detailed(text) == ("de", None, "langdetect")
+
+
+def test_sample_is_bounded_and_spread():
+    text = "a" * 5000 + "z" * 5000
+    sample = lang_id._sample(text, 1000)
+    assert len(sample) < 1100 and "a" in sample and "z" in sample
+
+
+def test_cache_tag_follows_settings(monkeypatch):
+    tag = lang_id.cache_tag()
+    monkeypatch.setattr(lang_id, "MIN_CONFIDENCE", 0.5)
+    assert lang_id.cache_tag() != tag
+    monkeypatch.setattr(lang_id, "ENABLED", False)
+    assert lang_id.cache_tag() == "langdetect"
+
+
+def test_invalid_env_falls_back_to_default(monkeypatch, caplog):
+    monkeypatch.setenv("NLP_LANGID_MIN_CONFIDENCE", "abc")
+    assert lang_id._env_number("NLP_LANGID_MIN_CONFIDENCE", 0.9, high=1.0) == 0.9
+    monkeypatch.setenv("NLP_LANGID_MIN_CONFIDENCE", "1.5")
+    assert lang_id._env_number("NLP_LANGID_MIN_CONFIDENCE", 0.9, high=1.0) == 0.9
+    assert "invalide" in caplog.text
+
+
+def test_analyzer_detects_french_document():
+    assert LanguageAnalyzer().detect_language(FRENCH[0]) == "fr"
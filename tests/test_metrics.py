@@ -0,0 +1,90 @@
+import asyncio
+
+from metrics import BUCKETS, Metrics
+
+
+def test_disabled_records_nothing():
+    m = Metrics(enabled=False)
+    with m.span("ocr.easyocr"):
+        pass
+    m.count("pages", 3, source="ocr")
+    assert m.snapshot()["stages"] == {} and m.snapshot()["counters"] == {}
+
+
+def test_span_count_and_snapshot():
+    m = Metrics(enabled=True)
+    with m.span("detect.nli"):
+        pass
+    m.observe("detect.nli", 0.2)
+    m.count("pages", 2, source="ocr")
+    m.count("pages", source="ocr")
+    snap = m.snapshot()
+    assert snap["stages"]["detect.nli"]["count"] == 2
+    assert snap["stages"]["detect.nli"]["max"] >= 0.2
+    assert snap["counters"]['pages{source="ocr"}'] == 3
+
+
+def test_span_counts_errors():
+    m = Metrics(enabled=True)
+    try:
+        with m.span("summary"):
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert m.snapshot()["counters"]['errors{stage="summary"}'] == 1
+
+
+def test_timed_decorator_follows_enable():
+    m = Metrics()
+
+    @m.timed("translate")
+    def translate(text):
+        return text.upper()
+
+    assert translate("a") == "A" and m.snapshot()["stages"] == {}
+    m.enable()
+    translate("b")
+    assert m.snapshot()["stages"]["translate"]["count"] == 1
+
+
+def test_trace_groups_a_document():
+    m = Metrics(enabled=True)
+    m.count("tokens", 5)                    # hors trace
+    with m.trace("facture.pdf") as tr:
+        m.observe("ocr.easyocr", 0.5)
+        m.count("tokens", 7, stage="detect")
+    assert tr.stages == {"ocr.easyocr": [1, 0.5]}
+    assert tr.counters == {'tokens{stage="detect"}': 7}
+    assert m.last_trace is tr and tr.as_dict()["seconds"] is not None
+
+
+def test_traces_of_concurrent_tasks_stay_apart():
+    m = Metrics(enabled=True)
+
+    async def document(name):
+        with m.trace(name) as tr:
+            for _ in range(3):
+                m.count("pages", source=name)
+                await asyncio.sleep(0)
+        return tr
+
+    async def both():
+        return await asyncio.gather(document("a"), document("b"))
+
+    a, b = asyncio.run(both())
+    assert a.counters == {'pages{source="a"}': 3} and b.counters == {'pages{source="b"}': 3}
+
+
+def test_prometheus_format():
+    m = Metrics(enabled=True)
+    m.observe("ocr.easyocr", 0.03)
+    m.observe("ocr.easyocr", 100.0)
+    m.count("cache_hits", 2, stage='do"c')
+    text = m.prometheus()
+    assert 'nlp_stage_seconds_bucket{stage="ocr.easyocr",le="0.05"} 1' in text
+    assert f'nlp_stage_seconds_bucket{{stage="ocr.easyocr",le="{BUCKETS[-1]}"}} 1' in text
+    assert 'nlp_stage_seconds_bucket{stage="ocr.easyocr",le="+Inf"} 2' in text
+    assert 'nlp_stage_seconds_count{stage="ocr.easyocr"} 2' in text
+    assert 'nlp_cache_hits_total{stage="do\\"c"} 2' in text
+    m.reset()
+    assert "nlp_stage_seconds_bucket" not in m.prometheus()
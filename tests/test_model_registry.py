@@ -0,0 +1,70 @@
+import langage_analyser
+from langage_analyser import LanguageAnalyzer
+from model_registry import ModelRegistry, estimate_size, registry
+
+
+class FakeORTModel:
+    """Modèle optimum : pas de paramètres torch, des fichiers .onnx."""
+
+    def __init__(self, folder, names):
+        self.model_save_dir = folder
+        for attr, name in names.items():
+            setattr(self, attr, folder / name)
+
+
+class FakePipeline:
+    def __init__(self, model):
+        self.model = model
+        self.tokenizer = None
+
+
+def write(path, size):
+    path.write_bytes(b"\0" * size)
+
+
+def test_onnx_model_size_from_files(tmp_path):
+    write(tmp_path / "model.onnx", 1000)
+    write(tmp_path / "model.onnx_data", 4000)
+    write(tmp_path / "config.json", 50)
+    assert estimate_size(FakePipeline(FakeORTModel(tmp_path, {"model_path": "model.onnx"}))) == 5000
+
+
+def test_onnx_seq2seq_size(tmp_path):
+    names = {"encoder_model_path": "encoder_model.onnx", "decoder_model_path": "decoder_model.onnx",
+             "decoder_with_past_model_path": "decoder_with_past_model.onnx"}
+    for k, name in enumerate(names.values(), 1):
+        write(tmp_path / name, 100 * k)
+    assert estimate_size(FakePipeline(FakeORTModel(tmp_path, names))) == 600
+
+
+def test_budget_evicts_onnx_models(tmp_path):
+    sizes = {"a": 600_000, "b": 600_000}
+    for name, size in sizes.items():
+        (tmp_path / name).mkdir()
+        write(tmp_path / name / "model.onnx", size)
+    reg = ModelRegistry(budget_mb=1)
+    for name in sizes:
+        reg.get(name, lambda name=name: FakePipeline(
+            FakeORTModel(tmp_path / name, {"model_path": "model.onnx"})))
+    assert reg.counters["evictions"] == 1
+    assert list(reg.stats()["loaded"]) == ["b"]
+
+
+def test_translation_asks_registry_once_per_call(monkeypatch):
+    class Model:
+        tokenizer = type("Tok", (), {"__call__": lambda self, sents, add_special_tokens=False:
+                                     {"input_ids": [s.split() for s in sents]}})()
+
+        def __call__(self, inputs, **kwargs):
+            return [{"translation_text": t.upper()} for t in inputs]
+
+    monkeypatch.setattr(langage_analyser, "_FR_EN", "test/registre-hits")
+    monkeypatch.setattr(langage_analyser, "load_pipeline", lambda *args, **kwargs: Model())
+    monkeypatch.setattr(langage_analyser.cache, "path", None)
+    la = LanguageAnalyzer(backend="torch")
+    la.device = -1
+    la.translate_texts(["Première phrase. Seconde phrase."], ["fr"])
+    hits = registry.counters["hits"]
+    la.translate_texts(["Troisième phrase ici."], ["fr"])
+    assert registry.counters["hits"] - hits == 1
+    registry.evict("translation:test/registre-hits:-1:torch")
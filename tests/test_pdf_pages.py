@@ -0,0 +1,100 @@
+import io
+
+import pytest
+from PIL import Image
+
+import ocr_processor
+import pdf_utils
+from ocr_processor import OCRProcessor
+from result_cache import ResultCache
+
+
+@pytest.fixture
+def fake_pdf(monkeypatch):
+    """PDF de 5 pages sans poppler : chaque page rendue est une image 4×4."""
+    state = {"pages": 5, "drop": set(), "broken": set(), "calls": []}
+
+    def convert(path, first_page, last_page, **kwargs):
+        state["calls"].append((first_page, last_page))
+        numbers = [n for n in range(first_page, last_page + 1) if n not in state["broken"]]
+        if first_page != last_page:
+            numbers = [n for n in numbers if n not in state["drop"]]
+        return [Image.new("L", (4, 4), color=n) for n in numbers]
+
+    monkeypatch.setattr(pdf_utils, "convert_from_path", convert)
+    monkeypatch.setattr(pdf_utils, "page_count", lambda path: state["pages"])
+    return state
+
+
+def test_pages_in_order_with_images(fake_pdf):
+    pages = list(pdf_utils.iter_pdf_pages(b"%PDF", batch=2))
+    assert [p.number for p in pages] == [1, 2, 3, 4, 5]
+    assert all(p.image is not None and p.source == "ocr" for p in pages)
+
+
+def test_missing_image_is_rendered_again(fake_pdf):
+    fake_pdf["drop"] = {2}          # poppler saute la page 2 dans la plage 1-2
+    pages = list(pdf_utils.iter_pdf_pages(b"%PDF", batch=2))
+    assert pages[1].image is not None and pages[1].image.getpixel((0, 0)) == 2
+    assert (2, 2) in fake_pdf["calls"]
+
+
+def test_unrenderable_page_has_empty_text(fake_pdf):
+    fake_pdf["broken"] = {3}
+    pages = list(pdf_utils.iter_pdf_pages(b"%PDF", batch=2))
+    assert pages[2].text == "" and pages[2].image is None and pages[2].source == "error"
+    assert [p.image.getpixel((0, 0)) for p in pages if p.image] == [1, 2, 4, 5]
+
+
+def test_first_page(fake_pdf):
+    assert [p.number for p in pdf_utils.iter_pdf_pages(b"%PDF", batch=2, first_page=4)] == [4, 5]
+
+
+@pytest.fixture
+def ocr(monkeypatch, tmp_path, fake_pdf):
+    monkeypatch.setattr(ocr_processor, "cache", ResultCache(str(tmp_path / "cache.sqlite")))
+    proc = OCRProcessor(workers=1, text_layer=False)
+    proc.seen = []
+
+    def fake_ocr(image):
+        proc.seen.append(image.getpixel((0, 0)))
+        return f"texte {image.getpixel((0, 0))}"
+
+    monkeypatch.setattr(proc, "extract_text_from_image", fake_ocr)
+    return proc
+
+
+def test_ocr_pages_cached_as_they_are_produced(ocr):
+    data = io.BytesIO(b"%PDF-abandonne")
+    pages = ocr.iter_pages(data, "pdf")
+    assert [next(pages)["text"] for _ in range(2)] == ["texte 1", "texte 2"]
+    pages.close()                           # lecture abandonnée (interface)
+    ocr.seen.clear()
+    texts = [p["text"] for p in ocr.iter_pages(data, "pdf")]
+    assert texts == [f"texte {n}" for n in range(1, 6)]
+    assert ocr.seen[0] == 3                 # reprise après les pages en cache
+    ocr.seen.clear()
+    assert [p["text"] for p in ocr.iter_pages(data, "pdf")] == texts
+    assert ocr.seen == []                   # document complet : aucune OCR
+    assert [r["source"] for r in ocr.last_report] == ["ocr"] * 5
+
+
+def test_unrenderable_page_does_not_stop_ocr(ocr, fake_pdf):
+    fake_pdf["broken"] = {2}
+    pages = list(ocr.iter_pages(io.BytesIO(b"%PDF-casse"), "pdf"))
+    assert [p["source"] for p in pages] == ["ocr", "error", "ocr", "ocr", "ocr"]
+    assert pages[1]["text"] == ""
+
+
+def test_unrenderable_page_is_not_cached(ocr, fake_pdf):
+    data = io.BytesIO(b"%PDF-echec-ponctuel")
+    fake_pdf["broken"] = {2}
+    list(ocr.iter_pages(data, "pdf"))
+    fake_pdf["broken"] = set()              # échec de rendu ponctuel
+    ocr.seen.clear()
+    pages = list(ocr.iter_pages(data, "pdf"))
+    assert [p["text"] for p in pages] == [f"texte {n}" for n in range(1, 6)]
+    assert ocr.seen[0] == 2                 # reprise à la page en échec
+    ocr.seen.clear()
+    list(ocr.iter_pages(data, "pdf"))
+    assert ocr.seen == []                   # complet une fois toutes les pages rendues
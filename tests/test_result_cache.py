@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from result_cache import ResultCache, content_hash
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultCache(str(tmp_path / "cache.sqlite"), max_mb=0.01)      # ~10 Ko
+
+
+def test_key_depends_on_stage_content_and_params():
+    key = ResultCache.make_key("summary", "texte", model="t5", max_length=120)
+    assert key.startswith("summary:" + content_hash("texte"))
+    assert key == ResultCache.make_key("summary", "texte", max_length=120, model="t5")
+    assert key != ResultCache.make_key("summary", "texte", model="t5", max_length=150)
+    assert key != ResultCache.make_key("summary", "texte.", model="t5", max_length=120)
+    assert key != ResultCache.make_key("doctype", "texte", model="t5", max_length=120)
+    assert ResultCache.make_key("ocr", b"\x00\x01") == ResultCache.make_key("ocr", b"\x00\x01")
+
+
+def test_roundtrip_and_counters(store):
+    assert store.get("k:1") is None
+    store.set("k:1", {"scores": [["facture", 0.9]], "stage": "rules"})
+    assert store.get("k:1") == {"scores": [["facture", 0.9]], "stage": "rules"}
+    assert store.counters["hits"] == 1 and store.counters["misses"] == 1
+
+
+def test_cached_computes_once(store):
+    calls = []
+    compute = lambda: calls.append(1) or "fr"
+    assert store.cached("lang", "Bonjour", compute, detector="x") == "fr"
+    assert store.cached("lang", "Bonjour", compute, detector="x") == "fr"
+    assert store.cached("lang", "Bonjour", compute, detector="y") == "fr"
+    assert len(calls) == 2
+
+
+def test_many(store):
+    store.set_many({"tm:a": "A", "tm:b": "B"})
+    assert store.get_many(["tm:a", "tm:b", "tm:c"]) == {"tm:a": "A", "tm:b": "B"}
+
+
+def test_eviction_keeps_recently_read_entries(store):
+    blob = "x" * 1000                       # ~10 entrées dans le budget
+    for k in (1, 2, 3):
+        store.set(f"e:{k}", blob)
+        time.sleep(0.005)
+    store.get("e:1")                        # e:1 relu : e:2 et e:3 sont les plus anciens
+    for k in range(4, 12):
+        time.sleep(0.005)
+        store.set(f"e:{k}", blob)
+    assert store.get("e:1") == blob
+    assert store.get("e:2") is None and store.get("e:3") is None
+    assert store.counters["evictions"] == 2
+    assert store.stats()["size_mb"] <= 0.01
+
+
+def test_disabled_cache():
+    off = ResultCache(None)
+    off.set("k:1", 1)
+    assert off.get("k:1") is None
+    assert off.cached("lang", "x", lambda: "en") == "en"
+    assert list(off.iter_pages("ocr:x", lambda first: iter([{"page": 1}]))) == [({"page": 1}, False)]
@@ -0,0 +1,89 @@
+import math
+
+import pytest
+
+import document_summarizer
+from document_summarizer import DocumentSummarizer, _leaf_budget, _split_chunks, _spread
+
+
+class WhitespaceTokenizer:
+    """Un token par mot."""
+    model_max_length = 64
+
+    def __call__(self, texts, add_special_tokens=False):
+        if isinstance(texts, str):
+            return {"input_ids": texts.split()}
+        return {"input_ids": [t.split() for t in texts]}
+
+
+class CountingPipeline:
+    """« Résume » en gardant les `max_length` premiers mots ; compte les entrées."""
+
+    def __init__(self):
+        self.tokenizer = WhitespaceTokenizer()
+        self.inputs = []
+
+    def __call__(self, texts, max_length=None, **kwargs):
+        self.inputs += texts
+        return [{"summary_text": " ".join(t.split()[1:max_length + 1])} for t in texts]
+
+
+def document(sentences, words=12):
+    return " ".join(" ".join(f"mot{k}x{i}" for i in range(words - 1)) + f" fin{k}."
+                    for k in range(sentences))
+
+
+def test_chunks_respect_limit():
+    tok = WhitespaceTokenizer()
+    for limit in (5, 12, 30, 100):
+        chunks = _split_chunks(document(40), tok, limit)
+        assert all(len(c.split()) <= limit for c in chunks)
+        assert " ".join(chunks).split() == document(40).split()      # rien de perdu
+
+
+def test_overlong_sentence_is_cut_between_words():
+    tok = WhitespaceTokenizer()
+    sentence = " ".join(f"m{i}" for i in range(95)) + "."
+    chunks = _split_chunks(sentence, tok, 20)
+    assert all(len(c.split()) <= 20 for c in chunks)
+    assert " ".join(chunks) == sentence
+
+
+def test_spread_keeps_first_and_last_in_order():
+    items = [f"s{i}" for i in range(10)]
+    assert _spread(items, 20) == items
+    for budget in range(2, 10):
+        kept = _spread(items, budget)
+        assert len(kept) == budget
+        assert kept[0] == "s0" and kept[-1] == "s9"
+        assert kept == sorted(kept, key=items.index)
+        assert len(set(kept)) == budget
+    assert _spread(items, 1) == ["s0"]
+
+
+@pytest.mark.parametrize("fan", [2, 3, 5])
+def test_leaf_budget_is_largest_within_max_calls(fan):
+    def calls(n):
+        total, m = n, n
+        while m > 1:
+            m = math.ceil(m / fan)
+            total += m
+        return total
+    for max_calls in range(1, 40):
+        n = _leaf_budget(max_calls, fan)
+        assert n == 1 or calls(n) <= max_calls
+        assert calls(n + 1) > max_calls
+
+
+@pytest.mark.parametrize("max_calls", [1, 2, 3, 5, 16])
+@pytest.mark.parametrize("sentences", [3, 40, 300])
+def test_generations_stay_within_max_calls(monkeypatch, max_calls, sentences):
+    monkeypatch.setattr(document_summarizer, "_CHUNK_TOKENS", 60)
+    pipe = CountingPipeline()
+    ds = DocumentSummarizer(max_calls=max_calls)
+    ds._summarize(document(sentences), 40, 5, False, pipe=pipe)
+    assert ds.last_calls == len(pipe.inputs) <= max_calls
+    limit = ds._chunk_limit(pipe.tokenizer)
+    if sentences > 3 and max_calls > 2:
+        # résumés partiels : segments d'au plus `limit` tokens, préfixe en plus
+        assert all(len(t.split()) <= limit + 1 for t in pipe.inputs[:-1])
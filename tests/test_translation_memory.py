@@ -0,0 +1,87 @@
+import pytest
+
+import langage_analyser
+from langage_analyser import LanguageAnalyzer
+from result_cache import ResultCache
+from translation_memory import TranslationMemory, memory, normalize
+
+
+class FakeTokenizer:
+    def __call__(self, sents, add_special_tokens=False):
+        return {"input_ids": [s.split() for s in sents]}
+
+
+class FakeModel:
+    """« Traduit » en majuscules ; garde les entrées reçues."""
+
+    def __init__(self):
+        self.tokenizer = FakeTokenizer()
+        self.calls = []
+        self.merge_sentences = False
+
+    def __call__(self, inputs, max_length=None, truncation=True, batch_size=None):
+        self.calls.append(list(inputs))
+        outputs = [text.upper() for text in inputs]
+        if self.merge_sentences:           # une seule phrase en sortie
+            outputs = [o.replace(". ", ", ") for o in outputs]
+        return [{"translation_text": o} for o in outputs]
+
+
+@pytest.fixture
+def model(monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(LanguageAnalyzer, "fr_en", property(lambda self: model))
+    monkeypatch.setattr(langage_analyser.cache, "path", None)      # seule la mémoire sert
+    assert memory.enabled
+    memory.clear()
+    return model
+
+
+def translate(text):
+    return LanguageAnalyzer().translate_texts([text], ["fr"])[0]
+
+
+def known(sentences, backend="torch"):
+    return memory.lookup(sentences, "fr-en", langage_analyser.model_tag(langage_analyser._FR_EN, backend))
+
+
+def test_normalize():
+    assert normalize("  Bonjour \t à\n tous  ") == "Bonjour à tous"
+
+
+def test_misses_are_packed_and_order_kept(model):
+    text = "Première phrase. Deuxième phrase. Troisième phrase.\n\nAutre paragraphe ici."
+    assert translate(text) == "PREMIÈRE PHRASE. DEUXIÈME PHRASE. TROISIÈME PHRASE.\n\nAUTRE PARAGRAPHE ICI."
+    # un segment par paragraphe, pas une entrée par phrase
+    assert model.calls == [["Première phrase. Deuxième phrase. Troisième phrase.",
+                            "Autre paragraphe ici."]]
+    assert known(["Deuxième phrase."]) == {"Deuxième phrase.": "DEUXIÈME PHRASE."}
+
+
+def test_known_sentences_come_from_memory(model):
+    translate("Clause commune. Signature du client.")
+    model.calls.clear()
+    out = translate("Clause commune. Nouvelle phrase. Signature du client.")
+    assert out == "CLAUSE COMMUNE. NOUVELLE PHRASE. SIGNATURE DU CLIENT."
+    assert model.calls == [["Nouvelle phrase."]]
+
+
+def test_segments_respect_token_budget(model, monkeypatch):
+    monkeypatch.setattr(langage_analyser, "_CHUNK_MARGIN", 7)
+    translate("Un deux trois. Quatre cinq six. Sept huit.")
+    (inputs,) = model.calls
+    assert sorted(inputs) == ["Quatre cinq six. Sept huit.", "Un deux trois."]
+
+
+def test_unaligned_segment_is_not_stored(model):
+    model.merge_sentences = True
+    assert translate("Phrase une. Phrase deux.") == "PHRASE UNE, PHRASE DEUX."
+    assert known(["Phrase une.", "Phrase deux."]) == {}
+
+
+def test_lookup_keeps_direction_and_model_apart(tmp_path):
+    tm = TranslationMemory(ResultCache(str(tmp_path / "tm.sqlite")))
+    tm.store_many({"Bonjour.": "Hello."}, "fr-en", "m1")
+    assert tm.lookup(["Bonjour.", "Merci."], "fr-en", "m1") == {"Bonjour.": "Hello."}
+    assert tm.lookup(["Bonjour."], "en-fr", "m1") == {}
+    assert tm.lookup(["Bonjour."], "fr-en", "m2") == {}
@@ -0,0 +1,95 @@
+# translation_memory.py – mémoire de traduction au niveau de la phrase
+"""
+Contrats, courriers et documents juridiques répètent les mêmes phrases :
+formules de politesse, articles de loi, blocs de signature… La mémoire de
+traduction garde la traduction de chaque phrase déjà vue, indexée par
+(sens de traduction, modèle, phrase normalisée) : seules les phrases
+inédites passent par MarianMT, le reste est relu depuis le disque.
+
+Stockage : un ResultCache (SQLite, mode WAL) distinct du cache des
+résultats, donc borné en taille (LRU) et partagé entre processus — un pool
+de workers profite des traductions des autres.
+
+Variables d'environnement :
+- NLP_TRANSLATION_MEMORY=0  désactive la mémoire ;
+- NLP_TM_MAX_MB             taille maximale (défaut : 64) ;
+le fichier est placé dans NLP_CACHE_DIR (translation_memory.sqlite).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+import unicodedata
+
+from result_cache import ResultCache, cache_dir
+
+_rx_space = re.compile(r"\s+")
+
+
+def normalize(sentence: str) -> str:
+    """Forme canonique d'une phrase : Unicode NFC, espaces compactés."""
+    return _rx_space.sub(" ", unicodedata.normalize("NFC", sentence)).strip()
+
+
+class TranslationMemory:
+    """Phrase normalisée → traduction, pour un sens et un modèle donnés."""
+
+    def __init__(self, store: ResultCache):
+        self.store = store
+        self.counters = {"hits": 0, "misses": 0, "stored": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.store.enabled
+
+    @staticmethod
+    def _key(sentence: str, direction: str, model: str) -> str:
+        return ResultCache.make_key("tm", sentence, direction=direction, model=model)
+
+    def lookup(self, sentences: list[str], direction: str, model: str) -> dict[str, str]:
+        """Traductions connues des phrases (normalisées) demandées."""
+        unique = list(dict.fromkeys(sentences))
+        if not self.enabled or not unique:
+            self.counters["misses"] += len(unique)
+            return {}
+        keys = {self._key(s, direction, model): s for s in unique}
+        found = {keys[k]: v for k, v in self.store.get_many(list(keys)).items()}
+        self.counters["hits"] += len(found)
+        self.counters["misses"] += len(unique) - len(found)
+        return found
+
+    def store_many(self, translations: dict[str, str], direction: str, model: str) -> None:
+        if not self.enabled or not translations:
+            return
+        self.store.set_many({self._key(s, direction, model): t for s, t in translations.items()})
+        self.counters["stored"] += len(translations)
+
+    def clear(self) -> None:
+        self.store.clear()
+
+    def stats(self) -> dict:
+        out = dict(self.counters)
+        seen = out["hits"] + out["misses"]
+        out["hit_rate"] = round(out["hits"] / seen, 3) if seen else None
+        if self.enabled:
+            store = self.store.stats()
+            out.update(entries=store.get("entries"), size_mb=store.get("size_mb"),
+                       evictions=store["evictions"])
+        return out
+
+
+def _from_env() -> TranslationMemory:
+    if os.environ.get("NLP_TRANSLATION_MEMORY", "1") == "0":
+        return TranslationMemory(ResultCache(None))
+    try:
+        max_mb = float(os.environ.get("NLP_TM_MAX_MB", "64"))
+    except ValueError:
+        logging.warning("NLP_TM_MAX_MB invalide (64 Mo utilisés)")
+        max_mb = 64
+    return TranslationMemory(ResultCache(os.path.join(cache_dir(), "translation_memory.sqlite"),
+                                         max_mb=max_mb))
+
+
+# instance partagée par le processus (le fichier l'est entre processus)
+memory = _from_env()